@@ -1,9 +1,8 @@
 """Retry decorator to automatically call a function again on errors"""
 
 import logging
-import random
 
-from typing import cast, Final
+from typing import Final
 from collections.abc import Callable
 from mypy_extensions import DefaultNamedArg, DefaultArg
 
@@ -17,8 +16,23 @@ from .types import (
     UpdateDelayFunc,
     JitterTuple,
     AioretryProtocol,
+    DelayStrategy,
+    LogFormat,
 )
-from .context import Context
+from .backoff import Backoff, RandomSource, KeyedJitter, _policy_update_delay
+from . import strategies
+from .strategies import (
+    Strategy,
+    Exponential,
+    FullJitter,
+    EqualJitter,
+    DecorrelatedJitter,
+    Fibonacci,
+    Piecewise,
+)
+from .clock import Clock, RealClock, LoopClock, VirtualClock
+from .context import Context, ContextPolicy
+from .metrics import MetricsCollector
 from .decorator import Retry
 
 
@@ -47,10 +61,15 @@ RETRY_PARAMS_DOCSTRING: Final[
 
     :param backoff: a multiplier applied to delay after each
         iteration. It can be a float, and it can actually be less than
-        one. Default: 1 (no backoff).
+        one. It can also be a :py:class:`~kaioretry.types.DelayStrategy`,
+        such as the :py:mod:`~kaioretry.strategies` objects, in which case
+        jitter cannot be used. Default: 1 (no backoff).
 
     :param jitter: extra seconds added to delay between
-        iterations. Default: 0.
+        iterations. Either a number, a :py:class:`tuple` of two numbers
+        between which random values are picked, or a
+        :py:class:`~kaioretry.KeyedJitter`, whose values are derived from the
+        host, the process or the decorated function arguments. Default: 0.
 
     :param max_delay: the maximum value of delay. default: None (no limit).
 
@@ -60,8 +79,27 @@ RETRY_PARAMS_DOCSTRING: Final[
     :param logger: the :py:class:`logging.Logger` object to which the
         log messages will be sent to.
 
-    :raises ValueError: if tries, min_delay or max_delay have incorrect values.
-    :raises TypeError: if jitter is neither a Number nor a :py:class:`tuple`.
+    :param metrics: the :py:class:`~kaioretry.MetricsCollector` collecting
+        the metrics of the decorated functions. Default: None (no metrics).
+
+    :param log_format: ``"text"`` (the default) or ``"compact"``: see
+        :py:class:`~kaioretry.Retry`.
+
+    :param stats: whether decorated functions keep live statistics, in
+        their ``stats`` attribute. Default: False.
+
+    :param release_tracebacks: whether the frames of the exceptions caught
+        before the last try are released while backing off: see
+        :py:class:`~kaioretry.Retry`. Default: False.
+
+    :param history: the number of first, and of last, attempts whose
+        exceptions are raised in an :py:class:`ExceptionGroup` once tries are
+        exhausted: see :py:class:`~kaioretry.Retry`. Default: 0.
+
+    :raises ValueError: if tries, min_delay, max_delay or history have
+        incorrect values, or if jitter is used along with a backoff strategy.
+    :raises TypeError: if jitter is neither a Number, a :py:class:`tuple` nor
+        a :py:class:`~kaioretry.KeyedJitter`.
 """
 
 
@@ -70,11 +108,16 @@ def _make_decorator(func: Callable[[Retry], FuncRetVal]) -> Callable[
         DefaultArg(Exceptions, "exceptions"),  # noqa: F821
         DefaultArg(int, "tries"),  # noqa: F821
         DefaultNamedArg(NonNegative, "delay"),  # noqa: F821
-        DefaultNamedArg(Number, "backoff"),  # noqa: F821
-        DefaultNamedArg(Jitter, "jitter"),  # noqa: F821
+        DefaultNamedArg(Number | DelayStrategy, "backoff"),  # noqa: F821
+        DefaultNamedArg(Jitter | KeyedJitter, "jitter"),  # noqa: F821
         DefaultNamedArg(NonNegative | None, "max_delay"),  # noqa: F821
         DefaultNamedArg(NonNegative, "min_delay"),  # noqa: F821
         DefaultNamedArg(logging.Logger, "logger"),  # noqa: F821
+        DefaultNamedArg(MetricsCollector | None, "metrics"),  # noqa: F821
+        DefaultNamedArg(LogFormat, "log_format"),  # noqa: F821
+        DefaultNamedArg(bool, "stats"),  # noqa: F821
+        DefaultNamedArg(bool, "release_tracebacks"),  # noqa: F821
+        DefaultNamedArg(int, "history"),  # noqa: F821
     ],  # noqa: F821
     FuncRetVal,
 ]:
@@ -99,38 +142,35 @@ def _make_decorator(func: Callable[[Retry], FuncRetVal]) -> Callable[
         tries: int = -1,
         *,
         delay: NonNegative = 0,
-        backoff: Number = 1,
-        jitter: Jitter = 0,
+        backoff: Number | DelayStrategy = 1,
+        jitter: Jitter | KeyedJitter = 0,
         max_delay: NonNegative | None = None,
         min_delay: NonNegative = 0,
         logger: logging.Logger = Retry.DEFAULT_LOGGER,
+        metrics: MetricsCollector | None = None,
+        log_format: LogFormat = "text",
+        stats: bool = False,
+        release_tracebacks: bool = False,
+        history: int = 0,
     ) -> FuncRetVal:
-        if isinstance(jitter, (int, float)):
-            jitter_f = cast(UpdateDelayFunc, jitter.__add__)
-        elif isinstance(jitter, (tuple, list)):
-
-            def jitter_f(delay: Number) -> Number:
-                return random.uniform(*jitter) + delay
-
-        else:
-            raise TypeError(
-                "jitter parameter is neither a number "
-                f"nor a 2 length tuple: {jitter}"
-            )
-
-        def update_delay(delay: NonNegative) -> NonNegative:
-            return jitter_f(delay * backoff)
-
         context = Context(
             tries=tries,
             delay=delay,
-            update_delay=update_delay,
+            update_delay=_policy_update_delay(backoff, jitter),
             max_delay=max_delay,
             min_delay=min_delay,
             logger=logger,
+            log_format=log_format,
         )
         retry_obj = Retry(
-            exceptions=exceptions, context=context, logger=logger
+            exceptions=exceptions,
+            context=context,
+            logger=logger,
+            metrics=metrics,
+            log_format=log_format,
+            stats=stats,
+            release_tracebacks=release_tracebacks,
+            history=history,
         )
         return func(retry_obj)
 
@@ -187,4 +227,19 @@ def aioretry(retry_obj: Retry) -> AioretryProtocol:
     return retry_obj.aioretry
 
 
-__all__ = ["Retry", "Context", "retry", "aioretry"]
+__all__ = [
+    "Retry",
+    "Context",
+    "ContextPolicy",
+    "Backoff",
+    "RandomSource",
+    "KeyedJitter",
+    *strategies.__all__,
+    "Clock",
+    "RealClock",
+    "LoopClock",
+    "VirtualClock",
+    "MetricsCollector",
+    "retry",
+    "aioretry",
+]
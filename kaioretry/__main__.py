@@ -0,0 +1,93 @@
+"""The kaioretry command line tools.
+
+.. code-block:: shell
+
+   python -m kaioretry simulate --help
+
+"""
+
+import sys
+import argparse
+
+from collections.abc import Sequence
+
+from .simulate import FailureModel, simulate, Duration
+
+
+def _duration(values: list[float]) -> Duration:
+    if len(values) == 1:
+        return values[0]
+    if len(values) == 2:
+        return values[0], values[1]
+    raise argparse.ArgumentTypeError(f"expected a value or a range: {values}")
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m kaioretry")
+    commands = parser.add_subparsers(dest="command", required=True)
+    sim = commands.add_parser(
+        "simulate",
+        help="simulate a retry policy against a failing service",
+        description="Simulate a retry policy against a failing service. "
+        "Durations are given either as a number of seconds, or as a range "
+        "of two numbers, within which values are uniformly picked.",
+    )
+    policy = sim.add_argument_group("retry policy")
+    policy.add_argument("--tries", type=int, default=-1)
+    policy.add_argument("--delay", type=float, default=0)
+    policy.add_argument("--backoff", type=float, default=1)
+    policy.add_argument("--jitter", type=float, nargs="+", default=[0])
+    policy.add_argument("--max-delay", type=float)
+    policy.add_argument("--min-delay", type=float, default=0)
+    model = sim.add_argument_group("failure model")
+    model.add_argument("--failure-rate", type=float, default=0)
+    model.add_argument("--outage-rate", type=float, default=0)
+    model.add_argument("--outage-duration", type=float, nargs="+", default=[0])
+    model.add_argument("--latency", type=float, nargs="+", default=[0])
+    sim.add_argument("--calls", type=int, default=100000)
+    sim.add_argument("--seed", type=int)
+    sim.add_argument(
+        "--no-numpy",
+        dest="vectorise",
+        action="store_false",
+        help="do not use numpy, even if available",
+    )
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Run the kaioretry command line.
+
+    :param argv: the command line arguments. Default: :py:data:`sys.argv`.
+
+    :returns: the exit status.
+    """
+    parser = _parser()
+    args = parser.parse_args(argv)
+    try:
+        model = FailureModel(
+            args.failure_rate,
+            outage_rate=args.outage_rate,
+            outage_duration=_duration(args.outage_duration),
+            latency=_duration(args.latency),
+        )
+        report = simulate(
+            model,
+            args.calls,
+            tries=args.tries,
+            delay=args.delay,
+            backoff=args.backoff,
+            jitter=_duration(args.jitter),
+            max_delay=args.max_delay,
+            min_delay=args.min_delay,
+            seed=args.seed,
+            vectorise=args.vectorise,
+        )
+    except (ValueError, argparse.ArgumentTypeError) as error:
+        parser.error(str(error))
+    print(report)
+    return 0
+
+
+if __name__ == "__main__":  # pragma: nocover
+    sys.exit(main())
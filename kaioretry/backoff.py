@@ -0,0 +1,366 @@
+"""Backoff objects compute the next delay between two tries, out of the
+current one. They are meant to be given to the
+:py:class:`~kaioretry.Context` constructor, as ``update_delay`` parameter.
+
+.. code-block:: python
+   :caption: Double the delay after each try, and add up to 1 second of jitter
+
+   >>> from kaioretry import Backoff, Context
+   >>> context = Context(tries=5, delay=1, update_delay=Backoff(2, (0, 1)))
+
+
+Unlike lambdas and closures, backoff objects can be pickled, along with the
+:py:class:`~kaioretry.Context` using them.
+
+Backoff objects are never modified once built, and random jitter values are
+drawn from a :py:class:`RandomSource`, which maintains a random generator per
+thread, so they can be shared between threads, including on free-threaded
+python builds, without any contention.
+
+.. code-block:: python
+   :caption: Repeatable jitter
+
+   >>> from kaioretry import Backoff, RandomSource
+   >>> source = RandomSource(seed=42)
+   >>> backoff = Backoff(2, (0, 1), source=source)
+   >>> backoff(1)
+   2.972248571230442
+   >>> source.reset()
+   >>> backoff(1)
+   2.972248571230442
+
+"""
+
+import os
+import socket
+import random
+import hashlib
+import weakref
+import functools
+import threading
+
+from typing import Any
+from collections.abc import Callable, Hashable, Iterator
+
+from .types import (
+    Number,
+    NonNegative,
+    Jitter,
+    UpdateDelayFunc,
+    DelayStrategy,
+)
+
+
+class RandomSource:
+    """A source of random values, dedicated to jitter computation.
+
+    Each thread draws from its own :py:class:`random.Random` generator, so
+    that no lock is ever shared between threads. Values are drawn by batches,
+    then handed out one at a time.
+
+    If a seed is given, each thread generator is seeded with it and with the
+    thread name, so that a given thread will always be handed the same
+    sequence of values: jitter, and thus delays, are repeatable from a run to
+    another.
+
+    :param seed: the seed of the random generators. If None (the default),
+        generators are seeded from the operating system randomness sources.
+
+    :param batch_size: the number of values drawn at once.
+
+    :raises ValueError: if batch_size is not positive.
+    """
+
+    __sources: "weakref.WeakSet[RandomSource]" = weakref.WeakSet()
+
+    def __init__(
+        self, /, seed: int | str | None = None, batch_size: int = 64
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError(
+                f"batch_size must be positive. ({batch_size} given)"
+            )
+        self.__seed = seed
+        self.__batch_size = batch_size
+        self.__local = threading.local()
+        self.__sources.add(self)
+
+    def __generator(self) -> random.Random:
+        try:
+            generator: random.Random = self.__local.generator
+        except AttributeError:
+            if self.__seed is None:
+                generator = random.Random()
+            else:
+                name = threading.current_thread().name
+                generator = random.Random(f"{self.__seed}/{name}")
+            self.__local.generator = generator
+        return generator
+
+    def __draw(self) -> Iterator[float]:
+        draw = self.__generator().random
+        values = iter([draw() for _ in range(self.__batch_size)])
+        self.__local.values = values
+        return values
+
+    def random(self) -> float:
+        """Return the next random value of the current thread.
+
+        :returns: a number in the [0, 1) range.
+        """
+        try:
+            values: Iterator[float] = self.__local.values
+            return next(values)
+        except (AttributeError, StopIteration):
+            return next(self.__draw())
+
+    def uniform(self, low: Number, high: Number) -> float:
+        """Return the next random value of the current thread, scaled to the
+        [low, high) range.
+        """
+        return low + (high - low) * self.random()
+
+    def reset(self) -> None:
+        """Forget the current thread generator and its drawn values. If the
+        source is seeded, the thread will be handed the same values again."""
+        self.__local.__dict__.clear()
+
+    @classmethod
+    def _reset_all(cls) -> None:
+        """Reset all sources, so that forked processes do not draw the same
+        values as their parent."""
+        for source in cls.__sources:
+            source.reset()
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Thread-local data cannot, and should not, be pickled.
+        return self.__class__, (self.__seed, self.__batch_size)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}"
+            f"({self.__seed!r}, batch_size={self.__batch_size})"
+        )
+
+
+DEFAULT_RANDOM_SOURCE = RandomSource()
+"""The :py:class:`RandomSource` used when none is given to the
+:py:class:`Backoff` constructor."""
+
+
+os.register_at_fork(
+    after_in_child=RandomSource._reset_all  # pylint: disable=protected-access
+)
+
+
+@functools.cache
+def _hostname() -> str:
+    return socket.gethostname()
+
+
+# Adding this number, modulo 1, is the most evenly spreading way to walk
+# through the [0, 1) range.
+_GOLDEN_RATIO_CONJUGATE = (5**0.5 - 1) / 2
+
+
+class KeyedJitter:
+    """Jitter values that are not random, but derived from a key identifying
+    the client. As random jitter, keyed jitter desynchronises the clients of
+    a same service, but does so evenly and reproducibly, with no risk of
+    having clients clustering together by chance.
+
+    The first jitter value of a loop is picked in the jitter range according
+    to a hash of the key. The following ones are then spread over the range.
+
+    .. code-block:: python
+       :caption: Jitter depending on the URL
+
+       @retry(delay=1, backoff=2, jitter=KeyedJitter(0, 1, key=lambda u: u))
+       def download(url):
+           ...
+
+    :param low: the lower bound of the jitter range.
+
+    :param high: the upper bound of the jitter range.
+
+    :param key: either ``"host"`` to use the host name, ``"pid"`` to use the
+        host name and the process id, or a function that will be given the
+        decorated function call arguments, and will return a key. The key
+        :py:func:`repr` must be stable. Default: ``"pid"``.
+
+    :raises ValueError: if key is neither a known key name nor a callable.
+    """
+
+    KEYS = ("host", "pid")
+    """The key names supported by the constructor."""
+
+    def __init__(
+        self,
+        low: Number,
+        high: Number,
+        /,
+        key: str | Callable[..., Hashable] = "pid",
+    ) -> None:
+        if not callable(key) and key not in self.KEYS:
+            raise ValueError(
+                f"key must be one of {self.KEYS}, or a callable. "
+                f"({key!r} given)"
+            )
+        self.__low = low
+        self.__width = high - low
+        self.__key = key
+
+    def __identity(
+        self, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> Hashable:
+        if callable(self.__key):
+            return self.__key(*args, **kwargs)
+        if self.__key == "host":
+            return _hostname()
+        return _hostname(), os.getpid()
+
+    @property
+    def per_call(self) -> bool:
+        """Whether the key is derived from the decorated function call
+        arguments."""
+        return callable(self.__key)
+
+    def offsets(
+        self, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> Iterator[NonNegative]:
+        """Generate the jitter values of a loop.
+
+        :param args: the positional arguments of the decorated function call.
+
+        :param kwargs: the keyword arguments of the decorated function call.
+
+        :returns: an infinite iterator of jitter values.
+        """
+        digest = hashlib.blake2b(
+            repr(self.__identity(args, kwargs)).encode(), digest_size=8
+        ).digest()
+        fraction = int.from_bytes(digest) / 2**64
+        while True:
+            yield self.__low + self.__width * fraction
+            fraction = (fraction + _GOLDEN_RATIO_CONJUGATE) % 1
+
+    def __repr__(self) -> str:
+        high = self.__low + self.__width
+        return (
+            f"{self.__class__.__name__}({self.__low}, {high}, {self.__key!r})"
+        )
+
+
+class Backoff:
+    """Multiply the delay by a given factor, then add some jitter to it. This
+    is what :py:func:`~kaioretry.retry` and :py:func:`~kaioretry.aioretry`
+    use to update delay.
+
+    :param backoff: a multiplier applied to delay after each
+        iteration. It can be a float, and it can actually be less than
+        one. Default: 1 (no backoff).
+
+    :param jitter: extra seconds added to delay between iterations. If a
+        :py:class:`tuple` of two numbers, a random value between those two
+        will be picked each time. If a :py:class:`KeyedJitter`, its values
+        will be used. Default: 0.
+
+    :param source: the :py:class:`RandomSource` random jitter values are
+        picked from. Give a seeded one to obtain repeatable delays.
+
+    :raises TypeError: if jitter is neither a Number, a :py:class:`tuple` nor
+        a :py:class:`KeyedJitter`.
+
+    .. automethod:: __call__
+    """
+
+    def __init__(
+        self,
+        /,
+        backoff: Number = 1,
+        jitter: Jitter | KeyedJitter = 0,
+        *,
+        source: RandomSource = DEFAULT_RANDOM_SOURCE,
+    ) -> None:
+        self.__backoff = backoff
+        self.__source = source
+        self.__jitter: Number = 0
+        self.__jitter_range: tuple[Number, Number] | None = None
+        self.__keyed_jitter: KeyedJitter | None = None
+        if isinstance(jitter, (int, float)):
+            self.__jitter = jitter
+        elif isinstance(jitter, (tuple, list)):
+            low, high = jitter
+            self.__jitter_range = low, high
+        elif isinstance(jitter, KeyedJitter):
+            self.__keyed_jitter = jitter
+        else:
+            raise TypeError(
+                "jitter parameter is neither a number, "
+                f"a 2 length tuple nor a KeyedJitter: {jitter}"
+            )
+
+    def __call__(self, delay: NonNegative) -> NonNegative:
+        """Compute the next delay value.
+
+        :param delay: the current value of delay.
+
+        :returns: the new value of delay.
+
+        :raises ValueError: if jitter is a :py:class:`KeyedJitter` whose key
+            is derived from call arguments, which are only known to
+            :py:meth:`loop`.
+        """
+        delay *= self.__backoff
+        if self.__jitter_range is not None:
+            return delay + self.__source.uniform(*self.__jitter_range)
+        if self.__keyed_jitter is not None:
+            if self.__keyed_jitter.per_call:
+                raise ValueError(
+                    f"{self.__keyed_jitter!r} needs call arguments: use "
+                    "Backoff.loop"
+                )
+            # Outside of a loop, only the first value can be used.
+            return delay + next(self.__keyed_jitter.offsets((), {}))
+        return delay + self.__jitter
+
+    def __keyed_update(
+        self, offsets: Iterator[NonNegative], delay: NonNegative
+    ) -> NonNegative:
+        return delay * self.__backoff + next(offsets)
+
+    def loop(
+        self, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> UpdateDelayFunc:
+        """Implement the :py:class:`~kaioretry.types.DelayStrategy` protocol:
+        if jitter is a :py:class:`KeyedJitter`, walk through its values during
+        the loop. Otherwise, the object itself is returned.
+        """
+        if self.__keyed_jitter is None:
+            return self
+        offsets = self.__keyed_jitter.offsets(args, kwargs)
+        return functools.partial(self.__keyed_update, offsets)
+
+    def __repr__(self) -> str:
+        jitter = self.__keyed_jitter or self.__jitter_range or self.__jitter
+        return f"{self.__class__.__name__}({self.__backoff}, {jitter})"
+
+
+def _policy_update_delay(
+    backoff: Number | DelayStrategy,
+    jitter: Jitter | KeyedJitter,
+    source: RandomSource = DEFAULT_RANDOM_SOURCE,
+) -> Backoff | DelayStrategy:
+    """Turn the backoff and jitter parameters of :py:func:`~kaioretry.retry`
+    into the update_delay parameter of :py:class:`~kaioretry.Context`.
+
+    :raises ValueError: if jitter is used along with a backoff strategy.
+    """
+    if isinstance(backoff, (int, float)):
+        return Backoff(backoff, jitter, source=source)
+    if jitter != 0:
+        raise ValueError("jitter cannot be used with a backoff strategy")
+    return backoff
+
+
+__all__ = ["RandomSource", "KeyedJitter", "Backoff"]
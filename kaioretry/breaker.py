@@ -0,0 +1,154 @@
+"""Stop calling a failing dependency for a while, instead of retrying.
+
+A :py:class:`CircuitBreaker` counts the exceptions caught by the
+:py:class:`~kaioretry.Retry` objects it instruments. Once ``threshold``
+exceptions were caught in a row, the circuit opens: attempts fail
+immediately with a :py:class:`CircuitOpenError` for ``cooldown`` seconds.
+Then a single attempt, the probe, is let through: its success closes the
+circuit, its failure opens it again.
+
+.. code-block:: python
+   :caption: Breaking the circuit
+
+   from kaioretry import Retry, Context
+   from kaioretry.breaker import CircuitBreaker
+
+   breaker = CircuitBreaker(threshold=5, cooldown=30)
+   retry = breaker.instrument(Retry(ConnectionError, Context(tries=3)))
+
+
+The state of the circuit is kept in a :py:class:`~kaioretry.state.StateBackend`,
+under the name of the breaker: breakers of the same name and backend share
+it. With a :py:class:`~kaioretry.state.SharedMemoryState`, all the processes
+of a host discover an outage together, and only one of them probes the
+dependency. Times are those of the :py:class:`~kaioretry.Context` clocks,
+which must agree, as the default ones do on a host.
+"""
+
+from typing import Any
+
+from .hooks import RetryState
+from .decorator import Retry
+from .state import StateBackend, LocalState
+
+
+class CircuitOpenError(Exception):
+    """The exception failing attempts while a circuit is open.
+
+    :param name: the name of the circuit breaker.
+
+    :param remaining: the number of seconds before the next probe.
+    """
+
+    def __init__(self, name: str, remaining: float) -> None:
+        super().__init__(f"circuit {name} is open for {remaining:g}s")
+        self.name = name
+        """The name of the circuit breaker."""
+        self.remaining = remaining
+        """The number of seconds before the next probe."""
+
+
+class CircuitBreaker:
+    """Fail attempts while a dependency is failing.
+
+    :param backend: where the state of the circuit is kept. Default: a new
+        :py:class:`~kaioretry.state.LocalState`.
+
+    :param name: the name of the circuit, in the backend.
+
+    :param threshold: the number of exceptions caught in a row that opens
+        the circuit.
+
+    :param cooldown: the number of seconds the circuit stays open.
+
+    :raises ValueError: if threshold or cooldown is not positive.
+    """
+
+    def __init__(
+        self,
+        backend: StateBackend | None = None,
+        name: str = "default",
+        /,
+        threshold: int = 5,
+        cooldown: float = 30,
+    ) -> None:
+        if threshold < 1 or cooldown <= 0:
+            raise ValueError(
+                "threshold and cooldown must be positive "
+                f"({threshold}, {cooldown} given)"
+            )
+        self.__backend = LocalState() if backend is None else backend
+        self.__name = name
+        self.__threshold = threshold
+        self.__cooldown = cooldown
+        self.__failures_key = f"kaioretry.breaker.{name}.failures"
+        # The time the circuit may be probed at, 0 if it is closed.
+        self.__open_key = f"kaioretry.breaker.{name}.open_until"
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the circuit is open, or being probed."""
+        return bool(self.__backend.get(self.__open_key))
+
+    def before_attempt(self, state: RetryState) -> None:
+        """The :py:attr:`~kaioretry.Retry.before_attempt` hook.
+
+        :raises CircuitOpenError: if the circuit is open, and the attempt is
+            not the probe.
+        """
+        open_until = self.__backend.get(self.__open_key)
+        if not open_until:
+            return
+        if state.start >= open_until and self.__backend.compare_and_set(
+            self.__open_key, open_until, state.start + self.__cooldown
+        ):
+            state.data[self] = True
+            return
+        remaining = self.__backend.get(self.__open_key) - state.start
+        raise CircuitOpenError(self.__name, max(remaining, 0))
+
+    def after_success(self, _: RetryState, __: Any) -> None:
+        """The :py:attr:`~kaioretry.Retry.after_success` hook."""
+        if self.__backend.get(self.__failures_key):
+            self.__backend.set(self.__failures_key, 0)
+        if self.__backend.get(self.__open_key):
+            self.__backend.set(self.__open_key, 0)
+
+    def on_caught_exception(self, state: RetryState, _: BaseException) -> None:
+        """The :py:attr:`~kaioretry.Retry.on_caught_exception` hook."""
+        failures = self.__backend.add(self.__failures_key, 1)
+        if failures >= self.__threshold or state.data.get(self):
+            self.__backend.set(
+                self.__open_key, (state.end or state.start) + self.__cooldown
+            )
+
+    def on_give_up(self, state: RetryState, error: BaseException) -> None:
+        """The :py:attr:`~kaioretry.Retry.on_give_up` hook. Exceptions that
+        are not retried are not counted."""
+
+    def instrument(self, retry: Retry) -> Retry:
+        """Register the hooks of the breaker to a
+        :py:class:`~kaioretry.Retry` object.
+
+        :param retry: the object to instrument.
+
+        :returns: the same object.
+        """
+        return retry.add_hooks(self)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return self.__class__, (
+            self.__backend,
+            self.__name,
+            self.__threshold,
+            self.__cooldown,
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self.__backend!r}, {self.__name!r}, "
+            f"threshold={self.__threshold}, cooldown={self.__cooldown})"
+        )
+
+
+__all__ = ["CircuitOpenError", "CircuitBreaker"]
@@ -0,0 +1,136 @@
+"""Limit retries to a share of successful calls, so that retries cannot
+multiply the load of a failing dependency.
+
+A :py:class:`RetryBudget` is a bucket of tokens: each retry spends one, and
+each successful call earns ``ratio`` of one, up to ``capacity`` tokens. When
+no token is left, calls are not retried anymore: they fail with the
+exception of their last attempt, as if they ran out of tries. Tokens spent
+on retries another hook refuses are given back.
+
+.. code-block:: python
+   :caption: Retrying up to 10% of successful calls
+
+   from kaioretry import Retry, Context
+   from kaioretry.budget import RetryBudget
+
+   budget = RetryBudget(ratio=0.1, capacity=20)
+   retry = budget.instrument(Retry(ConnectionError, Context(tries=3)))
+
+
+Like :py:class:`~kaioretry.breaker.CircuitBreaker`, budgets keep their tokens
+in a :py:class:`~kaioretry.state.StateBackend`, under their name: with a
+:py:class:`~kaioretry.state.SharedMemoryState`, all the processes of a host
+share a budget.
+"""
+
+from typing import Any
+
+from .hooks import RetryState, StopRetrying
+from .decorator import Retry
+from .state import StateBackend, LocalState
+
+
+class RetryBudget:
+    """Refuse retries once their budget is spent.
+
+    :param backend: where the tokens are kept. Default: a new
+        :py:class:`~kaioretry.state.LocalState`.
+
+    :param name: the name of the budget, in the backend.
+
+    :param ratio: the share of a token earned by each successful call.
+
+    :param capacity: the maximum number of tokens, and the initial one.
+
+    :raises ValueError: if ratio is negative, or if capacity is less than 1.
+    """
+
+    def __init__(
+        self,
+        backend: StateBackend | None = None,
+        name: str = "default",
+        /,
+        ratio: float = 0.1,
+        capacity: float = 10,
+    ) -> None:
+        if ratio < 0 or capacity < 1:
+            raise ValueError(
+                f"ratio cannot be negative and capacity must be at least 1 "
+                f"({ratio}, {capacity} given)"
+            )
+        self.__backend = LocalState() if backend is None else backend
+        self.__name = name
+        self.__ratio = ratio
+        self.__capacity = capacity
+        # Spent tokens are stored, so that missing budgets are full.
+        self.__key = f"kaioretry.budget.{name}.spent"
+
+    @property
+    def tokens(self) -> float:
+        """The number of tokens left."""
+        return self.__capacity - self.__backend.get(self.__key)
+
+    def __spend(self) -> bool:
+        spent = self.__backend.get(self.__key)
+        while spent + 1 <= self.__capacity:
+            if self.__backend.compare_and_set(self.__key, spent, spent + 1):
+                return True
+            spent = self.__backend.get(self.__key)
+        return False
+
+    def before_retry(self, state: RetryState, _: BaseException) -> None:
+        """The :py:attr:`~kaioretry.Retry.before_retry` hook.
+
+        :raises StopRetrying: if no token is left.
+        """
+        if not self.__spend():
+            raise StopRetrying(f"retry budget {self.__name} is spent")
+        # Kept until the attempt paid for catches an exception.
+        state.data[self] = True
+
+    def after_success(self, _: RetryState, __: Any) -> None:
+        """The :py:attr:`~kaioretry.Retry.after_success` hook."""
+        if self.__ratio:
+            self.__backend.add(self.__key, -self.__ratio, low=0)
+
+    def on_caught_exception(self, state: RetryState, _: BaseException) -> None:
+        """The :py:attr:`~kaioretry.Retry.on_caught_exception` hook."""
+        state.data.pop(self, None)
+
+    def on_give_up(self, state: RetryState, _: BaseException) -> None:
+        """The :py:attr:`~kaioretry.Retry.on_give_up` hook: the token of a
+        retry refused by another hook, or interrupted before it ran, is given
+        back."""
+        if (state.refused or state.sleeping) and state.data.pop(self, None):
+            self.__backend.add(self.__key, -1, low=0)
+
+    def instrument(self, retry: Retry) -> Retry:
+        """Register the hooks of the budget to a
+        :py:class:`~kaioretry.Retry` object.
+
+        :param retry: the object to instrument.
+
+        :returns: the same object.
+        """
+        retry.after_success.append(self.after_success)
+        retry.on_caught_exception.append(self.on_caught_exception)
+        retry.before_retry.append(self.before_retry)
+        retry.on_give_up.append(self.on_give_up)
+        return retry
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return self.__class__, (
+            self.__backend,
+            self.__name,
+            self.__ratio,
+            self.__capacity,
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self.__backend!r}, {self.__name!r}, "
+            f"ratio={self.__ratio}, capacity={self.__capacity})"
+        )
+
+
+__all__ = ["RetryBudget"]
@@ -0,0 +1,168 @@
+"""Clocks are the time keepers of :py:class:`~kaioretry.Context` loops: they
+tell the time, and perform the sleeps between tries, either synchronously or
+asynchronously.
+
+By default, contexts use a :py:class:`RealClock`, that actually waits. A
+:py:class:`VirtualClock` only pretends to: that makes it possible to run
+thousands of tries, with huge delays between them, in a split second, which
+comes in handy for tests and simulations.
+
+.. code-block:: python
+   :caption: A thousand tries, in no time
+
+   >>> from kaioretry import Context, VirtualClock
+   >>> clock = VirtualClock()
+   >>> context = Context(tries=1000, delay=1, clock=clock)
+   >>> len(list(context))
+   1000
+   >>> clock.time()
+   999.0
+
+
+Other ways of sleeping, e.g. cooperative ones, can be used by implementing
+the :py:class:`Clock` interface.
+
+.. code-block:: python
+   :caption: A gevent clock
+
+   import gevent
+   from kaioretry import RealClock
+
+   class GeventClock(RealClock):
+       def sleep(self, delay):
+           gevent.sleep(delay)
+
+"""
+
+import abc
+import time
+import asyncio
+import contextlib
+
+from collections.abc import Awaitable, Iterator
+
+from .types import NonNegative
+
+
+class Clock(abc.ABC):
+    """The interface of clocks."""
+
+    @abc.abstractmethod
+    def time(self) -> float:
+        """Return the current time, in seconds. Only differences between two
+        values are meaningful."""
+
+    @abc.abstractmethod
+    def sleep(self, delay: NonNegative) -> None:
+        """Synchronously sleep.
+
+        :param delay: the number of seconds to sleep.
+        """
+
+    @abc.abstractmethod
+    def asleep(self, delay: NonNegative) -> Awaitable[None]:
+        """Asynchronously sleep.
+
+        :param delay: the number of seconds to sleep.
+
+        :returns: an awaitable that sleeps once awaited.
+        """
+
+
+class RealClock(Clock):
+    """The clock of the real world: :py:func:`time.monotonic`,
+    :py:func:`time.sleep` and :py:func:`asyncio.sleep`.
+    """
+
+    def time(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, delay: NonNegative) -> None:
+        time.sleep(delay)
+
+    def asleep(self, delay: NonNegative) -> Awaitable[None]:
+        return asyncio.sleep(delay)
+
+
+class LoopClock(RealClock):
+    """A clock following the time of the running :py:mod:`asyncio` event
+    loop, which may not be the real time, if the loop implements its own
+    (virtual or accelerated) time. Outside of event loops, it acts as a
+    :py:class:`RealClock`.
+    """
+
+    def time(self) -> float:
+        try:
+            return asyncio.get_running_loop().time()
+        except RuntimeError:
+            return super().time()
+
+
+class VirtualClock(Clock):
+    """A clock that does not wait: sleeping only makes its time advance.
+
+    :param start: the initial time of the clock.
+    """
+
+    def __init__(self, /, start: float = 0) -> None:
+        self.__now = float(start)
+
+    def time(self) -> float:
+        return self.__now
+
+    def sleep(self, delay: NonNegative) -> None:
+        self.__now += delay
+
+    async def __asleep(self, delay: NonNegative) -> None:
+        self.sleep(delay)
+
+    def asleep(self, delay: NonNegative) -> Awaitable[None]:
+        return self.__asleep(delay)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.__now})"
+
+
+DEFAULT_CLOCK = RealClock()
+"""The :py:class:`Clock` used when none is given to the
+:py:class:`~kaioretry.Context` constructor."""
+
+
+_overrides: list[Clock] = []
+
+
+@contextlib.contextmanager
+def override(clock: Clock) -> Iterator[Clock]:
+    """Make every :py:class:`~kaioretry.Context` loop started within the
+    ``with`` block use the given clock, whatever their own clock is. This is
+    process-wide, and is meant for tests.
+
+    :param clock: the overriding clock.
+
+    :returns: a context manager, providing the clock.
+    """
+    _overrides.append(clock)
+    try:
+        yield clock
+    finally:
+        _overrides.remove(clock)
+
+
+def overridden(clock: Clock) -> Clock:
+    """Tell which clock must be used in place of given one.
+
+    :param clock: a clock.
+
+    :returns: the current overriding clock, if any, or the given clock.
+    """
+    return _overrides[-1] if _overrides else clock
+
+
+__all__ = [
+    "Clock",
+    "RealClock",
+    "LoopClock",
+    "VirtualClock",
+    "override",
+    "overridden",
+]
@@ -80,6 +80,38 @@ adding a per-loop identifier to the logs. e.g:
    INFO:kaioretry.context:1c4ddbdb-f2b0-4377-a840-92ea8c651ac1: sleeping 0 seconds
    >>>
 
+The same details are attached to the log records, as attributes that
+structured (e.g. JSON) log handlers can serialise without parsing messages:
+
+* ``kaioretry_event``: ``kaioretry.try`` or ``kaioretry.sleep``;
+* ``kaioretry_loop``: the loop identifier;
+* ``kaioretry_function``: the qualified name of the function the loop is
+  performed for, if given, as :py:class:`~kaioretry.Retry` does;
+* ``kaioretry_attempt``: the number of the upcoming try;
+* ``kaioretry_remaining``: the number of remaining tries, None if unlimited;
+* ``kaioretry_delay``: the delay about to be slept, for ``kaioretry.sleep``
+  events.
+
+With ``log_format="compact"``, messages are reduced to the event names, so
+that they do not even need formatting.
+
+Sleeping is delegated to a :py:class:`~kaioretry.clock.Clock`, which can be
+replaced, e.g. by a :py:class:`~kaioretry.clock.VirtualClock` that does not
+actually wait.
+
+The parameters of the loops form a :py:class:`ContextPolicy`, that can be
+replaced at runtime, e.g. to turn retries down during an incident. Loops
+started afterwards use the new policy. Running loops keep the policy they
+started with, unless the context is built with ``follow_updates=True``: they
+adopt the new policy from their next try on.
+
+.. code-block:: python
+   :caption: Updating a running context
+
+   >>> context = Context(tries=5, delay=1, follow_updates=True)
+   >>> context.update(tries=2, max_delay=0.5)
+   ContextPolicy(2, 1, update_delay=..., max_delay=0.5, min_delay=0)
+
 If you consider this from :py:class:`~kaioretry.Retry` point of view, it means
 that you can keep track of calls, delays and number of tries per calls.
 
@@ -88,64 +120,310 @@ documentation below.
 
 """
 
-import time
-import asyncio
 import logging
+import functools
+import threading
 import uuid
+import contextvars
 
-from typing import cast, Awaitable, Any, TypeVar, Generic, Final
+from typing import cast, Awaitable, Any, TypeVar, Generic, Final, Protocol
 from collections.abc import Callable, Generator, AsyncGenerator
 
-from .types import NonNegative, Number, UpdateDelayFunc
+from .types import (
+    NonNegative,
+    Number,
+    UpdateDelayFunc,
+    DelayStrategy,
+    LogFormat,
+    Function,
+)
+from .clock import Clock, DEFAULT_CLOCK, overridden
+from .hooks import BeforeSleepHook
 
 
 SleepRetVal = TypeVar("SleepRetVal", None, Awaitable[None])
 SleepF = Callable[[Number], SleepRetVal]
 
+# Updates are rare: a single lock serialises those of all contexts.
+_UPDATE_LOCK: Final = threading.Lock()
+
+_T = TypeVar("_T")
+
+
+class _Probe(Protocol):
+    """The CPU time measures of a profiled call: see
+    :py:mod:`kaioretry.overhead`."""
+
+    def start(self) -> None:
+        """Start measuring a part of the overhead."""
+
+    def stop(self, category: str) -> None:
+        """Stop measuring the last part started, adding its CPU time to a
+        category of overhead."""
+
+
+# The probe of the call running in the current context, if it is profiled.
+_probe: contextvars.ContextVar[_Probe | None] = contextvars.ContextVar(
+    "kaioretry_probe", default=None
+)
+
+
+def _probed(
+    category: str, func: Callable[..., _T], /, *args: Any, **kwargs: Any
+) -> _T:
+    """Call a function, measured as a category of overhead if the current
+    call is profiled."""
+    probe = _probe.get()
+    if probe is None:
+        return func(*args, **kwargs)
+    probe.start()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        probe.stop(category)
+
+
+def _same_delay(delay: NonNegative) -> NonNegative:
+    """Default update_delay function: the delay never changes."""
+    return delay
+
+
+class ContextPolicy:
+    """The parameters of a :py:class:`Context` loop: the maximum number of
+    tries and the delays between them. Policies are immutable.
+
+    :param tries: see :py:class:`Context`.
+
+    :param delay: see :py:class:`Context`.
+
+    :param update_delay: see :py:class:`Context`.
+
+    :param max_delay: see :py:class:`Context`.
+
+    :param min_delay: see :py:class:`Context`.
+
+    :raises ValueError: if tries, min_delay or max_delay have incorrect values.
+    """
+
+    def __init__(
+        self,
+        /,
+        tries: int = -1,
+        delay: NonNegative = 0,
+        *,
+        update_delay: UpdateDelayFunc | DelayStrategy = _same_delay,
+        max_delay: NonNegative | None = None,
+        min_delay: NonNegative = 0,
+    ) -> None:
+        if tries == 0:
+            raise ValueError("tries value cannot be 0")
+        if min_delay < 0:
+            raise ValueError(
+                f"min_delay cannot be less than 0. ({min_delay} given)"
+            )
+        if max_delay is not None and max_delay < min_delay:
+            raise ValueError(
+                "min_delay cannot be greater than max_delay. "
+                f"min given: {min_delay}. max given: {max_delay}"
+            )
+        self.__tries = tries
+        self.__delay = delay
+        self.__update_delay = update_delay
+        # Protocol checks are slow: perform it once and for all.
+        self.__per_loop = isinstance(update_delay, DelayStrategy)
+        self.__max_delay = max_delay
+        self.__min_delay = min_delay
+
+    @property
+    def tries(self) -> int:
+        """The maximum number of tries, negative if unlimited."""
+        return self.__tries
+
+    @property
+    def delay(self) -> NonNegative:
+        """The initial delay."""
+        return self.__delay
+
+    @property
+    def update_delay(self) -> UpdateDelayFunc | DelayStrategy:
+        """The function, or strategy, producing the next delay."""
+        return self.__update_delay
+
+    @property
+    def max_delay(self) -> NonNegative | None:
+        """The maximum delay, if any."""
+        return self.__max_delay
+
+    @property
+    def min_delay(self) -> NonNegative:
+        """The minimum delay."""
+        return self.__min_delay
+
+    def replace(self, **changes: Any) -> "ContextPolicy":
+        """Return a copy of the policy, with some parameters changed.
+
+        :param changes: the new values of the parameters, by name.
+
+        :raises ValueError: if the new values are incorrect.
+        :raises TypeError: if a parameter does not exist.
+        """
+        params: dict[str, Any] = {
+            "tries": self.__tries,
+            "delay": self.__delay,
+            "update_delay": self.__update_delay,
+            "max_delay": self.__max_delay,
+            "min_delay": self.__min_delay,
+        }
+        params.update(changes)
+        return self.__class__(**params)
+
+    def loop(
+        self, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> UpdateDelayFunc:
+        """Return the function producing the next delay of a loop: the one
+        a :py:class:`~kaioretry.types.DelayStrategy` provides for the call
+        arguments, or update_delay itself.
+
+        :param args: the positional arguments of the call.
+
+        :param kwargs: the keyword arguments of the call.
+        """
+        if self.__per_loop:
+            return cast(DelayStrategy, self.__update_delay).loop(args, kwargs)
+        return cast(UpdateDelayFunc, self.__update_delay)
+
+    def bound(self, delay: NonNegative) -> NonNegative:
+        """Return a delay bounded to min_delay and max_delay.
+
+        :param delay: the delay to bound.
+        """
+        if self.__max_delay is not None:
+            delay = min(delay, self.__max_delay)
+        return max(delay, self.__min_delay)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self.__tries}, {self.__delay}, "
+            f"update_delay={self.__update_delay!r}, "
+            f"max_delay={self.__max_delay}, min_delay={self.__min_delay})"
+        )
+
 
 class _ContextIterator(Generic[SleepRetVal]):
     """Single-usage helper class for Context objects."""
 
-    # pylint: disable=too-few-public-methods
+    # pylint: disable=too-few-public-methods, too-many-instance-attributes
 
     def __init__(
         self,
         identifier: uuid.UUID,
         sleep: SleepF[Any],
-        tries: int,
-        delay: NonNegative,
-        update_delay: UpdateDelayFunc,
+        policy: ContextPolicy,
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+        current: Callable[[], ContextPolicy] | None,
+        before_retry: Callable[[], bool] | None,
+        function: str | None,
         logger: logging.Logger,
+        compact: bool,
         /,
     ) -> None:
         # pylint: disable=too-many-arguments, too-many-positional-arguments
         self.__identifier = identifier
+        self.__function = function
         self.__sleep = sleep
-        self.__delay = delay
-        self.__update_delay = update_delay
+        self.__policy = policy
+        self.__args = args
+        self.__kwargs = kwargs
+        self.__current = current
+        self.__before_retry = before_retry
+        self.__delay = policy.delay
+        self.__update_delay = policy.loop(args, kwargs)
         self.__logger = logger
+        self.__compact = compact
+        self.__attempt = 1
+        self.__count(policy.tries, 0)
+
+    def __count(self, tries: int, done: int) -> None:
+        """Set the count of remaining tries, after done tries."""
         if tries > 0:
-            self.__tries = tries
+            self.__tries = max(tries - done, 0)
             self.__log_try = "%d tries remaining"
         else:
-            self.__tries = -1
+            # Unlimited loops count down from -1, and log abs(count).
+            self.__tries = -done - 1
             self.__log_try = "try #%d"
 
-    def __log(self, level: int, fmt: str, *args: Any) -> None:
-        """Log a message with some more context"""
-        self.__logger.log(level, f"{self.__identifier}: {fmt}", *args)
+    def __follow(self) -> None:
+        """Adopt the current policy of the context, if it changed."""
+        if self.__current is None:
+            return
+        policy = self.__current()
+        if policy is self.__policy:
+            return
+        if policy.update_delay is not self.__policy.update_delay:
+            self.__update_delay = policy.loop(self.__args, self.__kwargs)
+        self.__policy = policy
+        self.__delay = policy.bound(self.__delay)
+        self.__count(policy.tries, self.__attempt)
+
+    def __log(
+        self, level: int, event: str, fmt: str, value: Any, **extra: Any
+    ) -> None:
+        """Log a message with some more context, both in the message and as
+        record attributes"""
+        if not self.__logger.isEnabledFor(level):
+            return
+        extra["kaioretry_event"] = event
+        extra["kaioretry_loop"] = str(self.__identifier)
+        extra["kaioretry_function"] = self.__function
+        extra["kaioretry_attempt"] = self.__attempt
+        extra["kaioretry_remaining"] = (
+            self.__tries if self.__tries > 0 else None
+        )
+        args: tuple[Any, ...] = ()
+        if self.__compact:
+            fmt = event
+        else:
+            fmt, args = f"{self.__identifier}: {fmt}", (value,)
+        # The record must point at this method, not at _probed.
+        _probed(
+            "logging",
+            self.__logger.log,
+            level,
+            fmt,
+            *args,
+            extra=extra,
+            stacklevel=2,
+        )
 
     def _sleep(self) -> SleepRetVal:
-        self.__log(logging.INFO, "sleeping %s seconds", self.__delay)
+        self.__log(
+            logging.INFO,
+            "kaioretry.sleep",
+            "sleeping %s seconds",
+            self.__delay,
+            kaioretry_delay=self.__delay,
+        )
         return cast(SleepRetVal, self.__sleep(self.__delay))
 
+    def __next_delay(self) -> NonNegative:
+        return self.__policy.bound(self.__update_delay(self.__delay))
+
     def __iter__(self) -> Generator[SleepRetVal, None, None]:
         self.__tries -= 1
+        self.__follow()
         while self.__tries:
-            self.__log(logging.INFO, self.__log_try, abs(self.__tries))
-            yield self._sleep()
-            self.__delay = self.__update_delay(self.__delay)
+            if self.__before_retry is not None and not self.__before_retry():
+                return
+            self.__attempt += 1
+            self.__log(
+                logging.INFO, "kaioretry.try", self.__log_try, abs(self.__tries)
+            )
+            yield _probed("sleep", self._sleep)
+            self.__delay = _probed("sleep", self.__next_delay)
             self.__tries -= 1
+            self.__follow()
 
 
 class Context:
@@ -161,6 +439,11 @@ class Context:
     :py:class:`~kaioretry.context.Context`, synchronously, or
     asynchronously, depending of the nature of the decorated function.
 
+    Iterating does not alter the Context object itself: each loop keeps its
+    own try count and delay. So the same object, like
+    :py:attr:`Retry.DEFAULT_CONTEXT <kaioretry.Retry.DEFAULT_CONTEXT>`, can be
+    used by several threads at the same time, without any locking.
+
     :param tries: the maximum number of iterations (a.k.a.: tries,
         function calls) to perform before exhaustion. A negative value
         means infinite. 0 is forbidden, since it would mean "don't
@@ -171,7 +454,11 @@ class Context:
 
     :param update_delay: a function that will produce the next value of delay
         value. Can be anything as long as it produces a positive number when
-        called.
+        called. To keep the context picklable, prefer a
+        :py:class:`~kaioretry.Backoff` object, or any module-level function,
+        over a lambda. If it is a
+        :py:class:`~kaioretry.types.DelayStrategy`, a new function will be
+        obtained from it for each loop.
 
     :param max_delay: the maximum value allowed for delay. If None
         (the default), then delay is unlimited. Cannot be negative.
@@ -182,6 +469,18 @@ class Context:
     :param logger: the :py:class:`logging.Logger` object to which the
         log messages will be sent to.
 
+    :param clock: the :py:class:`~kaioretry.clock.Clock` performing the
+        sleeps. By default, a :py:class:`~kaioretry.clock.RealClock`.
+
+    :param log_format: ``"text"`` (the default) for human-readable log
+        messages, or ``"compact"`` for messages reduced to event names. In
+        both cases, details are available as log record attributes.
+
+    :param follow_updates: whether running loops adopt the policies given
+        to :py:meth:`update`, from their next try on. They keep their number
+        of tries done and their current delay, within the new bounds.
+        Default: False (running loops keep the policy they started with).
+
     :raises ValueError: if tries, min_delay or max_delay have incorrect values.
 
     .. automethod:: __iter__
@@ -189,6 +488,8 @@ class Context:
 
     """
 
+    # pylint: disable=too-many-instance-attributes
+
     DEFAULT_LOGGER: Final[logging.Logger] = logging.getLogger(__name__)
     """The :py:class:`logging.Logger` object that will be used if none
     are provided to the constructor.
@@ -200,84 +501,198 @@ class Context:
         tries: int = -1,
         delay: NonNegative = 0,
         *,
-        update_delay: UpdateDelayFunc = lambda value: value,
+        update_delay: UpdateDelayFunc | DelayStrategy = _same_delay,
         max_delay: NonNegative | None = None,
         min_delay: NonNegative = 0,
         logger: logging.Logger = DEFAULT_LOGGER,
+        clock: Clock = DEFAULT_CLOCK,
+        log_format: LogFormat = "text",
+        follow_updates: bool = False,
     ) -> None:
         # pylint: disable=too-many-arguments
-        if tries == 0:
-            raise ValueError("tries value cannot be 0")
-        self.__tries = tries
-        self.__delay = delay
-        self.__update_delay_value = update_delay
-        if min_delay < 0:
-            raise ValueError(
-                f"min_delay cannot be less than 0. ({min_delay} given)"
-            )
-        self.__min_delay = min_delay
-        if max_delay is not None and max_delay < min_delay:
-            raise ValueError(
-                "min_delay cannot be greater than max_delay. "
-                f"min given: {min_delay}. max given: {max_delay}"
-            )
-        self.__max_delay = max_delay
-        self.__str = (
-            f"{self.__class__.__name__}("
-            f"tries={tries}, "
-            f"delay=({min_delay}<={delay}<={max_delay}))"
+        self.__policy = ContextPolicy(
+            tries=tries,
+            delay=delay,
+            update_delay=update_delay,
+            max_delay=max_delay,
+            min_delay=min_delay,
         )
+        self.__follow_updates = follow_updates
         self.__logger = logger
+        self.__compact_logs = log_format == "compact"
+        self.__clock = clock
+        self.__before_sleep: list[BeforeSleepHook] = []
+
+    @property
+    def policy(self) -> ContextPolicy:
+        """The current parameters of the loops."""
+        return self.__policy
 
-    def __update_delay(self, delay: NonNegative) -> NonNegative:
-        """Compute the updated values for given delay.
+    @property
+    def tries(self) -> int:
+        """The maximum number of tries, negative if unlimited."""
+        return self.__policy.tries
 
-        :param delay: the current value of delay between iterations.
+    def update(
+        self, policy: ContextPolicy | None = None, /, **changes: Any
+    ) -> ContextPolicy:
+        """Replace the parameters of the loops, atomically: loops started
+        afterwards use the new policy. Running loops adopt it at their next
+        try if the context follows updates, and keep theirs otherwise.
 
-        :returns: the new duration to wait for before the next iteration.
+        :param policy: the new policy. Default: the current one.
+
+        :param changes: parameters of the policy to change, by name, such as
+            ``tries`` or ``max_delay``.
+
+        :returns: the new policy.
+
+        :raises ValueError: if the new values are incorrect. The policy does
+            not change, then.
+        :raises TypeError: if a parameter does not exist.
         """
-        delay = self.__update_delay_value(delay)
-        if self.__max_delay is not None:
-            delay = min(delay, self.__max_delay)
-        delay = max(delay, self.__min_delay)
-        return delay
+        with _UPDATE_LOCK:
+            policy = (policy or self.__policy).replace(**changes)
+            self.__policy = policy
+        extra = {"kaioretry_event": "kaioretry.update"}
+        if self.__compact_logs:
+            self.__logger.info("kaioretry.update", extra=extra)
+        else:
+            self.__logger.info("%s updated: %r", self, policy, extra=extra)
+        return policy
+
+    def __current_policy(self) -> ContextPolicy:
+        return self.__policy
+
+    @property
+    def before_sleep(self) -> list[BeforeSleepHook]:
+        """The hooks called before sleeping between two tries, with the
+        delay. See :py:mod:`kaioretry.hooks`."""
+        return self.__before_sleep
+
+    def __call_before_sleep(self, delay: NonNegative) -> None:
+        for hook in self.__before_sleep:
+            hook(delay)
+
+    def __hooked_sleep(
+        self, sleep: SleepF[SleepRetVal], delay: NonNegative
+    ) -> SleepRetVal:
+        _probed("hooks", self.__call_before_sleep, delay)
+        return sleep(delay)
 
     def __make_iterator(
-        self, sleep: SleepF[SleepRetVal]
+        self,
+        policy: ContextPolicy,
+        sleep: SleepF[SleepRetVal],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any] | None,
+        before_retry: Callable[[], bool] | None,
+        func: Function | None,
     ) -> Generator[SleepRetVal, None, None]:
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
+        if self.__before_sleep:
+            sleep = functools.partial(self.__hooked_sleep, sleep)
         return iter(
             _ContextIterator(
                 uuid.uuid4(),
                 sleep,
-                self.__tries,
-                self.__delay,
-                self.__update_delay,
+                policy,
+                args,
+                kwargs or {},
+                self.__current_policy if self.__follow_updates else None,
+                before_retry,
+                None if func is None else func.__qualname__,
                 self.__logger,
+                self.__compact_logs,
             )
         )
 
-    def __iter__(self) -> Generator[None, None, None]:
-        """Returns a generator that perform sleep (using regular
-        :py:func:`time.sleep`) between iterations in order to induce delay as
-        instructed.
+    @property
+    def clock(self) -> Clock:
+        """The clock loops use, unless it is overridden by
+        :py:func:`~kaioretry.clock.override`."""
+        return overridden(self.__clock)
+
+    def iterate(
+        self,
+        /,
+        args: tuple[Any, ...] = (),
+        kwargs: dict[str, Any] | None = None,
+        *,
+        before_retry: Callable[[], bool] | None = None,
+        func: Function | None = None,
+    ) -> Generator[None, None, None]:
+        """Returns a generator that perform sleep (using the clock, which
+        defaults to regular :py:func:`time.sleep`) between iterations in order
+        to induce delay as instructed.
 
+        The loop uses the policy of the context as of its first iteration.
+
+        :param args: the positional arguments of the function call the loop
+            is performed for, if any. They are given to the
+            :py:class:`~kaioretry.types.DelayStrategy`, if any.
+
+        :param kwargs: the keyword arguments of said function call.
+
+        :param before_retry: a function called whenever another iteration
+            follows, before sleeping. If it returns False, the loop ends
+            instead.
+
+        :param func: the function the loop is performed for, if any. Its
+            qualified name is attached to log records.
         """
+        policy = self.__policy
         yield
-        yield from self.__make_iterator(time.sleep)
+        clock = overridden(self.__clock)
+        yield from self.__make_iterator(
+            policy, clock.sleep, args, kwargs, before_retry, func
+        )
+
+    async def aiterate(
+        self,
+        /,
+        args: tuple[Any, ...] = (),
+        kwargs: dict[str, Any] | None = None,
+        *,
+        before_retry: Callable[[], bool] | None = None,
+        func: Function | None = None,
+    ) -> AsyncGenerator[None, None]:
+        """Returns a asynchronous generator that perform sleep through the
+        clock (which defaults to :py:func:`asyncio.sleep`) between iterations
+        in order to induce delay as instructed.
+
+        :param args: see :py:meth:`iterate`.
 
-    async def __aiter__(self) -> AsyncGenerator[None, None]:
-        """Returns a asynchronous generator that perform sleep through
-        :py:func:`asyncio.sleep` between iterations in order to induce delay
-        as instructed.
+        :param kwargs: see :py:meth:`iterate`.
 
+        :param before_retry: see :py:meth:`iterate`.
+
+        :param func: see :py:meth:`iterate`.
         """
+        policy = self.__policy
         yield
-        for sleep in self.__make_iterator(asyncio.sleep):
+        clock = overridden(self.__clock)
+        for sleep in self.__make_iterator(
+            policy, clock.asleep, args, kwargs, before_retry, func
+        ):
             await sleep
             yield
 
+    def __iter__(self) -> Generator[None, None, None]:
+        """Same as :py:meth:`iterate`, for a call without arguments."""
+        return self.iterate()
+
+    def __aiter__(self) -> AsyncGenerator[None, None]:
+        """Same as :py:meth:`aiterate`, for a call without arguments."""
+        return self.aiterate()
+
     def __str__(self) -> str:
-        return self.__str
+        policy = self.__policy
+        return (
+            f"{self.__class__.__name__}("
+            f"tries={policy.tries}, "
+            f"delay=({policy.min_delay}<={policy.delay}<={policy.max_delay}))"
+        )
 
 
-__all__ = ["Context"]
+__all__ = ["ContextPolicy", "Context"]
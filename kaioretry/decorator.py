@@ -71,18 +71,76 @@ To refine the number of tries, or delay between said tries. You must use a
        ...
 
 
+Functions produced by :py:class:`~kaioretry.Retry` can be pickled, as long as
+the :py:class:`~kaioretry.Retry` object and the original function can be. If
+the decorated function can be found by its qualified name, it is pickled by
+reference, like any regular function. Otherwise, it is pickled as its
+:py:class:`~kaioretry.Retry` object and original function, and decorated
+again when unpickled. That makes it possible to send retrying functions to a
+:py:class:`concurrent.futures.ProcessPoolExecutor`.
+
+.. code-block:: python
+   :caption: Retrying in another process.
+
+   from concurrent.futures import ProcessPoolExecutor
+   from kaioretry import Context, Retry
+
+   def crunch(data):
+       ...
+
+   with ProcessPoolExecutor() as executor:
+       retry = Retry(ValueError, context=Context(tries=3, delay=1))
+       executor.map(retry(crunch), datasets)
+
+
+The exception caught while backing off is kept until the next attempt: its
+traceback, and the local variables of all its frames, with it. With
+``release_tracebacks=True``, the tracebacks of the exceptions caught before
+the last try are replaced by a note summing them up, that
+:py:mod:`traceback` prints along with the message. The exception of the last
+try keeps its traceback.
+
+.. code-block:: python
+   :caption: Releasing frames while backing off
+
+   retry = Retry(ValueError, Context(tries=5, delay=10),
+                 release_tracebacks=True)
+
+
+Only the exception of the last attempt is raised once tries are exhausted.
+With ``history``, those of the first and the last attempts are raised
+together in an :py:class:`ExceptionGroup`, whatever the number of tries:
+
+.. code-block:: python
+   :caption: Raising the exceptions of the first 2 and the last 2 attempts
+
+   retry = Retry(ValueError, Context(tries=-1, delay=10), history=2)
+
+   try:
+       retry(something_failing)()
+   except* ValueError as group:
+       for error in group.exceptions:
+           print(error, error.__notes__)  # e.g. "attempt #1"
+
+
 Check out the classes documentation and attributes for more fine tuning.
 
 """
 
+import sys
+import types
 import inspect
 import logging
 import functools
+import traceback
+
+from collections import deque
 
 from collections.abc import Callable, Awaitable
 from typing import (
     cast,
     Any,
+    Generic,
     NoReturn,
     Awaitable as OldAwaitable,
     overload,
@@ -99,8 +157,161 @@ from .types import (
     AioretryCoro,
     AwaitableFunc,
     AnyFunction,
+    LogFormat,
 )
-from .context import Context
+from .clock import Clock
+from .context import Context, _probed
+from .metrics import MetricsCollector
+from .stats import StatsRecorder, StatsSnapshot
+from .hooks import (
+    StopRetrying,
+    RetryState,
+    RetryHooks,
+    BeforeAttemptHook,
+    AfterSuccessHook,
+    ErrorHook,
+)
+
+
+_Run = Callable[[Function, tuple[Any, ...], dict[str, Any]], FuncRetVal]
+
+
+def _release_traceback(error: BaseException) -> None:
+    """Replace the tracebacks of an exception, and of the exceptions chained
+    to it, by notes summing them up, so that their frames can be freed."""
+    pending, seen = [error], set()
+    while pending:
+        exc = pending.pop()
+        if id(exc) in seen:
+            continue
+        seen.add(id(exc))
+        if exc.__traceback__ is not None:
+            summary = "".join(traceback.format_tb(exc.__traceback__))
+            exc.add_note(f"Traceback (released):\n{summary.rstrip()}")
+            exc.__traceback__ = None
+        if isinstance(exc, BaseExceptionGroup):
+            pending.extend(exc.exceptions)
+        pending.extend(
+            chained
+            for chained in (exc.__cause__, exc.__context__)
+            if chained is not None
+        )
+
+
+class _AttemptHistory:
+    """The exceptions caught by the first and the last attempts of a call.
+
+    :param size: the number of first, and of last, attempts to remember.
+    """
+
+    def __init__(self, size: int, /) -> None:
+        self.__size = size
+        self.__first: list[tuple[int, BaseException]] = []
+        self.__last: deque[tuple[int, BaseException]] = deque(maxlen=size)
+        self.__count = 0
+        self.__latest: BaseException | None = None
+
+    def add(self, attempt: int, error: BaseException) -> None:
+        """Remember the exception caught by an attempt."""
+        # Only the exception that may be raised as is keeps its traceback.
+        if self.__latest is not None and self.__latest is not error:
+            _release_traceback(self.__latest)
+        self.__latest = error
+        self.__count += 1
+        if len(self.__first) < self.__size:
+            self.__first.append((attempt, error))
+        else:
+            self.__last.append((attempt, error))
+
+    def group(self, func: Function) -> BaseExceptionGroup[BaseException]:
+        """Return the group of the remembered exceptions, numbered by notes.
+
+        :param func: the function that failed.
+        """
+        errors = []
+        for attempt, error in (*self.__first, *self.__last):
+            error.add_note(f"attempt #{attempt}")
+            errors.append(error)
+        message = f"{func.__qualname__} failed {self.__count} times"
+        if (omitted := self.__count - len(errors)) > 0:
+            message += f" ({omitted} omitted)"
+        return BaseExceptionGroup(message, errors)
+
+
+async def _coroutine_function() -> None:
+    """A coroutine function, lending its code to the wrappers of coroutine
+    functions. See :py:func:`_mark_coroutine_function`."""
+
+
+def _mark_coroutine_function(wrapper: Callable[..., Any]) -> None:
+    """Make :py:func:`inspect.iscoroutinefunction` and
+    :py:func:`asyncio.iscoroutinefunction` recognize a wrapper returning
+    coroutines.
+
+    Python 3.12 provides :py:func:`inspect.markcoroutinefunction` for that.
+    Before, inspect only recognizes coroutine functions by the flags of their
+    code: the wrapper is given the code of a coroutine function, along with
+    the attributes inspect requires from function-like objects.
+    """
+    if sys.version_info >= (3, 12):  # pragma: nocover
+        # pylint: disable=no-member
+        inspect.markcoroutinefunction(wrapper)
+        return
+    setattr(wrapper, "__code__", _coroutine_function.__code__)
+    for attr in ("__defaults__", "__kwdefaults__"):
+        if not hasattr(wrapper, attr):
+            setattr(wrapper, attr, None)
+
+
+class _Wrapper(Generic[FuncParam, FuncRetVal]):
+    """The functions produced by the :py:class:`Retry` decorators.
+
+    Being a class instead of a closure allows them to be pickled.
+
+    :param decorate: the decorator that produced this object. It will be
+        used again to decorate the original function on unpickling.
+
+    :param run: the function actually in charge of the retry process.
+
+    :param func: the decorated function.
+    """
+
+    def __init__(
+        self,
+        decorate: Callable[[Callable[FuncParam, Any]], Any],
+        run: _Run[FuncRetVal],
+        func: Callable[FuncParam, Any],
+        /,
+    ) -> None:
+        functools.update_wrapper(self, func)
+        self.__decorate = decorate
+        self.__run = run
+        self.__func = func
+
+    def __call__(
+        self, *args: FuncParam.args, **kwargs: FuncParam.kwargs
+    ) -> FuncRetVal:
+        return self.__run(self.__func, args, kwargs)
+
+    def __get__(self, instance: Any, owner: type | None = None) -> Any:
+        """Behave like regular functions when used as methods."""
+        if instance is None:
+            return self
+        return types.MethodType(self, instance)
+
+    def __reduce__(self) -> str | tuple[Any, ...]:
+        """Pickle the object by reference if it can be found through its
+        qualified name (as regular functions are), or pickle the decorator and
+        the original function otherwise.
+        """
+        # Set by functools.update_wrapper.
+        qualname: str = getattr(self, "__qualname__")
+        obj: Any = sys.modules.get(self.__module__)
+        for name in qualname.split("."):
+            obj = getattr(obj, name, None)
+        if obj is self:
+            return qualname
+        return self.__decorate, (self.__func,)
 
 
 class Retry:
@@ -134,9 +345,41 @@ class Retry:
     :param logger: the :py:class:`logging.Logger` to which the log
         messages will be sent to.
 
+    :param metrics: the :py:class:`~kaioretry.metrics.MetricsCollector`
+        collecting the metrics of the decorated functions. If None (the
+        default), no metrics are collected.
+
+    :param log_format: ``"text"`` (the default) for human-readable log
+        messages, or ``"compact"`` for messages reduced to event names:
+        ``kaioretry.caught``, ``kaioretry.failed`` or
+        ``kaioretry.succeeded``. In both cases, log records have the
+        ``kaioretry_event``, ``kaioretry_function`` (qualified name) and
+        ``kaioretry_attempt`` attributes, and a ``kaioretry_exception``
+        (class qualified name) attribute if an exception was raised.
+
+    :param stats: whether to keep live statistics of the decorated
+        functions. If True, decorated functions have a ``stats`` attribute,
+        a :py:class:`~kaioretry.stats.FunctionStats` object, and the
+        :py:meth:`stats` method sums them up. Default: False.
+
+    :param release_tracebacks: whether to release the frames of the
+        exceptions caught before the last try, so that they are not kept
+        alive while backing off. Their tracebacks, and those of their chained
+        exceptions, are replaced by notes summing them up. Default: False.
+
+    :param history: if positive, the exceptions of the ``history`` first
+        attempts, and of the ``history`` last ones, are raised together in
+        an :py:class:`ExceptionGroup` once tries are exhausted, numbered by
+        notes. Only the exception of the last attempt keeps its traceback.
+        Default: 0 (the exception of the last attempt is raised alone).
+
+    :raises ValueError: if history is negative.
+
     .. automethod:: __call__
     """
 
+    # pylint: disable=too-many-instance-attributes
+
     DEFAULT_LOGGER: Final[logging.Logger] = logging.getLogger(__name__)
     """The :py:class:`logging.Logger` object that will be used if none
     are provided to the constructor.
@@ -156,10 +399,31 @@ class Retry:
         context: Context = DEFAULT_CONTEXT,
         *,
         logger: logging.Logger = DEFAULT_LOGGER,
+        metrics: MetricsCollector | None = None,
+        log_format: LogFormat = "text",
+        stats: bool = False,
+        release_tracebacks: bool = False,
+        history: int = 0,
     ) -> None:
+        # pylint: disable=too-many-arguments
+        if history < 0:
+            raise ValueError(f"history cannot be negative ({history} given)")
         self.__exceptions = exceptions
         self.__context = context
         self.__logger = logger
+        self.__compact_logs = log_format == "compact"
+        self.__release_tracebacks = release_tracebacks
+        self.__history = history
+        self.__before_attempt: list[BeforeAttemptHook] = []
+        self.__after_success: list[AfterSuccessHook] = []
+        self.__on_caught_exception: list[ErrorHook] = []
+        self.__before_retry: list[ErrorHook] = []
+        self.__on_give_up: list[ErrorHook] = []
+        if metrics is not None:
+            self.add_hooks(metrics)
+        self.__stats = StatsRecorder() if stats else None
+        if self.__stats is not None:
+            self.add_hooks(self.__stats)
         if isinstance(exceptions, type(BaseException)):
             exc_str = exceptions.__name__
         else:
@@ -167,29 +431,348 @@ class Retry:
                 exception.__name__
                 for exception in cast(ExceptionList, exceptions)
             )
-        self.__str = f"{self.__class__.__name__}({exc_str}, {context})"
+        self.__exc_str = exc_str
+
+    @property
+    def exceptions(self) -> Exceptions:
+        """The exceptions that are retried."""
+        return self.__exceptions
+
+    @property
+    def context(self) -> Context:
+        """The :py:class:`~kaioretry.Context` of the tries."""
+        return self.__context
+
+    @property
+    def before_attempt(self) -> list[BeforeAttemptHook]:
+        """The hooks called before each attempt. See
+        :py:mod:`kaioretry.hooks`."""
+        return self.__before_attempt
+
+    @property
+    def after_success(self) -> list[AfterSuccessHook]:
+        """The hooks called after a successful attempt. See
+        :py:mod:`kaioretry.hooks`."""
+        return self.__after_success
+
+    @property
+    def on_caught_exception(self) -> list[ErrorHook]:
+        """The hooks called after an attempt raised an exception caught by
+        this object, including the last try. See :py:mod:`kaioretry.hooks`."""
+        return self.__on_caught_exception
+
+    @property
+    def before_retry(self) -> list[ErrorHook]:
+        """The hooks called before sleeping between two tries, with the
+        exception of the previous one. They may refuse the next try. See
+        :py:mod:`kaioretry.hooks`."""
+        return self.__before_retry
+
+    @property
+    def on_give_up(self) -> list[ErrorHook]:
+        """The hooks called before an exception is propagated. See
+        :py:mod:`kaioretry.hooks`."""
+        return self.__on_give_up
+
+    def add_hooks(self, hooks: RetryHooks) -> "Retry":
+        """Register the hooks of an object at once.
+
+        :param hooks: an object with a method per hook point.
+
+        :returns: this object.
+        """
+        self.__before_attempt.append(hooks.before_attempt)
+        self.__after_success.append(hooks.after_success)
+        self.__on_caught_exception.append(hooks.on_caught_exception)
+        self.__on_give_up.append(hooks.on_give_up)
+        return self
+
+    def stats(self) -> StatsSnapshot:
+        """Sum up the statistics of all the functions decorated so far.
+
+        :returns: a :py:class:`~kaioretry.stats.StatsSnapshot`.
 
-    def __log(self, level: int, fmt: str, *args: Any) -> None:
-        self.__logger.log(level, f"{self}: {fmt}", *args)
+        :raises ValueError: if the object was not created with
+            ``stats=True``.
+        """
+        if self.__stats is None:
+            raise ValueError(f"{self} does not keep statistics")
+        return self.__stats.snapshot()
+
+    def __log(
+        self,
+        level: int,
+        event: str,
+        fmt: str,
+        args: tuple[Any, ...],
+        func: Function,
+        attempt: int,
+        error: BaseException | None = None,
+    ) -> None:
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
+        if not self.__logger.isEnabledFor(level):
+            return
+        extra = {
+            "kaioretry_event": event,
+            "kaioretry_function": func.__qualname__,
+            "kaioretry_attempt": attempt,
+        }
+        if error is not None:
+            extra["kaioretry_exception"] = error.__class__.__qualname__
+        if self.__compact_logs:
+            fmt, args = event, ()
+        else:
+            fmt = f"{self}: {fmt}"
+        log = self.__logger.log
+        _probed("logging", log, level, fmt, *args, extra=extra, stacklevel=2)
+
+    def __new_history(self) -> _AttemptHistory | None:
+        return _AttemptHistory(self.__history) if self.__history else None
 
-    def __caught_error(self, func: Function, error: BaseException) -> None:
+    def __caught_error(
+        self,
+        func: Function,
+        attempt: int,
+        error: BaseException,
+        history: _AttemptHistory | None,
+    ) -> None:
         self.__log(
             logging.WARN,
+            "kaioretry.caught",
             "%s caught while running %s: %s",
-            error.__class__.__qualname__,
-            func.__qualname__,
+            (error.__class__.__qualname__, func.__qualname__, error),
+            func,
+            attempt,
             error,
         )
+        if history is not None:
+            history.add(attempt, error)
 
-    def __final_error(self, func: Function, error: BaseException) -> NoReturn:
-        self.__log(logging.WARN, "%s failed to complete", func.__qualname__)
+    def __final_error(
+        self,
+        func: Function,
+        attempt: int,
+        error: BaseException,
+        history: _AttemptHistory | None,
+    ) -> NoReturn:
+        self.__log(
+            logging.WARN,
+            "kaioretry.failed",
+            "%s failed to complete",
+            (func.__qualname__,),
+            func,
+            attempt,
+            error,
+        )
+        if history is not None:
+            raise history.group(func)
         raise error
 
-    def __success(self, func: Function) -> None:
+    def __success(self, func: Function, attempt: int) -> None:
         self.__log(
-            logging.DEBUG, "%s has succesfully completed", func.__qualname__
+            logging.DEBUG,
+            "kaioretry.succeeded",
+            "%s has succesfully completed",
+            (func.__qualname__,),
+            func,
+            attempt,
+        )
+
+    def __run(
+        self, func: Function, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> Any:
+        # pylint: disable=inconsistent-return-statements
+        if self.__hooked():
+            return self.__hooked_run(func, args, kwargs)
+        attempt, history = 0, self.__new_history()
+
+        def release() -> bool:
+            _release_traceback(last_error)
+            return True
+
+        before_retry = release if self.__release_tracebacks else None
+        for _ in self.__context.iterate(
+            args, kwargs, before_retry=before_retry, func=func
+        ):
+            attempt += 1
+            try:
+                result = func(*args, **kwargs)
+                self.__success(func, attempt)
+                return result
+            # It does not matter if it's broad :p this is user
+            # configuration.
+            # pylint: disable=broad-except
+            except self.__exceptions as error:
+                self.__caught_error(func, attempt, error, history)
+                last_error = error
+                continue
+        self.__final_error(func, attempt, last_error, history)
+
+    async def __arun(
+        self, func: Function, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> Any:
+        if self.__hooked():
+            return await self.__hooked_arun(func, args, kwargs)
+        attempt, history = 0, self.__new_history()
+
+        def release() -> bool:
+            _release_traceback(last_error)
+            return True
+
+        before_retry = release if self.__release_tracebacks else None
+        async for _ in self.__context.aiterate(
+            args, kwargs, before_retry=before_retry, func=func
+        ):
+            attempt += 1
+            try:
+                result = func(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    result = await result
+                self.__success(func, attempt)
+                return result
+            # pylint: disable=broad-except
+            except self.__exceptions as error:
+                self.__caught_error(func, attempt, error, history)
+                last_error = error
+                continue
+        self.__final_error(func, attempt, last_error, history)
+
+    def __hooked(self) -> bool:
+        return bool(
+            self.__before_attempt
+            or self.__after_success
+            or self.__on_caught_exception
+            or self.__before_retry
+            or self.__on_give_up
         )
 
+    @staticmethod
+    def __call_all(hooks: list[Any], *args: Any) -> None:
+        for hook in hooks:
+            hook(*args)
+
+    @staticmethod
+    def __call_hooks(hooks: list[Any], *args: Any) -> None:
+        if hooks:
+            _probed("hooks", Retry.__call_all, hooks, *args)
+
+    def __start_attempt(self, state: RetryState, clock: Clock) -> None:
+        state.attempt += 1
+        state.start = clock.time()
+        state.sleeping = False
+        try:
+            self.__call_hooks(self.__before_attempt, state)
+        except BaseException:
+            # The attempt fails, and the call with it, without retrying.
+            state.refused = True
+            raise
+
+    def __retry(self, state: RetryState, error: BaseException) -> bool:
+        try:
+            self.__call_hooks(self.__before_retry, state, error)
+        except StopRetrying:
+            # The call ends as if it ran out of tries.
+            state.refused = True
+            return False
+        except BaseException:
+            state.refused = True
+            raise
+        if self.__release_tracebacks:
+            _release_traceback(error)
+        state.sleeping = True
+        return True
+
+    def __give_up(
+        self, state: RetryState, clock: Clock, error: BaseException
+    ) -> None:
+        if not state.exhausted:
+            state.end = clock.time()
+        self.__call_hooks(self.__on_give_up, state, error)
+
+    def __hooked_run(
+        self, func: Function, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> Any:
+        # pylint: disable=broad-except, used-before-assignment
+        state, clock = RetryState(func, args, kwargs), self.__context.clock
+        history = self.__new_history()
+
+        def before_retry() -> bool:
+            return self.__retry(state, last_error)
+
+        try:
+            for _ in self.__context.iterate(
+                args, kwargs, before_retry=before_retry, func=func
+            ):
+                self.__start_attempt(state, clock)
+                try:
+                    result = func(*args, **kwargs)
+                except self.__exceptions as error:
+                    state.end = clock.time()
+                    self.__call_hooks(self.__on_caught_exception, state, error)
+                    self.__caught_error(func, state.attempt, error, history)
+                    last_error = error
+                    continue
+                state.end = clock.time()
+                break
+            else:
+                state.exhausted = True
+        except BaseException as error:
+            # An attempt raised an exception that is not retried, a hook
+            # refused an attempt, or the sleep was interrupted.
+            self.__give_up(state, clock, error)
+            raise
+        if state.exhausted:
+            self.__give_up(state, clock, last_error)
+            self.__final_error(func, state.attempt, last_error, history)
+        self.__call_hooks(self.__after_success, state, result)
+        self.__success(func, state.attempt)
+        return result
+
+    async def __hooked_arun(
+        self, func: Function, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> Any:
+        # pylint: disable=broad-except, used-before-assignment
+        state, clock = RetryState(func, args, kwargs), self.__context.clock
+        history = self.__new_history()
+
+        def before_retry() -> bool:
+            return self.__retry(state, last_error)
+
+        try:
+            async for _ in self.__context.aiterate(
+                args, kwargs, before_retry=before_retry, func=func
+            ):
+                self.__start_attempt(state, clock)
+                try:
+                    result = func(*args, **kwargs)
+                    if inspect.isawaitable(result):
+                        result = await result
+                except self.__exceptions as error:
+                    state.end = clock.time()
+                    self.__call_hooks(self.__on_caught_exception, state, error)
+                    self.__caught_error(func, state.attempt, error, history)
+                    last_error = error
+                    continue
+                state.end = clock.time()
+                break
+            else:
+                state.exhausted = True
+        except BaseException as error:
+            # An attempt raised an exception that is not retried, a hook
+            # refused an attempt, or the sleep was interrupted.
+            self.__give_up(state, clock, error)
+            raise
+        if state.exhausted:
+            self.__give_up(state, clock, last_error)
+            self.__final_error(func, state.attempt, last_error, history)
+        self.__call_hooks(self.__after_success, state, result)
+        self.__success(func, state.attempt)
+        return result
+
+    def __attach_stats(self, func: Function, wrapped: Function) -> None:
+        if self.__stats is not None:
+            setattr(wrapped, "stats", self.__stats.function(func))
+
     @staticmethod
     def __fix_decoration(
         original: Callable[..., Any], wrapped: Callable[..., Any]
@@ -225,29 +808,9 @@ class Retry:
         :returns: A same-style function.
         """
 
-        @functools.wraps(func)
-        def wrapped(
-            *args: FuncParam.args, **kwargs: FuncParam.kwargs
-        ) -> FuncRetVal:
-            # pylint: disable=inconsistent-return-statements
-            # For some reason, pylint and python 3.12 seem to raise false
-            # positives no-members warnings on ParamSpec.
-            # pylint: disable=no-member
-            for _ in self.__context:
-                try:
-                    result = func(*args, **kwargs)
-                    self.__success(func)
-                    return result
-                # It does not matter if it's broad :p this is user
-                # configuration.
-                # pylint: disable=broad-except
-                except self.__exceptions as error:
-                    self.__caught_error(func, error)
-                    last_error = error
-                    continue
-            self.__final_error(func, last_error)
-
+        wrapped = _Wrapper(self.retry, self.__run, func)
         self.__fix_decoration(func, wrapped)
+        self.__attach_stats(func, wrapped)
         return wrapped
 
     @overload
@@ -280,27 +843,10 @@ class Retry:
 
         """
 
-        @functools.wraps(func)
-        async def wrapped(
-            *args: FuncParam.args, **kwargs: FuncParam.kwargs
-        ) -> FuncRetVal:
-            # See above.
-            # pylint: disable=no-member
-            async for _ in self.__context:
-                try:
-                    result = func(*args, **kwargs)
-                    if inspect.isawaitable(result):
-                        result = await result
-                    self.__success(func)
-                    return cast(FuncRetVal, result)
-                # pylint: disable=broad-except
-                except self.__exceptions as error:
-                    self.__caught_error(func, error)
-                    last_error = error
-                    continue
-            self.__final_error(func, last_error)
-
+        wrapped = _Wrapper(self.aioretry, self.__arun, func)
         self.__fix_decoration(func, wrapped)
+        self.__attach_stats(func, wrapped)
+        _mark_coroutine_function(wrapped)
         return wrapped
 
     __is_not_async_type = {Awaitable, OldAwaitable}.isdisjoint
@@ -356,7 +902,8 @@ class Retry:
         return self.retry(func)
 
     def __str__(self) -> str:
-        return self.__str
+        # The context may be updated: see Context.update.
+        return f"{self.__class__.__name__}({self.__exc_str}, {self.__context})"
 
 
 __all__ = ["Retry"]
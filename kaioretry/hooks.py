@@ -0,0 +1,189 @@
+"""Hooks are functions called at the key moments of the retry process. They
+make it possible to plug metrics, tracing or alerting into
+:py:class:`~kaioretry.Retry` and :py:class:`~kaioretry.Context` objects,
+which hold them as lists:
+
+* :py:attr:`Retry.before_attempt <kaioretry.Retry.before_attempt>` hooks
+  are called before each attempt;
+* :py:attr:`Retry.after_success <kaioretry.Retry.after_success>` hooks are
+  called after an attempt succeeded, with its result;
+* :py:attr:`Retry.on_caught_exception
+  <kaioretry.Retry.on_caught_exception>` hooks are called after an attempt
+  raised an exception the :py:class:`~kaioretry.Retry` object catches. That
+  includes the exception of the last try, after which the
+  :py:attr:`~kaioretry.Retry.on_give_up` hooks are called too, with
+  :py:attr:`RetryState.exhausted` set;
+* :py:attr:`Retry.before_retry <kaioretry.Retry.before_retry>` hooks are
+  called after the :py:attr:`~kaioretry.Retry.on_caught_exception` ones,
+  with the same exception, when another try follows, before sleeping;
+* :py:attr:`Retry.on_give_up <kaioretry.Retry.on_give_up>` hooks are called
+  when an exception is about to be propagated, either because tries are
+  exhausted, because the exception of an attempt is not retried, or because
+  the call was interrupted, e.g. cancelled while sleeping, with
+  :py:attr:`RetryState.sleeping` set;
+* :py:attr:`Context.before_sleep <kaioretry.Context.before_sleep>` hooks are
+  called before sleeping between two attempts, with the delay.
+
+.. code-block:: python
+   :caption: Alerting on give-up
+
+   from kaioretry import Retry
+
+   retry = Retry(ConnectionError)
+   retry.on_give_up.append(
+       lambda state, error: alert(f"{state.func.__qualname__}: {error}")
+   )
+
+
+:py:class:`~kaioretry.Retry` hooks are given a :py:class:`RetryState`,
+describing the call and its current attempt. Hooks run in the thread, or the
+task, performing the call: they must not block for long.
+
+A :py:attr:`~kaioretry.Retry.before_attempt` hook may raise an exception to
+prevent an attempt, as :py:class:`~kaioretry.breaker.CircuitBreaker` does:
+the attempt fails with that exception, which is never retried, and the
+:py:attr:`~kaioretry.Retry.on_give_up` hooks are called, with
+:py:attr:`RetryState.refused` set.
+
+A :py:attr:`~kaioretry.Retry.before_retry` hook may raise
+:py:class:`StopRetrying` to refuse the next try, as
+:py:class:`~kaioretry.budget.RetryBudget` does: the call ends as if it ran
+out of tries, without sleeping, and fails with the exception of its last
+attempt. Any other exception it raises fails the call, after the
+:py:attr:`~kaioretry.Retry.on_give_up` hooks are called. Either way,
+:py:attr:`RetryState.refused` is set, and the number of the attempt is not
+incremented.
+
+Hooks cost nothing when their lists are empty: the regular retry loops are
+used, and hook lists are only checked once per call.
+"""
+
+from typing import Any, Protocol
+from collections.abc import Callable
+
+from .types import Function, NonNegative
+
+
+class StopRetrying(Exception):
+    """The exception :py:attr:`~kaioretry.Retry.before_retry` hooks raise to
+    refuse the next try. It is never propagated."""
+
+
+class RetryState:
+    """The state of a call of a function decorated by
+    :py:class:`~kaioretry.Retry`, as seen by hooks.
+
+    :param func: the decorated function.
+
+    :param args: the positional arguments of the call.
+
+    :param kwargs: the keyword arguments of the call.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    __slots__ = (
+        "func",
+        "args",
+        "kwargs",
+        "attempt",
+        "start",
+        "end",
+        "exhausted",
+        "refused",
+        "sleeping",
+        "data",
+    )
+
+    def __init__(
+        self, func: Function, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> None:
+        self.func = func
+        """The decorated function."""
+        self.args = args
+        """The positional arguments of the call."""
+        self.kwargs = kwargs
+        """The keyword arguments of the call."""
+        self.attempt = 0
+        """The number of the current attempt, starting at 1."""
+        self.start = 0.0
+        """The time the current attempt started at, according to the
+        :py:class:`~kaioretry.Context` clock."""
+        self.end: float | None = None
+        """The time the current attempt, or the previous one if the current
+        one is not over yet, ended at. None if no attempt ended yet."""
+        self.exhausted = False
+        """Whether the call ran out of tries, or was refused another one by
+        :py:class:`StopRetrying`. Only meaningful in
+        :py:attr:`~kaioretry.Retry.on_give_up` hooks."""
+        self.refused = False
+        """Whether a hook refused the next attempt of the call, which did
+        not run. Only meaningful in :py:attr:`~kaioretry.Retry.on_give_up`
+        hooks."""
+        self.sleeping = False
+        """Whether the call is waiting for its next attempt: between the
+        :py:attr:`~kaioretry.Retry.before_retry` hooks and the next
+        :py:attr:`~kaioretry.Retry.before_attempt` ones."""
+        self.data: dict[Any, Any] = {}
+        """Where hooks may keep their own data about the call, under keys
+        of their own."""
+
+    @property
+    def duration(self) -> float:
+        """How long the current attempt took, once it is over."""
+        return (self.end or self.start) - self.start
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self.func.__qualname__}, "
+            f"attempt={self.attempt})"
+        )
+
+
+BeforeAttemptHook = Callable[[RetryState], None]
+"""The signature of :py:attr:`~kaioretry.Retry.before_attempt` hooks."""
+
+AfterSuccessHook = Callable[[RetryState, Any], None]
+"""The signature of :py:attr:`~kaioretry.Retry.after_success` hooks, which
+are also given the result of the call."""
+
+ErrorHook = Callable[[RetryState, BaseException], None]
+"""The signature of :py:attr:`~kaioretry.Retry.on_caught_exception`,
+:py:attr:`~kaioretry.Retry.before_retry` and
+:py:attr:`~kaioretry.Retry.on_give_up` hooks, which are also given the
+exception."""
+
+BeforeSleepHook = Callable[[NonNegative], None]
+"""The signature of :py:attr:`~kaioretry.Context.before_sleep` hooks, which
+are given the delay."""
+
+
+class RetryHooks(Protocol):
+    """An object providing a hook for each :py:class:`~kaioretry.Retry` hook
+    point but :py:attr:`~kaioretry.Retry.before_retry`, to be registered all
+    at once by :py:meth:`Retry.add_hooks <kaioretry.Retry.add_hooks>`."""
+
+    def before_attempt(self, state: RetryState) -> None:
+        """See :py:data:`BeforeAttemptHook`."""
+
+    def after_success(self, state: RetryState, result: Any) -> None:
+        """See :py:data:`AfterSuccessHook`."""
+
+    def on_caught_exception(
+        self, state: RetryState, error: BaseException
+    ) -> None:
+        """See :py:data:`ErrorHook`."""
+
+    def on_give_up(self, state: RetryState, error: BaseException) -> None:
+        """See :py:data:`ErrorHook`."""
+
+
+__all__ = [
+    "StopRetrying",
+    "RetryState",
+    "RetryHooks",
+    "BeforeAttemptHook",
+    "AfterSuccessHook",
+    "ErrorHook",
+    "BeforeSleepHook",
+]
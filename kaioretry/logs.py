@@ -0,0 +1,388 @@
+"""Keep kaioretry logging under control.
+
+During an outage, each call of a retried function logs a warning per caught
+exception, and its :py:class:`~kaioretry.Context` loop logs each try and
+each sleep: the logging pipeline may end up slowing down the application
+itself.
+
+A :py:class:`StormFilter` lets the first occurrences of each kind of
+kaioretry log record through, then replaces the following ones by a
+periodic summary, such as
+``4213 ValueError retries of fetch suppressed in the last 10s``. Records are
+grouped by logger, event, function and exception class, as found in their
+``kaioretry_*`` attributes: other records are left untouched.
+
+.. code-block:: python
+   :caption: Suppressing log storms
+
+   from kaioretry.logs import StormFilter
+
+   storm_filter = StormFilter(first=5, interval=10)
+   storm_filter.install()
+
+Summaries are logged, with a ``kaioretry_suppressed`` count attribute, when
+the filter sees any record once the interval is over, or when
+:py:meth:`StormFilter.flush` is called.
+
+Handlers run in the thread that logs: slow handlers (files, sockets...) add
+to the latency of retried calls, and may stall the :py:mod:`asyncio` loop of
+:py:func:`~kaioretry.aioretry` decorated functions. A :py:class:`LogPipeline`
+hands records over to a thread through a bounded queue instead, and counts
+the records it had to drop when the queue was full.
+
+.. code-block:: python
+   :caption: Logging off the hot path
+
+   import logging
+   from kaioretry.logs import LogPipeline
+
+   with LogPipeline(logging.FileHandler("retries.log")) as pipeline:
+       pipeline.install()
+       ...
+   print(f"{pipeline.dropped} records dropped")
+"""
+
+import queue
+import logging
+import logging.handlers
+import threading
+
+from typing import Any, Final, cast
+
+from .clock import Clock, DEFAULT_CLOCK
+from .context import Context
+from .decorator import Retry
+
+_Key = tuple[str, str, str | None, str | None]
+
+
+class _Window:
+    """The occurrences of a kind of log record, in the current interval."""
+
+    # pylint: disable=too-few-public-methods
+
+    __slots__ = ("start", "count", "suppressed", "level")
+
+    def __init__(self, start: float, level: int) -> None:
+        self.start = start
+        self.count = 0
+        self.suppressed = 0
+        self.level = level
+
+
+class StormFilter(logging.Filter):
+    """A :py:class:`logging.Filter` suppressing the repeated log records of
+    kaioretry, and summing them up periodically.
+
+    Like any filter, it can be added to loggers or to handlers. Filters
+    added to loggers are not inherited by their children: see
+    :py:meth:`install`.
+
+    :param first: how many records of each kind are let through, per
+        interval.
+
+    :param interval: the number of seconds between two summaries.
+
+    :param max_keys: the maximum number of kinds of records to keep track of.
+        Once it is reached, records of new kinds are counted together.
+
+    :param clock: the clock measuring intervals.
+
+    :raises ValueError: if a parameter is negative, or if max_keys is 0.
+    """
+
+    OVERFLOW_KEY: _Key = ("", "", None, None)
+    """The kind of the records that are counted together once
+    ``max_keys`` is reached."""
+
+    def __init__(
+        self,
+        /,
+        first: int = 10,
+        interval: float = 10,
+        *,
+        max_keys: int = 1000,
+        clock: Clock = DEFAULT_CLOCK,
+    ) -> None:
+        if first < 0 or interval < 0:
+            raise ValueError(
+                f"first and interval cannot be negative ({first}, {interval} "
+                "given)"
+            )
+        if max_keys < 1:
+            raise ValueError(f"max_keys must be positive ({max_keys} given)")
+        super().__init__()
+        self.__first = first
+        self.__interval = interval
+        self.__max_keys = max_keys
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__windows: dict[_Key, _Window] = {}
+        self.__next_sweep = clock.time() + interval
+
+    @staticmethod
+    def __key(record: logging.LogRecord, event: str) -> _Key:
+        return (
+            record.name,
+            event,
+            getattr(record, "kaioretry_function", None),
+            getattr(record, "kaioretry_exception", None),
+        )
+
+    @staticmethod
+    def __summary(key: _Key, suppressed: int, elapsed: float) -> str:
+        _, event, function, exception = key
+        if not event:
+            what = "kaioretry log records"
+        elif event == "kaioretry.caught":
+            what = f"{exception} retries of {function}"
+        elif function is not None:
+            what = f"{event} records of {function}"
+        else:
+            what = f"{event} records"
+        return f"{suppressed} {what} suppressed in the last {elapsed:.0f}s"
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Let a record through or suppress it. Records, kaioretry's or not,
+        seen once intervals with suppressed records are over, are preceded
+        by their summaries.
+
+        :param record: the log record.
+
+        :returns: whether the record should be logged.
+        """
+        now = self.__clock.time()
+        if now >= self.__next_sweep:
+            self.__sweep(now)
+        event = getattr(record, "kaioretry_event", None)
+        if event is None or getattr(record, "kaioretry_summary", False):
+            return True
+        key = self.__key(record, event)
+        with self.__lock:
+            window = self.__windows.get(key)
+            if window is None:
+                if len(self.__windows) >= self.__max_keys:
+                    key = self.OVERFLOW_KEY
+                window = self.__windows.setdefault(
+                    key, _Window(now, record.levelno)
+                )
+            if now - window.start < self.__interval:
+                window.count += 1
+                if window.count <= self.__first:
+                    return True
+                window.suppressed += 1
+                return False
+            level, suppressed = window.level, window.suppressed
+            elapsed = now - window.start
+            window.start, window.count, window.suppressed = now, 1, 0
+        if suppressed:
+            self.__log_summary(key, level, suppressed, elapsed)
+        return True
+
+    def __sweep(self, now: float) -> None:
+        """Forget the kinds of records whose interval is over, logging the
+        summaries of their suppressed records, if any."""
+        with self.__lock:
+            self.__next_sweep = now + self.__interval
+            pending = []
+            for key, window in list(self.__windows.items()):
+                if now - window.start < self.__interval:
+                    continue
+                del self.__windows[key]
+                if window.suppressed:
+                    pending.append(
+                        (
+                            key,
+                            window.level,
+                            window.suppressed,
+                            now - window.start,
+                        )
+                    )
+        for summary in pending:
+            self.__log_summary(*summary)
+
+    def __log_summary(
+        self, key: _Key, level: int, suppressed: int, elapsed: float
+    ) -> None:
+        extra: dict[str, Any] = {
+            "kaioretry_event": key[1] or None,
+            "kaioretry_function": key[2],
+            "kaioretry_exception": key[3],
+            "kaioretry_summary": True,
+            "kaioretry_suppressed": suppressed,
+        }
+        logging.getLogger(key[0] or Retry.DEFAULT_LOGGER.name).log(
+            level, self.__summary(key, suppressed, elapsed), extra=extra
+        )
+
+    def flush(self) -> None:
+        """Log the summaries of the records suppressed so far, and start new
+        intervals."""
+        now = self.__clock.time()
+        with self.__lock:
+            pending = []
+            for key, window in self.__windows.items():
+                if window.suppressed:
+                    pending.append(
+                        (
+                            key,
+                            window.level,
+                            window.suppressed,
+                            now - window.start,
+                        )
+                    )
+                window.start, window.count, window.suppressed = now, 0, 0
+        for summary in pending:
+            self.__log_summary(*summary)
+
+    def install(self, *loggers: logging.Logger) -> None:
+        """Add the filter to loggers.
+
+        :param loggers: the loggers. Default:
+            :py:attr:`Retry.DEFAULT_LOGGER <kaioretry.Retry.DEFAULT_LOGGER>`
+            and
+            :py:attr:`Context.DEFAULT_LOGGER <kaioretry.Context.DEFAULT_LOGGER>`.
+        """
+        for logger in loggers or (
+            Retry.DEFAULT_LOGGER,
+            Context.DEFAULT_LOGGER,
+        ):
+            logger.addFilter(self)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(first={self.__first}, "
+            f"interval={self.__interval})"
+        )
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """A :py:class:`logging.handlers.QueueHandler` that never blocks, and
+    counts the records it drops when its queue is full.
+
+    Records are enqueued as they are: unlike the base class, this handler
+    leaves their formatting to the handlers of the
+    :py:class:`~logging.handlers.QueueListener`, out of the logging thread.
+
+    :param records: the queue.
+    """
+
+    def __init__(self, records: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(records)
+        self.__dropped = 0
+        self.__dropped_lock = threading.Lock()
+
+    @property
+    def dropped(self) -> int:
+        """The number of records dropped so far."""
+        return self.__dropped
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Return the record unchanged."""
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Enqueue a record, or drop it if the queue is full."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self.__dropped_lock:
+                self.__dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    """A queue listener that can be stopped while its queue is full."""
+
+    def enqueue_sentinel(self) -> None:
+        # None is the sentinel of QueueListener.
+        cast("queue.Queue[Any]", self.queue).put(None)
+
+    def stop(self) -> None:
+        # Before python 3.12, stopping a listener that was not started fails.
+        if self._thread is not None:
+            super().stop()
+
+
+class LogPipeline:
+    """Emit log records from a thread, through a bounded queue.
+
+    :param handlers: the handlers that will actually handle the records,
+        in the thread.
+
+    :param maxsize: the maximum number of records waiting in the queue.
+
+    :raises ValueError: if maxsize is not positive.
+    """
+
+    DEFAULT_LOGGER_NAME: Final[str] = "kaioretry"
+    """The name of the logger that is the parent of the default loggers of
+    kaioretry."""
+
+    def __init__(
+        self, *handlers: logging.Handler, maxsize: int = 10000
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be positive ({maxsize} given)")
+        records: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize)
+        self.__handler = BoundedQueueHandler(records)
+        self.__listener = _Listener(
+            records, *handlers, respect_handler_level=True
+        )
+        self.__installed: dict[logging.Logger, bool] = {}
+
+    @property
+    def handler(self) -> BoundedQueueHandler:
+        """The handler feeding the queue."""
+        return self.__handler
+
+    @property
+    def dropped(self) -> int:
+        """The number of records dropped so far, because the queue was
+        full."""
+        return self.__handler.dropped
+
+    def start(self) -> None:
+        """Start the thread handling the records."""
+        self.__listener.start()
+
+    def stop(self) -> None:
+        """Handle the records still in the queue, then stop the thread and
+        remove the pipeline from the loggers it was installed on. Does
+        nothing more if the thread was not started."""
+        for logger, propagate in self.__installed.items():
+            logger.removeHandler(self.__handler)
+            logger.propagate = propagate
+        self.__installed.clear()
+        self.__listener.stop()
+
+    def __enter__(self) -> "LogPipeline":
+        self.start()
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.stop()
+
+    def install(self, *loggers: logging.Logger) -> None:
+        """Send the records of loggers through the pipeline only: they stop
+        propagating to the handlers of their parents, until :py:meth:`stop`
+        is called.
+
+        :param loggers: the loggers. Default: the ``kaioretry`` logger, the
+            parent of
+            :py:attr:`Retry.DEFAULT_LOGGER <kaioretry.Retry.DEFAULT_LOGGER>`
+            and
+            :py:attr:`Context.DEFAULT_LOGGER <kaioretry.Context.DEFAULT_LOGGER>`.
+        """
+        for logger in loggers or (
+            logging.getLogger(self.DEFAULT_LOGGER_NAME),
+        ):
+            if logger not in self.__installed:
+                self.__installed[logger] = logger.propagate
+                logger.addHandler(self.__handler)
+                logger.propagate = False
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.__listener.handlers})"
+
+
+__all__ = ["StormFilter", "BoundedQueueHandler", "LogPipeline"]
@@ -0,0 +1,432 @@
+"""Metrics about retried functions: how often they are called, retried, or
+given up, and how long they take and sleep.
+
+Metrics are only collected for :py:class:`~kaioretry.Retry` objects given a
+:py:class:`MetricsCollector`, which registers itself as their
+:py:mod:`~kaioretry.hooks`. Others do not pay any price at all.
+
+.. code-block:: python
+   :caption: Collecting metrics
+
+   from kaioretry import retry
+   from kaioretry.metrics import MetricsCollector
+
+   metrics = MetricsCollector()
+
+   @retry(ConnectionError, tries=3, delay=1, metrics=metrics)
+   def fetch(url):
+       ...
+
+   print(metrics.expose())
+
+
+The exposition follows the Prometheus text format. For each decorated
+function, labelled by its qualified name, the following metrics are
+available:
+
+* ``kaioretry_calls_total``: the number of calls;
+* ``kaioretry_attempts_total``: the number of attempts;
+* ``kaioretry_successes_total``: the number of successful calls;
+* ``kaioretry_exhaustions_total``: the number of calls that ran out of tries;
+* ``kaioretry_caught_exceptions_total``: the number of exceptions caught by
+  attempts, labelled by exception class, including the exception of the last
+  try of exhausted calls;
+* ``kaioretry_attempts_per_call``: an histogram of the number of attempts
+  per successful or exhausted call;
+* ``kaioretry_sleep_seconds``: an histogram of the sleeps between attempts;
+* ``kaioretry_attempt_duration_seconds``: an histogram of the duration of
+  attempts.
+
+Durations are measured by the :py:class:`~kaioretry.Context` clock.
+
+Each thread updates its own counters: collecting metrics never involves any
+lock, except for the first call made by a thread. Counters are only summed
+up on exposition. Once a thread ends, its counters are added to those of
+the threads that ended before it, so that short-lived threads do not pile
+up.
+"""
+
+import bisect
+import weakref
+import threading
+
+from typing import Any
+from collections.abc import Sequence
+
+from .types import Number, Function
+from .hooks import RetryState
+
+DEFAULT_ATTEMPTS_BUCKETS: tuple[Number, ...] = (1, 2, 3, 5, 10, 20)
+"""The default upper bounds of the attempts per call histogram buckets."""
+
+DEFAULT_SECONDS_BUCKETS: tuple[Number, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+)
+"""The default upper bounds of the durations histograms buckets."""
+
+
+class Histogram:
+    """Count observed values by buckets.
+
+    :param bounds: the upper bounds of the buckets, in increasing order. An
+        extra, unlimited, bucket is always added.
+    """
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[Number]) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum: Number = 0
+
+    def observe(self, value: Number) -> None:
+        """Count a value.
+
+        :param value: the observed value.
+        """
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def merge(self, other: "Histogram") -> None:
+        """Add the values observed by another histogram, with the same
+        buckets."""
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.sum += other.sum
+
+    @property
+    def count(self) -> int:
+        """The number of observed values."""
+        return sum(self.counts)
+
+
+class FunctionMetrics:
+    """The metrics of a decorated function.
+
+    :param attempts_buckets: the buckets of the attempts per call histogram.
+
+    :param seconds_buckets: the buckets of the durations histograms.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    __slots__ = (
+        "calls",
+        "attempts",
+        "successes",
+        "exhaustions",
+        "caught",
+        "attempts_per_call",
+        "sleep",
+        "attempt_duration",
+    )
+
+    def __init__(
+        self,
+        attempts_buckets: Sequence[Number] = DEFAULT_ATTEMPTS_BUCKETS,
+        seconds_buckets: Sequence[Number] = DEFAULT_SECONDS_BUCKETS,
+    ) -> None:
+        self.calls = 0
+        self.attempts = 0
+        self.successes = 0
+        self.exhaustions = 0
+        self.caught: dict[str, int] = {}
+        self.attempts_per_call = Histogram(attempts_buckets)
+        self.sleep = Histogram(seconds_buckets)
+        self.attempt_duration = Histogram(seconds_buckets)
+
+    def called(self) -> None:
+        """Count a call."""
+        self.calls += 1
+
+    def slept(self, duration: Number) -> None:
+        """Count a sleep between two attempts.
+
+        :param duration: how long the sleep took.
+        """
+        self.sleep.observe(duration)
+
+    def attempted(self, duration: Number) -> None:
+        """Count an attempt.
+
+        :param duration: how long the attempt took.
+        """
+        self.attempts += 1
+        self.attempt_duration.observe(duration)
+
+    def caught_error(self, error: BaseException) -> None:
+        """Count an exception caught by an attempt.
+
+        :param error: the exception.
+        """
+        name = error.__class__.__qualname__
+        self.caught[name] = self.caught.get(name, 0) + 1
+
+    def succeeded(self, attempts: int) -> None:
+        """Count a successful call.
+
+        :param attempts: the number of attempts of the call.
+        """
+        self.successes += 1
+        self.attempts_per_call.observe(attempts)
+
+    def exhausted(self, attempts: int) -> None:
+        """Count a call that ran out of tries.
+
+        :param attempts: the number of attempts of the call.
+        """
+        self.exhaustions += 1
+        self.attempts_per_call.observe(attempts)
+
+    def merge(self, other: "FunctionMetrics") -> None:
+        """Add the metrics of another object."""
+        self.calls += other.calls
+        self.attempts += other.attempts
+        self.successes += other.successes
+        self.exhaustions += other.exhaustions
+        for name, count in other.caught.copy().items():
+            self.caught[name] = self.caught.get(name, 0) + count
+        self.attempts_per_call.merge(other.attempts_per_call)
+        self.sleep.merge(other.sleep)
+        self.attempt_duration.merge(other.attempt_duration)
+
+
+class _ThreadEnd:
+    """Kept by the thread-local storage of a thread only, so as to be
+    finalized when the thread ends."""
+
+    # pylint: disable=too-few-public-methods
+
+    __slots__ = ("__weakref__",)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _number(value: Number) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsCollector:
+    """Collect the metrics of the functions decorated by
+    :py:class:`~kaioretry.Retry` objects.
+
+    :param attempts_buckets: the upper bounds of the attempts per call
+        histogram buckets.
+
+    :param seconds_buckets: the upper bounds of the durations histograms
+        buckets.
+    """
+
+    def __init__(
+        self,
+        /,
+        attempts_buckets: Sequence[Number] = DEFAULT_ATTEMPTS_BUCKETS,
+        seconds_buckets: Sequence[Number] = DEFAULT_SECONDS_BUCKETS,
+    ) -> None:
+        self.__buckets = tuple(attempts_buckets), tuple(seconds_buckets)
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+        self.__shards: list[dict[Function, FunctionMetrics]] = []
+        # The metrics of the threads that ended.
+        self.__retired: dict[Function, FunctionMetrics] = {}
+
+    def __shard(self) -> dict[Function, FunctionMetrics]:
+        try:
+            shard: dict[Function, FunctionMetrics] = self.__local.shard
+        except AttributeError:
+            shard = self.__local.shard = {}
+            self.__local.end = end = _ThreadEnd()
+            with self.__lock:
+                self.__shards.append(shard)
+            weakref.finalize(
+                end, MetricsCollector.__retire, weakref.ref(self), shard
+            )
+        return shard
+
+    @staticmethod
+    def __retire(
+        ref: "weakref.ref[MetricsCollector]",
+        shard: dict[Function, FunctionMetrics],
+    ) -> None:
+        """Add the metrics of a thread that ended to the retired ones."""
+        # pylint: disable=protected-access
+        collector = ref()
+        if collector is None:
+            return
+        with collector.__lock:
+            collector.__shards.remove(shard)
+            for func, metrics in shard.items():
+                if func not in collector.__retired:
+                    collector.__retired[func] = FunctionMetrics(
+                        *collector.__buckets
+                    )
+                collector.__retired[func].merge(metrics)
+
+    def function(self, func: Function) -> FunctionMetrics:
+        """Return the metrics of a function, for the current thread only.
+
+        :param func: the decorated function.
+
+        :returns: a :py:class:`FunctionMetrics` object, to be updated.
+        """
+        shard = self.__shard()
+        try:
+            return shard[func]
+        except KeyError:
+            metrics = shard[func] = FunctionMetrics(*self.__buckets)
+            return metrics
+
+    def before_attempt(self, state: RetryState) -> None:
+        """The :py:attr:`~kaioretry.Retry.before_attempt` hook."""
+        metrics = self.function(state.func)
+        if state.end is None:
+            metrics.called()
+        else:
+            metrics.slept(state.start - state.end)
+
+    def after_success(self, state: RetryState, _: Any) -> None:
+        """The :py:attr:`~kaioretry.Retry.after_success` hook."""
+        metrics = self.function(state.func)
+        metrics.attempted(state.duration)
+        metrics.succeeded(state.attempt)
+
+    def on_caught_exception(
+        self, state: RetryState, error: BaseException
+    ) -> None:
+        """The :py:attr:`~kaioretry.Retry.on_caught_exception` hook."""
+        metrics = self.function(state.func)
+        metrics.attempted(state.duration)
+        metrics.caught_error(error)
+
+    def on_give_up(self, state: RetryState, _: BaseException) -> None:
+        """The :py:attr:`~kaioretry.Retry.on_give_up` hook."""
+        metrics = self.function(state.func)
+        if state.exhausted:
+            metrics.exhausted(state.attempt)
+        elif not state.refused and not state.sleeping:
+            metrics.attempted(state.duration)
+
+    def collect(self) -> dict[str, FunctionMetrics]:
+        """Sum up the metrics of all threads.
+
+        :returns: the metrics, by function qualified name.
+        """
+        result: dict[str, FunctionMetrics] = {}
+        with self.__lock:
+            shards = list(self.__shards)
+            self.__merge(result, self.__retired)
+        for shard in shards:
+            self.__merge(result, shard.copy())
+        return result
+
+    def __merge(
+        self,
+        result: dict[str, FunctionMetrics],
+        shard: dict[Function, FunctionMetrics],
+    ) -> None:
+        for func, metrics in shard.items():
+            name = f"{func.__module__}.{func.__qualname__}"
+            if name not in result:
+                result[name] = FunctionMetrics(*self.__buckets)
+            result[name].merge(metrics)
+
+    def reset(self) -> None:
+        """Forget all metrics."""
+        with self.__lock:
+            for shard in self.__shards:
+                shard.clear()
+            self.__retired.clear()
+
+    @staticmethod
+    def __histogram(
+        lines: list[str], metric: str, labels: str, histogram: Histogram
+    ) -> None:
+        cumulated = 0
+        bounds = (*map(_number, histogram.bounds), "+Inf")
+        for bound, count in zip(bounds, histogram.counts):
+            cumulated += count
+            lines.append(
+                f'{metric}_bucket{{{labels},le="{bound}"}} {cumulated}'
+            )
+        lines.append(f"{metric}_sum{{{labels}}} {_number(histogram.sum)}")
+        lines.append(f"{metric}_count{{{labels}}} {cumulated}")
+
+    def expose(self) -> str:
+        """Render the metrics in the Prometheus text exposition format.
+
+        :returns: the text of the exposition.
+        """
+        collected = sorted(self.collect().items())
+        lines = []
+        counters = (
+            ("calls", "calls", "Calls of retried functions."),
+            ("attempts", "attempts", "Attempts of retried functions."),
+            ("successes", "successes", "Successful calls."),
+            ("exhaustions", "exhaustions", "Calls that ran out of tries."),
+        )
+        for metric, attribute, help_text in counters:
+            lines.append(f"# HELP kaioretry_{metric}_total {help_text}")
+            lines.append(f"# TYPE kaioretry_{metric}_total counter")
+            for name, metrics in collected:
+                value = getattr(metrics, attribute)
+                lines.append(
+                    f'kaioretry_{metric}_total{{function="{_escape(name)}"}} '
+                    f"{value}"
+                )
+        metric = "kaioretry_caught_exceptions_total"
+        lines.append(f"# HELP {metric} Exceptions caught by attempts.")
+        lines.append(f"# TYPE {metric} counter")
+        for name, metrics in collected:
+            for exception, count in sorted(metrics.caught.items()):
+                lines.append(
+                    f'{metric}{{function="{_escape(name)}",'
+                    f'exception="{_escape(exception)}"}} {count}'
+                )
+        histograms = (
+            ("attempts_per_call", "Attempts per call."),
+            ("sleep_seconds", "Sleeps between attempts."),
+            ("attempt_duration_seconds", "Duration of attempts."),
+        )
+        for (metric, help_text), attribute in zip(
+            histograms, ("attempts_per_call", "sleep", "attempt_duration")
+        ):
+            lines.append(f"# HELP kaioretry_{metric} {help_text}")
+            lines.append(f"# TYPE kaioretry_{metric} histogram")
+            for name, metrics in collected:
+                self.__histogram(
+                    lines,
+                    f"kaioretry_{metric}",
+                    f'function="{_escape(name)}"',
+                    getattr(metrics, attribute),
+                )
+        return "\n".join(lines) + "\n"
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Metrics are per-process: do not carry them along.
+        return self.__class__, self.__buckets
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}{self.__buckets}"
+
+
+__all__ = [
+    "Histogram",
+    "FunctionMetrics",
+    "MetricsCollector",
+    "DEFAULT_ATTEMPTS_BUCKETS",
+    "DEFAULT_SECONDS_BUCKETS",
+]
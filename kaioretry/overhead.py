@@ -0,0 +1,427 @@
+"""Measure how much CPU time kaioretry itself takes, compared with the
+functions it retries.
+
+An :py:class:`OverheadProfiler` wraps a retry decorator, like
+:py:class:`~kaioretry.trace.TraceRecorder` does, and measures, for each
+call, the CPU time of the whole call and the CPU time of its attempts. The
+difference is the overhead of kaioretry: context iteration, exception
+matching, logging, hooks, delay computation... Sleeping does not use any
+CPU, so it is not part of it.
+
+The CPU time of the profiler itself is calibrated once, by profiling an
+empty function decorated by a decorator that does nothing, and subtracted
+from the overhead of each call. Three parts of the overhead are also
+reported on their own: the hooks, the logging, and the bookkeeping of the
+sleeps between attempts (computing delays and starting sleeps).
+
+.. code-block:: python
+   :caption: Profiling kaioretry overhead
+
+   from kaioretry import retry
+   from kaioretry.overhead import OverheadProfiler
+
+   profiler = OverheadProfiler()
+
+   @profiler.profile(retry(ConnectionError, tries=3, delay=1))
+   def fetch(url):
+       ...
+
+   ...
+   print(profiler.report())
+
+
+CPU times are measured by :py:func:`time.thread_time`. Coroutines are
+measured step by step, so that other :py:mod:`asyncio` tasks running in
+between do not count.
+
+With ``memory=True``, the peak of memory allocated during each call is
+also measured by :py:mod:`tracemalloc`, which is started if it is not
+already, and stopped by :py:meth:`OverheadProfiler.close` then. It is only
+accurate when calls do not overlap, e.g. in a benchmark.
+"""
+
+import time
+import types
+import functools
+import threading
+import tracemalloc
+
+from typing import Any, cast
+from collections.abc import Awaitable, Callable, Generator, Iterator
+
+from .types import Function
+from .context import _probe
+from .decorator import Retry
+
+
+def _undecorated(func: Function) -> Function:
+    """The decorator of the calibration: it does nothing."""
+    return func
+
+
+def _nothing() -> None:
+    """The function of the calibration."""
+
+
+class _CallProbe:
+    """The CPU times of a profiled call, in seconds."""
+
+    __slots__ = ("total", "func", "hooks", "logging", "sleep", "stack")
+
+    def __init__(self) -> None:
+        self.total = self.func = 0.0
+        self.hooks = self.logging = self.sleep = 0.0
+        # [start, CPU time of the nested parts] of each part started.
+        self.stack: list[list[float]] = []
+
+    def start(self) -> None:
+        """Start measuring a part of the overhead."""
+        self.stack.append([time.thread_time(), 0.0])
+
+    def stop(self, category: str) -> None:
+        """Add the CPU time of the last part started to a category, but for
+        the parts nested in it, which have theirs."""
+        start, nested = self.stack.pop()
+        elapsed = time.thread_time() - start
+        setattr(self, category, getattr(self, category) + elapsed - nested)
+        if self.stack:
+            self.stack[-1][1] += elapsed
+
+
+@types.coroutine
+def _measured(
+    awaitable: Awaitable[Any], cpu: list[float]
+) -> Generator[Any, Any, Any]:
+    """Await an awaitable, adding the CPU time of each of its steps to
+    cpu[0]."""
+    steps = awaitable.__await__()
+    value: Any = None
+    error: BaseException | None = None
+    while True:
+        start = time.thread_time()
+        try:
+            if error is None:
+                yielded = steps.send(value)
+            else:
+                yielded = steps.throw(error)
+        except StopIteration as stop:
+            cpu[0] += time.thread_time() - start
+            return stop.value
+        except BaseException:
+            cpu[0] += time.thread_time() - start
+            raise
+        cpu[0] += time.thread_time() - start
+        try:
+            value, error = (yield yielded), None
+        except BaseException as thrown:  # pylint: disable=broad-except
+            value, error = None, thrown
+
+
+class FunctionOverhead:
+    """The overhead measured for a function.
+
+    :param name: the fully qualified name of the function.
+
+    :param baseline: the CPU time the profiler itself takes per call, in
+        seconds. Default: 0.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    __slots__ = (
+        "name",
+        "baseline",
+        "calls",
+        "total",
+        "func",
+        "hooks",
+        "logging",
+        "sleep",
+        "memory",
+    )
+
+    def __init__(self, name: str, baseline: float = 0) -> None:
+        self.name = name
+        """The fully qualified name of the function."""
+        self.baseline = baseline
+        """The CPU time the profiler takes per call, in seconds."""
+        self.calls = 0
+        """The number of calls."""
+        self.total: float = 0
+        """The CPU time of the calls, in seconds."""
+        self.func: float = 0
+        """The CPU time of the attempts, in seconds."""
+        self.hooks: float = 0
+        """The CPU time of the hooks, in seconds."""
+        self.logging: float = 0
+        """The CPU time of the logging, in seconds."""
+        self.sleep: float = 0
+        """The CPU time of the sleep bookkeeping, in seconds."""
+        self.memory = 0
+        """The sum of the memory peaks of the calls, in bytes, if measured."""
+
+    @property
+    def overhead(self) -> float:
+        """The CPU time of kaioretry, in seconds, without that of the
+        profiler."""
+        return max(self.total - self.func - self.baseline * self.calls, 0)
+
+    @property
+    def ratio(self) -> float:
+        """The proportion of CPU time taken by kaioretry."""
+        return self.overhead / self.total if self.total else 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self.name!r}, calls={self.calls}, "
+            f"overhead={self.overhead:g})"
+        )
+
+
+class OverheadReport:
+    """The overhead measured for all profiled functions, from the highest to
+    the lowest.
+
+    :param functions: the overhead of each function.
+
+    :param memory: whether memory peaks were measured.
+    """
+
+    def __init__(
+        self, functions: list[FunctionOverhead], memory: bool
+    ) -> None:
+        self.__functions = sorted(
+            functions, key=lambda function: function.overhead, reverse=True
+        )
+        self.__memory = memory
+
+    def __iter__(self) -> Iterator[FunctionOverhead]:
+        return iter(self.__functions)
+
+    def __len__(self) -> int:
+        return len(self.__functions)
+
+    def __str__(self) -> str:
+        header = (
+            f"{'function':<40} {'calls':>8} {'overhead/call':>14} "
+            f"{'func/call':>12} {'hooks/call':>12} {'logging/call':>12} "
+            f"{'sleep/call':>12} {'overhead':>9}"
+        )
+        if self.__memory:
+            header += f" {'peak bytes/call':>16}"
+        lines = [header]
+        for function in self.__functions:
+            calls = function.calls or 1
+            line = (
+                f"{function.name:<40} {function.calls:>8} "
+                f"{function.overhead / calls * 1e6:>12.2f}us "
+                f"{function.func / calls * 1e6:>10.2f}us "
+                f"{function.hooks / calls * 1e6:>10.2f}us "
+                f"{function.logging / calls * 1e6:>10.2f}us "
+                f"{function.sleep / calls * 1e6:>10.2f}us "
+                f"{function.ratio:>9.1%}"
+            )
+            if self.__memory:
+                line += f" {function.memory // calls:>16}"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+class OverheadProfiler:
+    """Measure the overhead of kaioretry for the functions decorated through
+    :py:meth:`profile`.
+
+    :param memory: whether to measure the memory peak of each call.
+
+    :param baseline: the CPU time the profiler itself takes per call, in
+        seconds, subtracted from the overhead. Default: calibrated on
+        creation.
+    """
+
+    def __init__(
+        self, /, memory: bool = False, baseline: float | None = None
+    ) -> None:
+        self.__memory = memory
+        self.__functions: dict[str, FunctionOverhead] = {}
+        self.__lock = threading.Lock()
+        self.__baseline = self.__calibrate() if baseline is None else baseline
+        self.__tracemalloc = memory and not tracemalloc.is_tracing()
+        if self.__tracemalloc:
+            tracemalloc.start()
+
+    @staticmethod
+    def __calibrate() -> float:
+        """Return the CPU time the profiler takes per call: the lowest mean
+        of a few batches of calls to an empty function, decorated by a
+        decorator that does nothing."""
+        profiler = OverheadProfiler(baseline=0)
+        func = profiler.profile(_undecorated)(_nothing)
+        means = []
+        for _ in range(10):
+            for _ in range(100):
+                func()
+            (function,) = profiler.report()
+            means.append(function.overhead / function.calls)
+            profiler.reset()
+        return min(means)
+
+    @property
+    def baseline(self) -> float:
+        """The CPU time the profiler takes per call, in seconds."""
+        return self.__baseline
+
+    def __record(self, name: str, probe: _CallProbe, memory: int) -> None:
+        with self.__lock:
+            try:
+                function = self.__functions[name]
+            except KeyError:
+                function = self.__functions[name] = FunctionOverhead(
+                    name, self.__baseline
+                )
+            function.calls += 1
+            function.total += probe.total
+            function.func += probe.func
+            function.hooks += probe.hooks
+            function.logging += probe.logging
+            function.sleep += probe.sleep
+            function.memory += memory
+
+    def __memory_start(self) -> int:
+        if not self.__memory:
+            return 0
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+    def __memory_peak(self, start: int) -> int:
+        if not self.__memory:
+            return 0
+        return max(tracemalloc.get_traced_memory()[1] - start, 0)
+
+    @staticmethod
+    def __attempts(func: Function) -> Function:
+        """Wrap the function retried by the decorator: measure attempts."""
+
+        @functools.wraps(func)
+        def attempt(*args: Any, **kwargs: Any) -> Any:
+            probe = cast(_CallProbe | None, _probe.get())
+            if probe is None:
+                return func(*args, **kwargs)
+            # Retried calls nested in the attempt are not measured.
+            token = _probe.set(None)
+            start = time.thread_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                probe.func += time.thread_time() - start
+                _probe.reset(token)
+
+        if not Retry.is_func_async(func):
+            return attempt
+
+        # Keep coroutine functions recognisable as such by decorators.
+        @functools.wraps(func)
+        async def aattempt(*args: Any, **kwargs: Any) -> Any:
+            probe = cast(_CallProbe | None, _probe.get())
+            if probe is None:
+                return await func(*args, **kwargs)
+            token = _probe.set(None)
+            func_cpu = [0.0]
+            try:
+                return await _measured(func(*args, **kwargs), func_cpu)
+            finally:
+                probe.func += func_cpu[0]
+                _probe.reset(token)
+
+        return aattempt
+
+    async def __await_call(
+        self,
+        name: str,
+        probe: _CallProbe,
+        memory: int,
+        result: Awaitable[Any],
+    ) -> Any:
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
+        token = _probe.set(probe)
+        cpu = [probe.total]
+        try:
+            return await _measured(result, cpu)
+        finally:
+            probe.total = cpu[0]
+            _probe.reset(token)
+            self.__record(name, probe, self.__memory_peak(memory))
+
+    def profile(
+        self, decorator: Callable[[Function], Function]
+    ) -> Callable[[Function], Function]:
+        """Wrap a retry decorator, so that the calls of the functions it
+        decorates are measured.
+
+        :param decorator: a retry decorator, such as a
+            :py:class:`~kaioretry.Retry` object, or the result of
+            :py:func:`~kaioretry.retry` or :py:func:`~kaioretry.aioretry`.
+
+        :returns: a decorator.
+        """
+
+        def decorate(func: Function) -> Function:
+            decorated = decorator(self.__attempts(func))
+            name = f"{func.__module__}.{func.__qualname__}"
+
+            def call(*args: Any, **kwargs: Any) -> Any:
+                probe = _CallProbe()
+                memory = self.__memory_start()
+                pending = False
+                token = _probe.set(probe)
+                start = time.thread_time()
+                try:
+                    result = decorated(*args, **kwargs)
+                    pending = isinstance(result, Awaitable)
+                finally:
+                    probe.total = time.thread_time() - start
+                    _probe.reset(token)
+                    if not pending:
+                        self.__record(name, probe, self.__memory_peak(memory))
+                if pending:
+                    return self.__await_call(name, probe, memory, result)
+                return result
+
+            if not Retry.is_func_async(func):
+                return functools.wraps(func)(call)
+
+            @functools.wraps(func)
+            async def acall(*args: Any, **kwargs: Any) -> Any:
+                return await call(*args, **kwargs)
+
+            return acall
+
+        return decorate
+
+    def report(self) -> OverheadReport:
+        """Return the overhead measured so far."""
+        with self.__lock:
+            functions = list(self.__functions.values())
+        return OverheadReport(functions, self.__memory)
+
+    def reset(self) -> None:
+        """Forget all measures."""
+        with self.__lock:
+            self.__functions.clear()
+
+    def close(self) -> None:
+        """Stop :py:mod:`tracemalloc`, if the profiler started it."""
+        if self.__tracemalloc:
+            self.__tracemalloc = False
+            tracemalloc.stop()
+
+    def __enter__(self) -> "OverheadProfiler":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(memory={self.__memory})"
+
+
+__all__ = ["FunctionOverhead", "OverheadReport", "OverheadProfiler"]
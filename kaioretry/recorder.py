@@ -0,0 +1,275 @@
+"""Keep the latest retry events in memory, to find out what happened during
+an incident once logs have been sampled or rotated away.
+
+A :py:class:`FlightRecorder` stores a fixed number of events in a ring
+buffer: older events are overwritten by newer ones. Events are stored in
+arrays of numbers, function and exception names being stored once, so that
+memory stays low and fixed, and recording stays cheap enough to be left on
+in production.
+
+.. code-block:: python
+   :caption: Recording retry events
+
+   import signal
+   from kaioretry import Retry, Context
+   from kaioretry.recorder import FlightRecorder
+
+   recorder = FlightRecorder(capacity=100000)
+   retry = recorder.instrument(Retry(ConnectionError, Context(tries=5)))
+   recorder.dump_on_signal(signal.SIGUSR1, "/tmp/kaioretry-{pid}.jsonl")
+
+
+Each event has the following fields:
+
+* ``time``: when the event happened, as a :py:func:`time.time` timestamp;
+* ``event``: ``attempt``, ``retry`` (an exception was caught, another
+  attempt will follow), ``success`` or ``give_up`` (with the exception
+  propagated: that of the last attempt if tries are exhausted);
+* ``call``: a number identifying the call, i.e. the retry loop, among the
+  calls recorded by the recorder;
+* ``function``: the qualified name of the decorated function;
+* ``attempt``: the number of the attempt;
+* ``delay``: for ``attempt`` events, the number of seconds waited since the
+  previous attempt;
+* ``exception``: the qualified name of the exception class, if any.
+
+Events can be dumped in the JSON lines or CSV formats.
+"""
+
+import os
+import csv
+import json
+import time
+import array
+import signal
+import threading
+import itertools
+
+from typing import Any, IO
+from collections.abc import Callable, Iterator
+from types import FrameType
+
+from .hooks import RetryState
+from .decorator import Retry
+
+EVENTS = ("attempt", "retry", "success", "give_up")
+"""The event names."""
+
+FIELDS = (
+    "time",
+    "event",
+    "call",
+    "function",
+    "attempt",
+    "delay",
+    "exception",
+)
+"""The fields of the dumped events."""
+
+_ATTEMPT, _RETRY, _SUCCESS, _GIVE_UP = range(len(EVENTS))
+
+
+class _Names:
+    """Number names, so that they can be stored in arrays."""
+
+    def __init__(self) -> None:
+        self.__ids: dict[str, int] = {}
+        self.__lock = threading.Lock()
+
+    def id(self, name: str) -> int:
+        """Return the number of a name, starting at 1."""
+        try:
+            return self.__ids[name]
+        except KeyError:
+            with self.__lock:
+                return self.__ids.setdefault(name, len(self.__ids) + 1)
+
+    def names(self) -> list[str | None]:
+        """Return the names, by number. 0 stands for no name."""
+        # Numbers follow the insertion order.
+        return [None, *self.__ids.copy()]
+
+
+class FlightRecorder:
+    """Record retry events in a ring buffer.
+
+    :param capacity: the maximum number of events kept.
+
+    :param clock: the function providing the event times.
+
+    :raises ValueError: if capacity is not positive.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self, /, capacity: int = 65536, clock: Callable[[], float] = time.time
+    ) -> None:
+        if capacity < 1:
+            raise ValueError(f"capacity must be positive ({capacity} given)")
+        self.__capacity = capacity
+        self.__clock = clock
+        self.__times = array.array("d", bytes(8 * capacity))
+        self.__delays = array.array("d", bytes(8 * capacity))
+        self.__calls = array.array("q", bytes(8 * capacity))
+        self.__functions = array.array("i", [0]) * capacity
+        self.__exceptions = array.array("i", [0]) * capacity
+        self.__attempts = array.array("I", [0]) * capacity
+        self.__events = array.array("b", bytes(capacity))
+        self.__count = 0
+        self.__lock = threading.Lock()
+        self.__call_ids = itertools.count(1)
+        self.__function_names = _Names()
+        self.__exception_names = _Names()
+
+    @property
+    def capacity(self) -> int:
+        """The maximum number of events kept."""
+        return self.__capacity
+
+    def __len__(self) -> int:
+        return min(self.__count, self.__capacity)
+
+    def __record(
+        self,
+        event: int,
+        state: RetryState,
+        delay: float = 0,
+        error: BaseException | None = None,
+    ) -> None:
+        call = state.data.get(self)
+        if call is None:
+            call = state.data[self] = next(self.__call_ids)
+        function = self.__function_names.id(state.func.__qualname__)
+        exception = 0
+        if error is not None:
+            exception = self.__exception_names.id(error.__class__.__qualname__)
+        now = self.__clock()
+        with self.__lock:
+            index = self.__count % self.__capacity
+            self.__count += 1
+            self.__times[index] = now
+            self.__events[index] = event
+            self.__calls[index] = call
+            self.__functions[index] = function
+            self.__attempts[index] = state.attempt
+            self.__delays[index] = delay
+            self.__exceptions[index] = exception
+
+    def before_attempt(self, state: RetryState) -> None:
+        """The :py:attr:`~kaioretry.Retry.before_attempt` hook."""
+        delay = 0 if state.end is None else state.start - state.end
+        self.__record(_ATTEMPT, state, delay)
+
+    def after_success(self, state: RetryState, _: Any) -> None:
+        """The :py:attr:`~kaioretry.Retry.after_success` hook."""
+        self.__record(_SUCCESS, state)
+
+    def before_retry(self, state: RetryState, error: BaseException) -> None:
+        """The :py:attr:`~kaioretry.Retry.before_retry` hook."""
+        self.__record(_RETRY, state, error=error)
+
+    def on_give_up(self, state: RetryState, error: BaseException) -> None:
+        """The :py:attr:`~kaioretry.Retry.on_give_up` hook."""
+        self.__record(_GIVE_UP, state, error=error)
+
+    def instrument(self, retry: Retry) -> Retry:
+        """Register the recording hooks of a :py:class:`~kaioretry.Retry`
+        object.
+
+        :param retry: the object to instrument.
+
+        :returns: the same object.
+        """
+        retry.before_attempt.append(self.before_attempt)
+        retry.after_success.append(self.after_success)
+        retry.before_retry.append(self.before_retry)
+        retry.on_give_up.append(self.on_give_up)
+        return retry
+
+    def events(self) -> Iterator[dict[str, Any]]:
+        """Iterate over the recorded events, from the oldest to the newest.
+
+        The events are copied first, without blocking recording: this can
+        be done from a signal handler. An event recorded during the copy may
+        be inconsistent.
+
+        :returns: an iterator of :py:class:`dict` objects, whose keys are
+            :py:data:`FIELDS`.
+        """
+        count = self.__count
+        times, events, calls = (
+            self.__times[:],
+            self.__events[:],
+            self.__calls[:],
+        )
+        functions, attempts = self.__functions[:], self.__attempts[:]
+        delays, exceptions = self.__delays[:], self.__exceptions[:]
+        function_names = self.__function_names.names()
+        exception_names = self.__exception_names.names()
+        for position in range(max(count - self.__capacity, 0), count):
+            index = position % self.__capacity
+            yield {
+                "time": times[index],
+                "event": EVENTS[events[index]],
+                "call": calls[index],
+                "function": function_names[functions[index]],
+                "attempt": attempts[index],
+                "delay": delays[index],
+                "exception": exception_names[exceptions[index]],
+            }
+
+    def dump_jsonl(self, output: IO[str]) -> None:
+        """Write the recorded events in the JSON lines format.
+
+        :param output: a text file object.
+        """
+        for event in self.events():
+            output.write(json.dumps(event, separators=(",", ":")) + "\n")
+
+    def dump_csv(self, output: IO[str]) -> None:
+        """Write the recorded events in the CSV format, with a header.
+
+        :param output: a text file object, opened with ``newline=""``.
+        """
+        writer = csv.DictWriter(output, FIELDS)
+        writer.writeheader()
+        writer.writerows(self.events())
+
+    def dump(self, path: str) -> None:
+        """Write the recorded events to a file, in the CSV format if its
+        name ends with ``.csv``, in the JSON lines format otherwise.
+
+        :param path: the path of the file.
+        """
+        with open(path, "w", encoding="utf-8", newline="") as output:
+            if path.endswith(".csv"):
+                self.dump_csv(output)
+            else:
+                self.dump_jsonl(output)
+
+    def dump_on_signal(self, signum: int, path: str) -> None:
+        """Dump the recorded events whenever a signal is received. Must be
+        called from the main thread.
+
+        :param signum: the signal number, e.g. :py:data:`signal.SIGUSR1`.
+
+        :param path: the path of the file, see :py:meth:`dump`. It is
+            formatted with the ``pid`` and ``time`` (an integer timestamp)
+            keys.
+        """
+
+        def handler(_: int, __: FrameType | None) -> None:
+            self.dump(path.format(pid=os.getpid(), time=int(time.time())))
+
+        signal.signal(signum, handler)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Events are per-process: do not carry them along.
+        return self.__class__, (self.__capacity, self.__clock)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(capacity={self.__capacity})"
+
+
+__all__ = ["EVENTS", "FIELDS", "FlightRecorder"]
@@ -0,0 +1,474 @@
+"""Named retry policies, that can be changed without decorating functions
+again.
+
+A :py:class:`PolicyRegistry` maps names to retry policies: the parameters of
+:py:func:`~kaioretry.retry`, except for the exceptions to retry. Functions
+are decorated with a policy name, and use whatever policy is registered under
+that name when they are called.
+
+.. code-block:: python
+   :caption: Decorating functions with named policies
+
+   from kaioretry.registry import PolicyRegistry
+
+   registry = PolicyRegistry({"payments": {"tries": 3, "delay": 1}})
+
+   @registry.retry("payments", ConnectionError)
+   def charge(card, amount):
+       ...
+
+   @registry.aioretry("payments", ConnectionError)
+   async def refund(card, amount):
+       ...
+
+
+Policies are loaded from a :py:class:`dict` (:py:meth:`PolicyRegistry.load`),
+from the tables of a TOML file (:py:meth:`PolicyRegistry.load_toml`), or from
+environment variables holding JSON objects
+(:py:meth:`PolicyRegistry.load_env`):
+
+.. code-block:: toml
+   :caption: A TOML file of policies
+
+   [payments]
+   tries = 3
+   delay = 1
+   backoff = 2
+   jitter = [0, 0.5]
+
+   [search]
+   tries = 2
+   history = 1
+
+
+Loading replaces all the policies at once, or none of them if one is invalid.
+It can be triggered by a signal (:py:meth:`PolicyRegistry.reload_on_signal`)
+or by a change of the file (:py:meth:`PolicyRegistry.watch`), in which cases
+the policies are loaded from a daemon thread, errors are logged and the
+previous policies are kept.
+
+Decorated functions are bound to a new :py:class:`~kaioretry.Retry` object
+of their policy when policies are loaded: calling them costs one more call,
+not a lookup in the registry. Each call runs under a single policy, either
+the previous one or the new one. Since the Retry objects are replaced, hooks
+are registered by the ``instruments`` of the registry, which are called
+again on each load:
+
+.. code-block:: python
+   :caption: Instrumenting the Retry objects of the policies
+
+   from kaioretry.breaker import CircuitBreaker
+   from kaioretry.registry import PolicyRegistry
+
+   breaker = CircuitBreaker(threshold=5, cooldown=30)
+   registry = PolicyRegistry(
+       {"payments": {"tries": 3}}, instruments=[breaker.instrument]
+   )
+"""
+
+import os
+import json
+import signal
+import logging
+import tomllib
+import weakref
+import functools
+import threading
+
+from typing import Any, Final
+from collections.abc import Callable, Mapping, Sequence
+
+from .types import Exceptions, FuncParam, FuncRetVal
+from .backoff import _policy_update_delay
+from .context import Context
+from .decorator import Retry, _Wrapper, _mark_coroutine_function
+from .metrics import MetricsCollector
+
+
+_logger = logging.getLogger(__name__)
+
+_CONTEXT_PARAMS: Final = frozenset(
+    ("tries", "delay", "backoff", "jitter", "max_delay", "min_delay")
+)
+_RETRY_PARAMS: Final = frozenset(
+    ("log_format", "release_tracebacks", "history", "stats")
+)
+
+_Policy = Callable[[Exceptions], Retry]
+_Instrument = Callable[[Retry], Any]
+
+
+class _PolicyWrapper(_Wrapper[..., Any]):
+    """The functions decorated with a named policy: they call the function
+    decorated by the Retry object of their current policy.
+
+    :param decorate: the decorator that produced this object. It will be
+        used again to decorate the original function on unpickling.
+
+    :param func: the decorated function.
+
+    :param asynchronous: whether the function is decorated by
+        :py:meth:`~kaioretry.Retry.aioretry`.
+    """
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(
+        self,
+        decorate: Callable[[Callable[..., Any]], Any],
+        func: Callable[..., Any],
+        asynchronous: bool,
+        /,
+    ) -> None:
+        super().__init__(decorate, self.__run, func)
+        self.__func = func
+        self.__asynchronous = asynchronous
+        self.__current: Callable[..., Any] = func
+
+    def __run(
+        self, _: Callable[..., Any], args: tuple[Any, ...], kwargs: Any
+    ) -> Any:
+        return self.__current(*args, **kwargs)
+
+    @property
+    def stats(self) -> Any:
+        """The :py:class:`~kaioretry.stats.FunctionStats` of the current
+        policy, if it keeps statistics. They start over on every load.
+
+        :raises AttributeError: if the policy does not keep statistics.
+        """
+        return getattr(self.__current, "stats")
+
+    def bind(self, retry: Retry) -> None:
+        """Decorate the function with the Retry object of its policy."""
+        if self.__asynchronous:
+            self.__current = retry.aioretry(self.__func)
+        else:
+            self.__current = retry.retry(self.__func)
+
+
+class PolicyRegistry:
+    """Named retry policies.
+
+    :param policies: the initial policies, as given to :py:meth:`load`.
+
+    :param logger: the :py:class:`logging.Logger` of the
+        :py:class:`~kaioretry.Retry` and :py:class:`~kaioretry.Context`
+        objects.
+
+    :param metrics: the :py:class:`~kaioretry.MetricsCollector` of the
+        decorated functions, if any.
+
+    :param instruments: functions registering hooks on a
+        :py:class:`~kaioretry.Retry` object, such as
+        :py:meth:`CircuitBreaker.instrument
+        <kaioretry.breaker.CircuitBreaker.instrument>`. They are called with
+        each Retry object the policies make, on every load: hooks registered
+        otherwise are lost when policies are loaded again.
+
+    :raises ValueError: if a policy is invalid.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        policies: Mapping[str, Mapping[str, Any]] | None = None,
+        logger: logging.Logger = Retry.DEFAULT_LOGGER,
+        metrics: MetricsCollector | None = None,
+        instruments: Sequence[_Instrument] = (),
+    ) -> None:
+        self.__logger = logger
+        self.__metrics = metrics
+        self.__instruments = tuple(instruments)
+        self.__lock = threading.Lock()
+        self.__policies: dict[str, dict[str, Any]] = {}
+        self.__factories: dict[str, _Policy] = {}
+        self.__wrappers: weakref.WeakKeyDictionary[
+            _PolicyWrapper, tuple[str, Exceptions]
+        ] = weakref.WeakKeyDictionary()
+        self.__watcher: threading.Event | None = None
+        self.__signalled = threading.Event()
+        self.__reloader: threading.Thread | None = None
+        self.__signal_path = ""
+        self.load(policies or {})
+
+    @property
+    def policies(self) -> dict[str, dict[str, Any]]:
+        """A copy of the policies, by name."""
+        return {name: dict(params) for name, params in self.__policies.items()}
+
+    def __factory(self, name: str, params: Mapping[str, Any]) -> _Policy:
+        """Return a function making the Retry objects of a policy, after
+        checking the policy parameters."""
+        if unknown := params.keys() - _CONTEXT_PARAMS - _RETRY_PARAMS:
+            raise ValueError(
+                f"unknown parameters in policy {name}: "
+                f"{', '.join(sorted(unknown))}"
+            )
+        jitter = params.get("jitter", 0)
+        if isinstance(jitter, list):
+            jitter = tuple(jitter)
+        context = Context(
+            tries=params.get("tries", -1),
+            delay=params.get("delay", 0),
+            update_delay=_policy_update_delay(
+                params.get("backoff", 1), jitter
+            ),
+            max_delay=params.get("max_delay"),
+            min_delay=params.get("min_delay", 0),
+            logger=self.__logger,
+            log_format=params.get("log_format", "text"),
+        )
+        options: dict[str, Any] = {
+            key: params[key] for key in _RETRY_PARAMS & params.keys()
+        }
+        logger, metrics = self.__logger, self.__metrics
+        instruments = self.__instruments
+
+        def factory(exceptions: Exceptions) -> Retry:
+            retry = Retry(
+                exceptions, context, logger=logger, metrics=metrics, **options
+            )
+            for instrument in instruments:
+                instrument(retry)
+            return retry
+
+        # Check the Retry parameters now, rather than at the next binding.
+        Retry(Exception, context, **options)
+        return factory
+
+    def load(self, policies: Mapping[str, Mapping[str, Any]]) -> None:
+        """Replace all the policies, and bind the decorated functions to
+        their new policy.
+
+        :param policies: the parameters of :py:func:`~kaioretry.retry` by
+            policy name, except for exceptions, logger and metrics. Lists
+            of jitter bounds are accepted as tuples.
+
+        :raises ValueError: if a policy is invalid, or if a policy used by a
+            decorated function is missing. No policy is changed, then.
+        """
+        factories = {
+            name: self.__factory(name, params)
+            for name, params in policies.items()
+        }
+        with self.__lock:
+            missing = {
+                name
+                for name, _ in self.__wrappers.values()
+                if name not in factories
+            }
+            if missing:
+                raise ValueError(
+                    f"missing policies: {', '.join(sorted(missing))}"
+                )
+            self.__policies = {
+                name: dict(params) for name, params in policies.items()
+            }
+            self.__factories = factories
+            for wrapper, (name, exceptions) in self.__wrappers.items():
+                wrapper.bind(factories[name](exceptions))
+
+    def load_toml(self, path: str) -> None:
+        """Replace all the policies with the tables of a TOML file.
+
+        :param path: the path of the file.
+
+        :raises ValueError: see :py:meth:`load`, and
+            :py:class:`tomllib.TOMLDecodeError`.
+        :raises OSError: if the file cannot be read.
+        """
+        with open(path, "rb") as file:
+            self.load(tomllib.load(file))
+
+    def load_env(
+        self,
+        prefix: str = "KAIORETRY_POLICY_",
+        environ: Mapping[str, str] = os.environ,
+    ) -> None:
+        """Replace all the policies with those of environment variables.
+
+        :param prefix: the prefix of the variables. The rest of their name,
+            lower-cased, is the policy name, and their value is a JSON object
+            of the policy parameters, e.g.
+            ``KAIORETRY_POLICY_PAYMENTS='{"tries": 3, "delay": 1}'``.
+
+        :param environ: the environment variables.
+
+        :raises ValueError: see :py:meth:`load`, and
+            :py:class:`json.JSONDecodeError`.
+        """
+        self.load(
+            {
+                name[len(prefix) :].lower(): json.loads(value)
+                for name, value in environ.items()
+                if name.startswith(prefix)
+            }
+        )
+
+    def __reload(self, path: str) -> None:
+        try:
+            self.load_toml(path)
+        # pylint: disable=broad-except
+        except Exception:
+            _logger.exception("cannot reload policies from %s", path)
+        else:
+            _logger.info("policies reloaded from %s", path)
+
+    def __reload_on(self) -> None:
+        while True:
+            self.__signalled.wait()
+            self.__signalled.clear()
+            self.__reload(self.__signal_path)
+
+    def __on_signal(self, *_: Any) -> None:
+        self.__signalled.set()
+
+    def reload_on_signal(self, path: str, signum: int = signal.SIGHUP) -> Any:
+        """Reload the policies from a TOML file on a signal. This method can
+        only be called from the main thread.
+
+        The signal handler only wakes a daemon thread up, which reloads the
+        policies: the interrupted code may hold the locks loading takes.
+        Calling this method again replaces the file to load, and installs the
+        same handler: the registry keeps a single thread.
+
+        :param path: the path of the file.
+
+        :param signum: the signal. Default: :py:data:`signal.SIGHUP`.
+
+        :returns: the previous handler of the signal.
+        """
+        self.__signal_path = path
+        if self.__reloader is None:
+            self.__reloader = threading.Thread(
+                target=self.__reload_on, daemon=True
+            )
+            self.__reloader.start()
+        return signal.signal(signum, self.__on_signal)
+
+    def __watch(
+        self, path: str, interval: float, stop: threading.Event
+    ) -> None:
+        mtime = None
+        while True:
+            try:
+                current = os.stat(path).st_mtime_ns
+            except OSError as error:
+                _logger.warning("cannot watch %s: %s", path, error)
+            else:
+                if mtime is not None and current != mtime:
+                    self.__reload(path)
+                mtime = current
+            if stop.wait(interval):
+                return
+
+    def watch(self, path: str, interval: float = 1) -> None:
+        """Reload the policies from a TOML file whenever it is modified, from
+        a daemon thread. Policies are not loaded right away.
+
+        :param path: the path of the file.
+
+        :param interval: the number of seconds between two checks of the
+            file modification time.
+
+        :raises ValueError: if the registry is already watching a file.
+        """
+        if self.__watcher is not None:
+            raise ValueError(f"{self!r} is already watching a file")
+        self.__watcher = stop = threading.Event()
+        threading.Thread(
+            target=self.__watch, args=(path, interval, stop), daemon=True
+        ).start()
+
+    def unwatch(self) -> None:
+        """Stop watching a file, if any."""
+        if self.__watcher is not None:
+            self.__watcher.set()
+            self.__watcher = None
+
+    def decorate(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        /,
+        exceptions: Exceptions = Exception,
+        asynchronous: bool = False,
+    ) -> Any:
+        """Decorate a function with a named policy. :py:meth:`retry` and
+        :py:meth:`aioretry` are more convenient.
+
+        :param name: the name of the policy.
+
+        :param func: the function to decorate.
+
+        :param exceptions: the exceptions to retry: see
+            :py:class:`~kaioretry.Retry`.
+
+        :param asynchronous: whether the function is decorated like
+            :py:meth:`~kaioretry.Retry.aioretry` does.
+
+        :returns: the decorated function.
+
+        :raises KeyError: if the policy does not exist.
+        """
+        decorate = functools.partial(
+            self.decorate,
+            name,
+            exceptions=exceptions,
+            asynchronous=asynchronous,
+        )
+        wrapper = _PolicyWrapper(decorate, func, asynchronous)
+        with self.__lock:
+            wrapper.bind(self.__factories[name](exceptions))
+            self.__wrappers[wrapper] = name, exceptions
+        if asynchronous:
+            _mark_coroutine_function(wrapper)
+        return wrapper
+
+    def retry(
+        self, name: str, exceptions: Exceptions = Exception
+    ) -> Callable[
+        [Callable[FuncParam, FuncRetVal]], Callable[FuncParam, FuncRetVal]
+    ]:
+        """Return a decorator of regular functions, like
+        :py:meth:`~kaioretry.Retry.retry`, following a named policy.
+
+        :param name: the name of the policy.
+
+        :param exceptions: the exceptions to retry.
+
+        :raises KeyError: on decoration, if the policy does not exist.
+        """
+        return functools.partial(self.decorate, name, exceptions=exceptions)
+
+    def aioretry(
+        self, name: str, exceptions: Exceptions = Exception
+    ) -> Callable[[Callable[FuncParam, Any]], Callable[FuncParam, Any]]:
+        """Return a decorator of coroutine functions, like
+        :py:meth:`~kaioretry.Retry.aioretry`, following a named policy.
+
+        :param name: the name of the policy.
+
+        :param exceptions: the exceptions to retry.
+
+        :raises KeyError: on decoration, if the policy does not exist.
+        """
+        return functools.partial(
+            self.decorate, name, exceptions=exceptions, asynchronous=True
+        )
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return self.__class__, (
+            self.__policies,
+            self.__logger,
+            self.__metrics,
+            self.__instruments,
+        )
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({sorted(self.__policies)})"
+
+
+__all__ = ["PolicyRegistry"]
@@ -0,0 +1,430 @@
+"""Metrics shared by all the processes of a host, such as the workers of a
+gunicorn or uvicorn server, through a memory-mapped file.
+
+A :py:class:`SharedMetricsCollector` is a
+:py:class:`~kaioretry.metrics.MetricsCollector` whose counters and
+histograms live in a file, in which each process writes to its own slot.
+:py:meth:`~kaioretry.metrics.MetricsCollector.collect` and
+:py:meth:`~kaioretry.metrics.MetricsCollector.expose` sum up the slots of
+all processes, without any lock nor inter-process communication: a single
+exposition endpoint reports the retries of the whole host.
+
+.. code-block:: python
+   :caption: Host-wide metrics
+
+   from kaioretry import retry
+   from kaioretry.sharedmetrics import SharedMetricsCollector
+
+   metrics = SharedMetricsCollector("/dev/shm/kaioretry-metrics")
+
+   @retry(ConnectionError, tries=3, delay=1, metrics=metrics)
+   def fetch(url):
+       ...
+
+   # In any worker, e.g. in a /metrics view:
+   print(metrics.expose())
+
+
+The file is created by the first process opening it. The processes sharing
+a file must give the same buckets, slots and keys: they are checked against
+the file header. Since counters must never decrease, the file outlives the
+processes: remove it, if needed, when the server (re)starts, before any
+worker opens it.
+
+A process claims a slot on its first update. Processes forked afterwards
+claim their own. The slot of a dead process is handed over to a new process
+along with its counters, so that sums keep increasing. When all slots are
+taken by live processes, the metrics of the others are not shared.
+
+Each function, and each exception class caught for a function, takes a key.
+Once all keys are taken, the metrics of new ones are not shared either. Keys
+are at most :py:attr:`SharedMetricsCollector.KEY_SIZE` bytes long, and the
+keys of exception classes start with the key of their function: longer
+names are shortened to their start, followed by a digest of the whole name,
+so that they still get keys of their own.
+
+Slots are only written by their process, under a thread lock, and only
+claiming slots and keys locks the file. Unlike
+:py:class:`~kaioretry.metrics.MetricsCollector`, whose threads each update
+their own counters, the threads of a process then share a lock.
+"""
+
+import os
+import fcntl
+import struct
+import bisect
+import logging
+import weakref
+import threading
+import contextlib
+
+from typing import Any, Final, TypeAlias
+from collections.abc import Callable, Iterator, Sequence
+
+from .types import Number, Function
+from .state import _map_file, _shorten
+from .metrics import (
+    FunctionMetrics,
+    MetricsCollector,
+    DEFAULT_ATTEMPTS_BUCKETS,
+    DEFAULT_SECONDS_BUCKETS,
+)
+
+_logger = logging.getLogger(__name__)
+
+# magic, version, slots, keys, key size, number of attempts buckets, number
+# of seconds buckets. Bucket bounds follow, as doubles.
+_HEADER = struct.Struct("<8s6I")
+_MAGIC = b"KAIORTRY"
+_VERSION = 1
+_USED = struct.Struct("<Q")
+
+# The cells of a function row. Exception rows only use _CALLS.
+# Rows and slots are memoryviews of doubles.
+_Row: TypeAlias = "memoryview[float]"
+
+_CALLS, _ATTEMPTS, _SUCCESSES, _EXHAUSTIONS, _HISTOGRAMS = range(5)
+
+# The size of a key left to exception class names, at least.
+_EXCEPTION_SIZE = 32
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _alive(pid: int) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class _SharedFunctionMetrics(FunctionMetrics):
+    """The metrics of a decorated function, written to a row of the shared
+    file.
+
+    :param name: the key of the function.
+
+    :param row: the row of the function.
+
+    :param histograms: the offsets and bucket bounds of the histograms in
+        the row, by attribute name.
+
+    :param rows: return the row of a key, to count caught exceptions.
+
+    :param lock: the lock of the rows.
+    """
+
+    # pylint: disable=super-init-not-called, too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+
+    __slots__ = ("__name", "__row", "__histograms", "__rows", "__lock")
+
+    def __init__(
+        self,
+        name: str,
+        row: _Row,
+        histograms: dict[str, tuple[int, tuple[Number, ...]]],
+        rows: Callable[[str], _Row],
+        lock: threading.Lock,
+    ) -> None:
+        self.__name = name
+        self.__row = row
+        self.__histograms = histograms
+        self.__rows = rows
+        self.__lock = lock
+
+    def __observe(self, histogram: str, value: Number) -> None:
+        # Histograms are stored as their bucket counts, then their sum.
+        offset, bounds = self.__histograms[histogram]
+        self.__row[offset + bisect.bisect_left(bounds, value)] += 1
+        self.__row[offset + len(bounds) + 1] += value
+
+    def called(self) -> None:
+        with self.__lock:
+            self.__row[_CALLS] += 1
+
+    def slept(self, duration: Number) -> None:
+        with self.__lock:
+            self.__observe("sleep", duration)
+
+    def attempted(self, duration: Number) -> None:
+        with self.__lock:
+            self.__row[_ATTEMPTS] += 1
+            self.__observe("attempt_duration", duration)
+
+    def caught_error(self, error: BaseException) -> None:
+        size = SharedMetricsCollector.KEY_SIZE - len(self.__name.encode()) - 1
+        name = _shorten(error.__class__.__qualname__, size)
+        with self.__lock:
+            self.__rows(f"{self.__name}\0{name}")[_CALLS] += 1
+
+    def succeeded(self, attempts: int) -> None:
+        with self.__lock:
+            self.__row[_SUCCESSES] += 1
+            self.__observe("attempts_per_call", attempts)
+
+    def exhausted(self, attempts: int) -> None:
+        with self.__lock:
+            self.__row[_EXHAUSTIONS] += 1
+            self.__observe("attempts_per_call", attempts)
+
+
+class SharedMetricsCollector(MetricsCollector):
+    """Collect the metrics of the functions decorated by
+    :py:class:`~kaioretry.Retry` objects, in all the processes sharing a
+    memory-mapped file.
+
+    :param path: the path of the file, created if it does not exist.
+
+    :param attempts_buckets: the upper bounds of the attempts per call
+        histogram buckets.
+
+    :param seconds_buckets: the upper bounds of the durations histograms
+        buckets.
+
+    :param slots: the maximum number of processes.
+
+    :param keys: the maximum number of functions and caught exception
+        classes.
+
+    :raises ValueError: if slots or keys is not positive, or if the file was
+        created with other parameters.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    KEY_SIZE: Final[int] = 128
+    """The size of keys, in bytes."""
+
+    __collectors: "weakref.WeakSet[SharedMetricsCollector]" = weakref.WeakSet()
+
+    def __init__(
+        self,
+        path: str,
+        /,
+        attempts_buckets: Sequence[Number] = DEFAULT_ATTEMPTS_BUCKETS,
+        seconds_buckets: Sequence[Number] = DEFAULT_SECONDS_BUCKETS,
+        slots: int = 64,
+        keys: int = 256,
+    ) -> None:
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
+        if slots < 1 or keys < 1:
+            raise ValueError(
+                f"slots and keys must be positive ({slots}, {keys} given)"
+            )
+        super().__init__(attempts_buckets, seconds_buckets)
+        self.__path = path
+        self.__buckets = tuple(attempts_buckets), tuple(seconds_buckets)
+        self.__slots, self.__keys = slots, keys
+        self.__histograms: dict[str, tuple[int, tuple[Number, ...]]] = {}
+        offset = _HISTOGRAMS
+        for name, bounds in zip(
+            ("attempts_per_call", "sleep", "attempt_duration"),
+            (self.__buckets[0], *[self.__buckets[1]] * 2),
+        ):
+            self.__histograms[name] = offset, bounds
+            offset += len(bounds) + 2
+        self.__cells = offset
+        header = _HEADER.pack(
+            _MAGIC,
+            _VERSION,
+            slots,
+            keys,
+            self.KEY_SIZE,
+            len(self.__buckets[0]),
+            len(self.__buckets[1]),
+        ) + struct.pack(
+            f"<{len(self.__buckets[0]) + len(self.__buckets[1])}d",
+            *self.__buckets[0],
+            *self.__buckets[1],
+        )
+        self.__used_offset = _align(len(header))
+        self.__names_offset = self.__used_offset + _USED.size
+        slots_offset = self.__names_offset + keys * self.KEY_SIZE
+        # A slot is the pid of its process, then a row per key.
+        self.__slot_size = 1 + keys * self.__cells
+        size = slots_offset + slots * self.__slot_size * 8
+        self.__fd, self.__mmap = _map_file(path, header, size)
+        self.__data = memoryview(self.__mmap)[slots_offset:].cast("d")
+        self.__reset_process()
+        self.__collectors.add(self)
+
+    def __reset_process(self) -> None:
+        self.__lock = threading.Lock()
+        self.__slot: _Row | None = None
+        self.__rows: dict[str, _Row] = {}
+        self.__functions: dict[Function, _SharedFunctionMetrics] = {}
+
+    @classmethod
+    def _reset_all(cls) -> None:
+        """Forget the slots of all collectors, so that forked processes
+        claim their own."""
+        for collector in cls.__collectors:
+            # pylint: disable-next=protected-access
+            collector.__reset_process()
+
+    @contextlib.contextmanager
+    def __file_lock(self) -> Iterator[None]:
+        # lockf locks are owned by processes: they are not inherited by
+        # forked children, unlike flock ones.
+        fcntl.lockf(self.__fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self.__fd, fcntl.LOCK_UN)
+
+    def __claim_slot(self) -> _Row:
+        pid = os.getpid()
+        with self.__file_lock():
+            for slot in range(self.__slots):
+                start = slot * self.__slot_size
+                if not _alive(int(self.__data[start])):
+                    self.__data[start] = pid
+                    return self.__data[start : start + self.__slot_size]
+        _logger.warning(
+            "%s: all slots are taken, metrics of process %d are not shared",
+            self.__path,
+            pid,
+        )
+        return memoryview(bytearray(8 * self.__slot_size)).cast("d")
+
+    def __names(self) -> Iterator[str]:
+        (used,) = _USED.unpack_from(self.__mmap, self.__used_offset)
+        for key in range(min(used, self.__keys)):
+            start = self.__names_offset + key * self.KEY_SIZE
+            name = self.__mmap[start : start + self.KEY_SIZE]
+            yield name.rstrip(b"\0").decode("utf-8", "ignore")
+
+    def __key(self, name: str) -> int | None:
+        encoded = name.encode("utf-8")
+        with self.__file_lock():
+            names = list(self.__names())
+            if name in names:
+                return names.index(name)
+            if len(names) == self.__keys:
+                return None
+            start = self.__names_offset + len(names) * self.KEY_SIZE
+            self.__mmap[start : start + len(encoded)] = encoded
+            # Readers only see the name once it is complete.
+            _USED.pack_into(self.__mmap, self.__used_offset, len(names) + 1)
+            return len(names)
+
+    def __row(self, name: str) -> _Row:
+        """Return the row of a key of the current process slot. Must be
+        called with the thread lock held."""
+        try:
+            return self.__rows[name]
+        except KeyError:
+            pass
+        if self.__slot is None:
+            self.__slot = self.__claim_slot()
+        key = self.__key(name)
+        if key is None:
+            _logger.warning(
+                "%s: all keys are taken, metrics of %s are not shared",
+                self.__path,
+                name,
+            )
+            row = memoryview(bytearray(8 * self.__cells)).cast("d")
+        else:
+            start = 1 + key * self.__cells
+            row = self.__slot[start : start + self.__cells]
+        self.__rows[name] = row
+        return row
+
+    def function(self, func: Function) -> FunctionMetrics:
+        """Return the metrics of a function, for the current process.
+
+        :param func: the decorated function.
+
+        :returns: a :py:class:`~kaioretry.metrics.FunctionMetrics` object,
+            to be updated.
+        """
+        try:
+            return self.__functions[func]
+        except KeyError:
+            pass
+        name = _shorten(
+            f"{func.__module__}.{func.__qualname__}",
+            self.KEY_SIZE - _EXCEPTION_SIZE - 1,
+        )
+        with self.__lock:
+            metrics = _SharedFunctionMetrics(
+                name,
+                self.__row(name),
+                self.__histograms,
+                self.__row,
+                self.__lock,
+            )
+            return self.__functions.setdefault(func, metrics)
+
+    def __add_row(self, metrics: FunctionMetrics, row: _Row) -> None:
+        metrics.calls += int(row[_CALLS])
+        metrics.attempts += int(row[_ATTEMPTS])
+        metrics.successes += int(row[_SUCCESSES])
+        metrics.exhaustions += int(row[_EXHAUSTIONS])
+        for name, (offset, bounds) in self.__histograms.items():
+            histogram = getattr(metrics, name)
+            for index in range(len(bounds) + 1):
+                histogram.counts[index] += int(row[offset + index])
+            histogram.sum += row[offset + len(bounds) + 1]
+
+    def collect(self) -> dict[str, FunctionMetrics]:
+        """Sum up the metrics of all processes.
+
+        :returns: the metrics, by function qualified name, shortened if
+            needed.
+        """
+        result: dict[str, FunctionMetrics] = {}
+        for key, name in enumerate(self.__names()):
+            function, _, exception = name.partition("\0")
+            if function not in result:
+                result[function] = FunctionMetrics(*self.__buckets)
+            metrics = result[function]
+            for slot in range(self.__slots):
+                start = slot * self.__slot_size + 1 + key * self.__cells
+                row = self.__data[start : start + self.__cells]
+                if exception:
+                    metrics.caught[exception] = metrics.caught.get(
+                        exception, 0
+                    ) + int(row[_CALLS])
+                else:
+                    self.__add_row(metrics, row)
+        return result
+
+    def reset(self) -> None:
+        """Forget the metrics of all processes. Updates made meanwhile by
+        other processes may be lost."""
+        zeros = memoryview(bytearray(8 * (self.__slot_size - 1))).cast("d")
+        with self.__lock, self.__file_lock():
+            for slot in range(self.__slots):
+                start = slot * self.__slot_size + 1
+                self.__data[start : start + self.__slot_size - 1] = zeros
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return self.__class__, (
+            self.__path,
+            *self.__buckets,
+            self.__slots,
+            self.__keys,
+        )
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.__path!r})"
+
+
+os.register_at_fork(
+    after_in_child=(
+        SharedMetricsCollector._reset_all  # pylint: disable=protected-access
+    )
+)
+
+
+__all__ = ["SharedMetricsCollector"]
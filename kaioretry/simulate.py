@@ -0,0 +1,393 @@
+"""Simulate the behaviour of a retry policy against a failing service, to
+choose its ``tries``, ``delay``, ``backoff``, ``jitter`` and ``max_delay``
+parameters with some hindsight.
+
+A :py:class:`FailureModel` describes the service: how often attempts fail,
+how often and how long it is down, and how long attempts take. The
+:py:func:`simulate` function then runs a large number of calls against it,
+on a :py:class:`~kaioretry.clock.VirtualClock` time line, and sums them up
+as a :py:class:`Report`.
+
+.. code-block:: python
+   :caption: How bad would a 10% failure rate be?
+
+   >>> from kaioretry.simulate import FailureModel, simulate
+   >>> model = FailureModel(failure_rate=0.1, latency=(0.01, 0.05))
+   >>> print(simulate(model, tries=3, delay=0.1, backoff=2, seed=1))
+   calls: 100000
+   success rate: 99.90%
+   latency p50: 0.0321s, p99: 0.1954s, max: 0.4428s
+   attempts per call: 1.11
+   amplification: 1.11
+
+
+When :py:mod:`numpy` is installed, and the policy is made of a numeric
+backoff and of a numeric or random jitter, all calls are simulated at once,
+which makes millions of calls a matter of seconds. Otherwise, calls are
+simulated one by one, by actual :py:class:`~kaioretry.Context` loops.
+
+The simulator can also be run from the command line:
+
+.. code-block:: shell
+
+   python -m kaioretry simulate --tries 3 --delay 0.1 --backoff 2 \\
+       --failure-rate 0.1 --latency 0.01 0.05
+
+"""
+
+import math
+import random
+import logging
+
+from typing import Any, cast
+from collections.abc import Sequence
+
+from .types import Number, NonNegative, Jitter, DelayStrategy
+from .backoff import (
+    RandomSource,
+    KeyedJitter,
+    DEFAULT_RANDOM_SOURCE,
+    _policy_update_delay,
+)
+from .clock import VirtualClock
+from .context import Context
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    HAVE_NUMPY = False
+else:
+    HAVE_NUMPY = True
+
+
+Duration = NonNegative | tuple[NonNegative, NonNegative]
+"""A number of seconds, or a (low, high) :py:class:`tuple`, in which case
+values are uniformly picked in that range."""
+
+
+# Out of the logging hierarchy: simulated calls are silent, and the level of
+# the module logger is left alone.
+_quiet_logger = logging.Logger(__name__, logging.CRITICAL + 1)
+
+
+class FailureModel:
+    """The behaviour of a simulated service.
+
+    :param failure_rate: the probability of any attempt to fail, on its
+        own. Default: 0.
+
+    :param outage_rate: the probability of a call to start while the
+        service is down, in which case all attempts fail until the end of the
+        outage. Default: 0.
+
+    :param outage_duration: how long the service remains down, from the
+        start of a call that hits an outage. Default: 0.
+
+    :param latency: how long each attempt takes, whether it fails or
+        not. Default: 0.
+
+    :raises ValueError: if a rate is not a probability, or if a duration is
+        negative.
+    """
+
+    def __init__(
+        self,
+        /,
+        failure_rate: float = 0,
+        *,
+        outage_rate: float = 0,
+        outage_duration: Duration = 0,
+        latency: Duration = 0,
+    ) -> None:
+        for name, rate in (
+            ("failure_rate", failure_rate),
+            ("outage_rate", outage_rate),
+        ):
+            if not 0 <= rate <= 1:
+                raise ValueError(f"{name} must be within [0, 1]: {rate}")
+        for name, duration in (
+            ("outage_duration", outage_duration),
+            ("latency", latency),
+        ):
+            low, high = self.__range(duration)
+            if not 0 <= low <= high:
+                raise ValueError(f"invalid {name}: {duration}")
+        self.__failure_rate = failure_rate
+        self.__outage_rate = outage_rate
+        self.__outage_duration = self.__range(outage_duration)
+        self.__latency = self.__range(latency)
+
+    @staticmethod
+    def __range(duration: Duration) -> tuple[NonNegative, NonNegative]:
+        if isinstance(duration, (int, float)):
+            return duration, duration
+        low, high = duration
+        return low, high
+
+    @property
+    def failure_rate(self) -> float:
+        """The probability of any attempt to fail."""
+        return self.__failure_rate
+
+    @property
+    def outage_rate(self) -> float:
+        """The probability of a call to start during an outage."""
+        return self.__outage_rate
+
+    @property
+    def outage_duration(self) -> tuple[NonNegative, NonNegative]:
+        """The range of outage durations."""
+        return self.__outage_duration
+
+    @property
+    def latency(self) -> tuple[NonNegative, NonNegative]:
+        """The range of attempt latencies."""
+        return self.__latency
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self.__failure_rate}, "
+            f"outage_rate={self.__outage_rate}, "
+            f"outage_duration={self.__outage_duration}, "
+            f"latency={self.__latency})"
+        )
+
+
+class Report:
+    """The outcome of a simulation.
+
+    :param latencies: the end-to-end latency of each call, sorted.
+
+    :param attempts: the total number of attempts.
+
+    :param successes: the number of calls that eventually succeeded.
+    """
+
+    def __init__(
+        self, latencies: Sequence[float], attempts: int, successes: int
+    ) -> None:
+        self.__calls = len(latencies)
+        self.__p50 = float(latencies[self.__rank(latencies, 50)])
+        self.__p99 = float(latencies[self.__rank(latencies, 99)])
+        self.__max = float(latencies[-1])
+        self.__attempts = attempts
+        self.__successes = successes
+
+    @staticmethod
+    def __rank(latencies: Sequence[float], percent: int) -> int:
+        return max(math.ceil(len(latencies) * percent / 100) - 1, 0)
+
+    @property
+    def calls(self) -> int:
+        """The number of simulated calls."""
+        return self.__calls
+
+    @property
+    def success_rate(self) -> float:
+        """The proportion of calls that eventually succeeded."""
+        return self.__successes / self.__calls
+
+    @property
+    def p50(self) -> float:
+        """The median end-to-end latency of calls."""
+        return self.__p50
+
+    @property
+    def p99(self) -> float:
+        """The 99th percentile of end-to-end latency of calls."""
+        return self.__p99
+
+    @property
+    def max(self) -> float:
+        """The maximum end-to-end latency of calls."""
+        return self.__max
+
+    @property
+    def attempts(self) -> float:
+        """The mean number of attempts per call."""
+        return self.__attempts / self.__calls
+
+    @property
+    def amplification(self) -> float:
+        """The number of attempts the service had to handle, per successful
+        call: how much the load is amplified by retries. Infinite if no call
+        succeeded."""
+        if not self.__successes:
+            return math.inf
+        return self.__attempts / self.__successes
+
+    def __str__(self) -> str:
+        return (
+            f"calls: {self.calls}\n"
+            f"success rate: {self.success_rate:.2%}\n"
+            f"latency p50: {self.p50:.4f}s, p99: {self.p99:.4f}s, "
+            f"max: {self.max:.4f}s\n"
+            f"attempts per call: {self.attempts:.2f}\n"
+            f"amplification: {self.amplification:.2f}"
+        )
+
+
+def _uniform(generator: random.Random, low: Number, high: Number) -> float:
+    return low if low == high else generator.uniform(low, high)
+
+
+def _simulate_loops(
+    model: FailureModel,
+    context: Context,
+    clock: VirtualClock,
+    calls: int,
+    generator: random.Random,
+) -> Report:
+    # pylint: disable=too-many-locals
+    latencies = []
+    attempts = successes = 0
+    failure_rate, outage_rate = model.failure_rate, model.outage_rate
+    for _ in range(calls):
+        start = clock.time()
+        outage_end = start
+        if generator.random() < outage_rate:
+            outage_end += _uniform(generator, *model.outage_duration)
+        for _ in context:
+            attempts += 1
+            failed = clock.time() < outage_end
+            # Always draw, so that outcomes do not depend on outages.
+            failed = generator.random() < failure_rate or failed
+            clock.sleep(_uniform(generator, *model.latency))
+            if not failed:
+                successes += 1
+                break
+        latencies.append(clock.time() - start)
+    latencies.sort()
+    return Report(latencies, attempts, successes)
+
+
+def _simulate_arrays(
+    model: FailureModel,
+    calls: int,
+    seed: int | None,
+    policy: dict[str, Any],
+) -> Report:
+    # pylint: disable=too-many-locals
+    generator = numpy.random.default_rng(seed)
+
+    def sample(low: Number, high: Number, size: int) -> Any:
+        if low == high:
+            return numpy.full(size, float(low))
+        return generator.uniform(low, high, size)
+
+    elapsed = numpy.zeros(calls)
+    attempts = numpy.zeros(calls, dtype=numpy.int64)
+    succeeded = numpy.zeros(calls, dtype=bool)
+    outage_end = numpy.where(
+        generator.random(calls) < model.outage_rate,
+        sample(*model.outage_duration, calls),
+        0.0,
+    )
+    delay = numpy.full(calls, float(policy["delay"]))
+    jitter = policy["jitter"]
+    low, high = (jitter, jitter) if isinstance(jitter, Number) else jitter
+    max_delay = policy["max_delay"]
+    active = numpy.arange(calls)
+    tries = policy["tries"]
+    while True:
+        attempts[active] += 1
+        start = elapsed[active]
+        failed = (start < outage_end[active]) | (
+            generator.random(active.size) < model.failure_rate
+        )
+        elapsed[active] = start + sample(*model.latency, active.size)
+        succeeded[active[~failed]] = True
+        active = active[failed]
+        tries -= 1
+        if not (tries and active.size):
+            break
+        current = delay[active]
+        elapsed[active] += current
+        current = current * policy["backoff"] + sample(low, high, active.size)
+        if max_delay is not None:
+            current = numpy.minimum(current, max_delay)
+        delay[active] = numpy.maximum(current, policy["min_delay"])
+    elapsed.sort()
+    latencies = cast(Sequence[float], elapsed)
+    return Report(latencies, int(attempts.sum()), int(succeeded.sum()))
+
+
+def simulate(
+    model: FailureModel,
+    /,
+    calls: int = 100000,
+    *,
+    tries: int = -1,
+    delay: NonNegative = 0,
+    backoff: Number | DelayStrategy = 1,
+    jitter: Jitter | KeyedJitter = 0,
+    max_delay: NonNegative | None = None,
+    min_delay: NonNegative = 0,
+    seed: int | None = None,
+    vectorise: bool = True,
+) -> Report:
+    """Simulate calls to a service, through a retry policy.
+
+    :param model: the behaviour of the service.
+
+    :param calls: the number of calls to simulate.
+
+    :param tries: see :py:func:`~kaioretry.retry`.
+
+    :param delay: see :py:func:`~kaioretry.retry`.
+
+    :param backoff: see :py:func:`~kaioretry.retry`.
+
+    :param jitter: see :py:func:`~kaioretry.retry`.
+
+    :param max_delay: see :py:func:`~kaioretry.retry`.
+
+    :param min_delay: see :py:func:`~kaioretry.retry`.
+
+    :param seed: the seed of the random values, for repeatable
+        simulations.
+
+    :param vectorise: if False, never use :py:mod:`numpy`.
+
+    :returns: a :py:class:`Report`.
+
+    :raises ValueError: if the policy parameters are invalid, if there are
+        no calls to simulate, or if calls would never end, because tries are
+        unlimited and all attempts fail.
+    """
+    # pylint: disable=too-many-arguments
+    if calls < 1:
+        raise ValueError(f"calls must be positive: {calls}")
+    if tries < 0 and model.failure_rate == 1:
+        raise ValueError("unlimited tries of always failing calls")
+    source = DEFAULT_RANDOM_SOURCE if seed is None else RandomSource(seed)
+    update_delay = _policy_update_delay(backoff, jitter, source)
+    clock = VirtualClock()
+    context = Context(
+        tries,
+        delay,
+        update_delay=update_delay,
+        max_delay=max_delay,
+        min_delay=min_delay,
+        logger=_quiet_logger,
+        clock=clock,
+    )
+    if (
+        vectorise
+        and HAVE_NUMPY
+        and isinstance(backoff, Number)
+        and not isinstance(jitter, KeyedJitter)
+    ):
+        policy = {
+            "tries": tries,
+            "delay": delay,
+            "backoff": backoff,
+            "jitter": jitter,
+            "max_delay": max_delay,
+            "min_delay": min_delay,
+        }
+        return _simulate_arrays(model, calls, seed, policy)
+    return _simulate_loops(model, context, clock, calls, random.Random(seed))
+
+
+__all__ = ["FailureModel", "Report", "simulate", "Duration"]
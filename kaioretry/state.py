@@ -0,0 +1,508 @@
+"""Where retry policies, such as :py:class:`~kaioretry.breaker.CircuitBreaker`
+and :py:class:`~kaioretry.budget.RetryBudget`, keep their state.
+
+A :py:class:`StateBackend` holds named numbers, and updates them atomically.
+Policies sharing a backend share their view of the health of a dependency:
+
+* a :py:class:`LocalState` is shared by the threads of a process;
+* a :py:class:`SharedMemoryState` is shared by the processes of a host,
+  through a memory-mapped file;
+* a :py:class:`SocketState` is shared by the clients of a
+  :py:class:`StateServer`, through a Unix socket.
+
+.. code-block:: python
+   :caption: A circuit breaker shared by all the workers of a host
+
+   from kaioretry import Retry
+   from kaioretry.breaker import CircuitBreaker
+   from kaioretry.state import SharedMemoryState
+
+   state = SharedMemoryState("/dev/shm/kaioretry-state")
+   retry = CircuitBreaker(state, "payments").instrument(
+       Retry(ConnectionError)
+   )
+
+
+Missing names are worth 0. Reading a number never blocks.
+:py:class:`SharedMemoryState` updates lock the number they update only, in
+the process, then in the file, and reading a missing name does not take
+any of its slots. :py:class:`StateServer` is a stand-in for a
+real coordination service: it handles each client in a thread, and clients
+raise :py:class:`ConnectionError` when it cannot be reached.
+"""
+
+import os
+import json
+import math
+import mmap
+import fcntl
+import socket
+import struct
+import hashlib
+import threading
+import socketserver
+import contextlib
+
+from typing import cast, Any, Final, Protocol
+from collections.abc import Iterator
+
+
+class StateBackend(Protocol):
+    """Named numbers, updated atomically."""
+
+    def get(self, key: str) -> float:
+        """Return a number.
+
+        :param key: the name of the number.
+        """
+
+    def set(self, key: str, value: float) -> None:
+        """Change a number.
+
+        :param key: the name of the number.
+
+        :param value: its new value.
+        """
+
+    def add(
+        self,
+        key: str,
+        delta: float,
+        low: float = -math.inf,
+        high: float = math.inf,
+    ) -> float:
+        """Add to a number, keeping it within bounds.
+
+        :param key: the name of the number.
+
+        :param delta: the number to add.
+
+        :param low: the lowest value of the result.
+
+        :param high: the highest value of the result.
+
+        :returns: the new value.
+        """
+
+    def compare_and_set(self, key: str, expected: float, value: float) -> bool:
+        """Change a number, if it still has its expected value.
+
+        :param key: the name of the number.
+
+        :param expected: the expected current value.
+
+        :param value: the new value.
+
+        :returns: whether the number was changed.
+        """
+
+
+def _clamp(value: float, low: float, high: float) -> float:
+    return min(max(value, low), high)
+
+
+def _shorten(name: str, size: int) -> str:
+    """Return a name if it fits in size bytes, or its start, followed by a
+    digest of the whole name, otherwise."""
+    encoded = name.encode("utf-8")
+    if len(encoded) <= size:
+        return name
+    digest = hashlib.blake2b(encoded, digest_size=8).hexdigest()
+    start = encoded[: size - len(digest) - 1].decode("utf-8", "ignore")
+    return f"{start}~{digest}"
+
+
+class LocalState:
+    """A :py:class:`StateBackend` shared by the threads of a process."""
+
+    def __init__(self) -> None:
+        self.__values: dict[str, float] = {}
+        self.__lock = threading.Lock()
+
+    def get(self, key: str) -> float:
+        """See :py:meth:`StateBackend.get`."""
+        return self.__values.get(key, 0)
+
+    def set(self, key: str, value: float) -> None:
+        """See :py:meth:`StateBackend.set`."""
+        with self.__lock:
+            self.__values[key] = value
+
+    def add(
+        self,
+        key: str,
+        delta: float,
+        low: float = -math.inf,
+        high: float = math.inf,
+    ) -> float:
+        """See :py:meth:`StateBackend.add`."""
+        with self.__lock:
+            value = self.__values[key] = _clamp(
+                self.__values.get(key, 0) + delta, low, high
+            )
+            return value
+
+    def compare_and_set(self, key: str, expected: float, value: float) -> bool:
+        """See :py:meth:`StateBackend.compare_and_set`."""
+        with self.__lock:
+            if self.__values.get(key, 0) != expected:
+                return False
+            self.__values[key] = value
+            return True
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # The state of a process: do not carry it along.
+        return self.__class__, ()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}()"
+
+
+def _map_file(path: str, header: bytes, size: int) -> tuple[int, mmap.mmap]:
+    """Map a file starting with a header, creating it if needed.
+
+    :returns: the file descriptor, for locking, and the mapping.
+
+    :raises ValueError: if the file has another header or size.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    # The first byte is locked while creating the file.
+    fcntl.lockf(fd, fcntl.LOCK_EX, 1, 0)
+    try:
+        if os.fstat(fd).st_size == 0:
+            os.ftruncate(fd, size)
+            os.pwrite(fd, header, 0)
+        compatible = (
+            os.fstat(fd).st_size == size
+            and os.pread(fd, len(header), 0) == header
+        )
+    finally:
+        fcntl.lockf(fd, fcntl.LOCK_UN, 1, 0)
+    if not compatible:
+        os.close(fd)
+        raise ValueError(f"{path} was created with other parameters")
+    return fd, mmap.mmap(fd, size)
+
+
+# magic, version, keys
+_HEADER = struct.Struct("<8sII")
+_MAGIC = b"KAIOSTAT"
+_VERSION = 1
+_USED = struct.Struct("<Q")
+
+
+class SharedMemoryState:
+    """A :py:class:`StateBackend` shared by the processes of a host, through
+    a memory-mapped file.
+
+    :param path: the path of the file, created if it does not exist.
+
+    :param keys: the maximum number of names.
+
+    :raises ValueError: if keys is not positive, or if the file was created
+        with another number of keys.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    KEY_SIZE: Final[int] = 128
+    """The size of names, in bytes. Longer names are stored as their start,
+    followed by a digest of the whole name."""
+
+    def __init__(self, path: str, /, keys: int = 256) -> None:
+        if keys < 1:
+            raise ValueError(f"keys must be positive ({keys} given)")
+        self.__path = path
+        self.__keys = keys
+        header = _HEADER.pack(_MAGIC, _VERSION, keys)
+        self.__used_offset = _HEADER.size
+        self.__names_offset = self.__used_offset + _USED.size
+        self.__values_offset = self.__names_offset + keys * self.KEY_SIZE
+        size = self.__values_offset + keys * 8
+        self.__fd, self.__mmap = _map_file(path, header, size)
+        self.__values = memoryview(self.__mmap)[self.__values_offset :].cast(
+            "d"
+        )
+        self.__indexes: dict[str, int] = {}
+        # One lock for the names, and one per number.
+        self.__lock = threading.Lock()
+        self.__locks = [threading.Lock() for _ in range(keys)]
+
+    @contextlib.contextmanager
+    def __file_lock(self, offset: int) -> Iterator[None]:
+        # Offset 0 stands for the names, others for the values stored there.
+        # lockf locks are owned by processes: threads must lock first.
+        fcntl.lockf(self.__fd, fcntl.LOCK_EX, 1, offset)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self.__fd, fcntl.LOCK_UN, 1, offset)
+
+    def __find(self, encoded: bytes) -> tuple[int | None, int]:
+        # Names are written before being counted as used: no lock needed.
+        (used,) = _USED.unpack_from(self.__mmap, self.__used_offset)
+        for index in range(used):
+            start = self.__names_offset + index * self.KEY_SIZE
+            name = self.__mmap[start : start + self.KEY_SIZE]
+            if name.rstrip(b"\0") == encoded:
+                return index, used
+        return None, used
+
+    def __index(self, key: str, allocate: bool = True) -> int | None:
+        try:
+            return self.__indexes[key]
+        except KeyError:
+            pass
+        encoded = _shorten(key, self.KEY_SIZE).encode("utf-8")
+        index, _ = self.__find(encoded)
+        if index is None:
+            if not allocate:
+                return None
+            with self.__lock, self.__file_lock(0):
+                index, used = self.__find(encoded)
+                if index is None:
+                    if used == self.__keys:
+                        raise ValueError(f"{self.__path}: all keys are taken")
+                    index = used
+                    start = self.__names_offset + index * self.KEY_SIZE
+                    self.__mmap[start : start + len(encoded)] = encoded
+                    _USED.pack_into(self.__mmap, self.__used_offset, used + 1)
+        self.__indexes[key] = index
+        return index
+
+    @contextlib.contextmanager
+    def __locked(self, key: str) -> Iterator[int]:
+        index = cast(int, self.__index(key))
+        offset = self.__values_offset + index * 8
+        with self.__locks[index], self.__file_lock(offset):
+            yield index
+
+    def get(self, key: str) -> float:
+        """See :py:meth:`StateBackend.get`."""
+        index = self.__index(key, allocate=False)
+        return 0.0 if index is None else self.__values[index]
+
+    def set(self, key: str, value: float) -> None:
+        """See :py:meth:`StateBackend.set`."""
+        with self.__locked(key) as index:
+            self.__values[index] = value
+
+    def add(
+        self,
+        key: str,
+        delta: float,
+        low: float = -math.inf,
+        high: float = math.inf,
+    ) -> float:
+        """See :py:meth:`StateBackend.add`."""
+        with self.__locked(key) as index:
+            value = _clamp(self.__values[index] + delta, low, high)
+            self.__values[index] = value
+            return value
+
+    def compare_and_set(self, key: str, expected: float, value: float) -> bool:
+        """See :py:meth:`StateBackend.compare_and_set`."""
+        with self.__locked(key) as index:
+            if self.__values[index] != expected:
+                return False
+            self.__values[index] = value
+            return True
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return self.__class__, (self.__path, self.__keys)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.__path!r})"
+
+
+_OPERATIONS = ("get", "set", "add", "compare_and_set")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Handle the requests of a client: a JSON line per request and per
+    response."""
+
+    server: "_Server"
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections.add(self.connection)
+
+    def finish(self) -> None:
+        with self.server.lock:
+            self.server.connections.discard(self.connection)
+        super().finish()
+
+    def handle(self) -> None:
+        # Clients may go away at any time, e.g. when their process exits.
+        with contextlib.suppress(ConnectionError):
+            self.__handle()
+
+    def __handle(self) -> None:
+        for line in self.rfile:
+            try:
+                operation, args = json.loads(line)
+                if operation not in _OPERATIONS:
+                    raise ValueError(f"unknown operation {operation!r}")
+                response = {
+                    "result": getattr(self.server.backend, operation)(*args)
+                }
+            except (ValueError, TypeError) as error:
+                response = {"error": str(error)}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    """A Unix socket server holding a backend."""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, backend: StateBackend) -> None:
+        self.backend = backend
+        self.lock = threading.Lock()
+        self.connections: set[socket.socket] = set()
+        super().__init__(path, _Handler)
+
+    def close_connections(self) -> None:
+        """Close the connections of the clients."""
+        with self.lock:
+            for connection in self.connections:
+                with contextlib.suppress(OSError):
+                    connection.shutdown(socket.SHUT_RDWR)
+
+
+class StateServer:
+    """Serve a :py:class:`StateBackend` to :py:class:`SocketState` clients,
+    through a Unix socket, from a thread.
+
+    :param path: the path of the socket.
+
+    :param backend: the served backend. Default: a new
+        :py:class:`LocalState`.
+    """
+
+    def __init__(self, path: str, backend: StateBackend | None = None) -> None:
+        self.__path = path
+        self.__backend = LocalState() if backend is None else backend
+        self.__server: _Server | None = None
+        self.__thread: threading.Thread | None = None
+
+    @property
+    def backend(self) -> StateBackend:
+        """The served backend."""
+        return self.__backend
+
+    def start(self) -> None:
+        """Listen to the socket and serve clients, in a thread."""
+        self.__server = _Server(self.__path, self.__backend)
+        self.__thread = threading.Thread(
+            target=self.__server.serve_forever,
+            name=f"kaioretry-state-{self.__path}",
+            daemon=True,
+        )
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """Stop serving, and remove the socket."""
+        if self.__server is None or self.__thread is None:
+            return
+        self.__server.shutdown()
+        self.__server.close_connections()
+        self.__server.server_close()
+        self.__thread.join()
+        self.__server = self.__thread = None
+        os.unlink(self.__path)
+
+    def __enter__(self) -> "StateServer":
+        self.start()
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.stop()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.__path!r})"
+
+
+class SocketState:
+    """A :py:class:`StateBackend` served by a :py:class:`StateServer`.
+
+    Each thread of each process has its own connection to the server.
+
+    :param path: the path of the socket of the server.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.__path = path
+        self.__local = threading.local()
+
+    def __connection(self) -> tuple[socket.socket, Any]:
+        # Forked processes must not share their parent connection.
+        connection: tuple[int, socket.socket, Any] | None = getattr(
+            self.__local, "connection", None
+        )
+        if connection is None or connection[0] != os.getpid():
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            client.connect(self.__path)
+            connection = os.getpid(), client, client.makefile("rb")
+            self.__local.connection = connection
+        return connection[1], connection[2]
+
+    def __request(self, operation: str, *args: Any) -> Any:
+        client, responses = self.__connection()
+        try:
+            client.sendall(
+                json.dumps([operation, args]).encode("utf-8") + b"\n"
+            )
+            line = responses.readline()
+            if not line:
+                raise ConnectionError(f"{self.__path}: connection closed")
+        except OSError:
+            del self.__local.connection
+            client.close()
+            raise
+        response = json.loads(line)
+        if "error" in response:
+            raise ValueError(f"{self.__path}: {response['error']}")
+        return response["result"]
+
+    def get(self, key: str) -> float:
+        """See :py:meth:`StateBackend.get`."""
+        result: float = self.__request("get", key)
+        return result
+
+    def set(self, key: str, value: float) -> None:
+        """See :py:meth:`StateBackend.set`."""
+        self.__request("set", key, value)
+
+    def add(
+        self,
+        key: str,
+        delta: float,
+        low: float = -math.inf,
+        high: float = math.inf,
+    ) -> float:
+        """See :py:meth:`StateBackend.add`."""
+        result: float = self.__request("add", key, delta, low, high)
+        return result
+
+    def compare_and_set(self, key: str, expected: float, value: float) -> bool:
+        """See :py:meth:`StateBackend.compare_and_set`."""
+        result: bool = self.__request("compare_and_set", key, expected, value)
+        return result
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return self.__class__, (self.__path,)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.__path!r})"
+
+
+__all__ = [
+    "StateBackend",
+    "LocalState",
+    "SharedMemoryState",
+    "StateServer",
+    "SocketState",
+]
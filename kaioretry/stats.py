@@ -0,0 +1,288 @@
+"""Live statistics of retried functions: which ones are being called,
+retried, or sleeping right now, and how long their attempts take.
+
+Statistics are kept by :py:class:`~kaioretry.Retry` objects created with
+``stats=True``. The functions they decorate then have a ``stats`` attribute,
+a :py:class:`FunctionStats` object, and :py:meth:`Retry.stats()
+<kaioretry.Retry.stats>` sums up the statistics of all of them.
+
+.. code-block:: python
+   :caption: Live statistics
+
+   from kaioretry import Retry, Context
+
+   retry = Retry(ConnectionError, Context(tries=3, delay=1), stats=True)
+
+   @retry
+   def fetch(url):
+       ...
+
+   print(fetch.stats.snapshot())
+   print(retry.stats())
+
+
+Like :py:class:`~kaioretry.metrics.MetricsCollector`, statistics are
+updated through :py:mod:`~kaioretry.hooks`, by each thread in its own
+counters: neither updates nor snapshots involve any lock, except for the
+first call made by a thread.
+
+Attempt durations are counted by an :py:class:`AttemptHistogram`, whose
+buckets grow exponentially, so that a few dozens of them cover latencies
+from microseconds to hours with a bounded relative error.
+"""
+
+import math
+import threading
+
+from typing import Any
+from collections.abc import Iterator
+
+from .types import Function, Number
+from .hooks import RetryState
+
+
+class AttemptHistogram:
+    """A sparse histogram of durations, with logarithmic buckets: each power
+    of two is split in :py:attr:`SUB_BUCKETS` buckets, so that the relative
+    error of percentiles stays under 1 / :py:attr:`SUB_BUCKETS`.
+
+    :param resolution: the smallest duration told apart from 0, in seconds.
+    """
+
+    SUB_BUCKETS = 4
+    """The number of buckets per power of two."""
+
+    __slots__ = ("resolution", "counts", "sum")
+
+    def __init__(self, resolution: float = 1e-6) -> None:
+        self.resolution = resolution
+        self.counts: dict[int, int] = {}
+        self.sum: float = 0
+
+    def __index(self, value: Number) -> int:
+        if value < self.resolution:
+            return -1
+        mantissa, exponent = math.frexp(value / self.resolution)
+        sub = int((mantissa - 0.5) * 2 * self.SUB_BUCKETS)
+        return exponent * self.SUB_BUCKETS + sub
+
+    def upper_bound(self, index: int) -> float:
+        """Return the upper bound of a bucket.
+
+        :param index: the index of the bucket.
+
+        :returns: a number of seconds.
+        """
+        if index < 0:
+            return self.resolution
+        exponent, sub = divmod(index, self.SUB_BUCKETS)
+        mantissa = 0.5 + (sub + 1) / (2 * self.SUB_BUCKETS)
+        return math.ldexp(mantissa, exponent) * self.resolution
+
+    def observe(self, value: Number) -> None:
+        """Count a duration.
+
+        :param value: the duration, in seconds.
+        """
+        index = self.__index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.sum += value
+
+    def merge(self, other: "AttemptHistogram") -> None:
+        """Add the durations counted by another histogram, of the same
+        resolution."""
+        for index, count in other.counts.copy().items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.sum += other.sum
+
+    @property
+    def count(self) -> int:
+        """The number of counted durations."""
+        return sum(self.counts.values())
+
+    def buckets(self) -> Iterator[tuple[float, int]]:
+        """Iterate over the non-empty buckets, in increasing order.
+
+        :returns: an iterator of (upper bound, count) :py:class:`tuple`
+            objects.
+        """
+        for index in sorted(self.counts):
+            yield self.upper_bound(index), self.counts[index]
+
+    def percentile(self, percent: float) -> float:
+        """Estimate a percentile of the counted durations.
+
+        :param percent: the percentile, within [0, 100].
+
+        :returns: the upper bound of the bucket of the percentile, or 0 if
+            no duration was counted.
+        """
+        rank = math.ceil(self.count * percent / 100)
+        for upper_bound, count in self.buckets():
+            rank -= count
+            if rank <= 0:
+                return upper_bound
+        return 0
+
+
+class StatsSnapshot:
+    """The statistics of one or several retried functions, at some point in
+    time."""
+
+    # pylint: disable=too-few-public-methods
+
+    __slots__ = (
+        "calls",
+        "attempts",
+        "in_flight",
+        "sleeping",
+        "sleep_time",
+        "latency",
+    )
+
+    def __init__(self) -> None:
+        self.calls = 0
+        """The number of calls."""
+        self.attempts = 0
+        """The number of attempts."""
+        self.in_flight = 0
+        """The number of calls in progress."""
+        self.sleeping = 0
+        """The number of calls in progress waiting for their next
+        attempt."""
+        self.sleep_time: float = 0
+        """The total number of seconds spent waiting between attempts."""
+        self.latency = AttemptHistogram()
+        """The durations of attempts."""
+
+    def merge(self, other: "StatsSnapshot") -> None:
+        """Add the statistics of another object."""
+        self.calls += other.calls
+        self.attempts += other.attempts
+        self.in_flight += other.in_flight
+        self.sleeping += other.sleeping
+        self.sleep_time += other.sleep_time
+        self.latency.merge(other.latency)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(calls={self.calls}, "
+            f"attempts={self.attempts}, in_flight={self.in_flight}, "
+            f"sleeping={self.sleeping}, sleep_time={self.sleep_time:g}, "
+            f"p50={self.latency.percentile(50):g}, "
+            f"p99={self.latency.percentile(99):g})"
+        )
+
+
+class FunctionStats:
+    """The live statistics of a retried function.
+
+    Each thread updates its own :py:class:`StatsSnapshot`, which are summed
+    up by :py:meth:`snapshot`.
+    """
+
+    def __init__(self) -> None:
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+        self.__shards: list[StatsSnapshot] = []
+
+    def shard(self) -> StatsSnapshot:
+        """Return the statistics of the current thread, to be updated."""
+        try:
+            shard: StatsSnapshot = self.__local.shard
+        except AttributeError:
+            shard = self.__local.shard = StatsSnapshot()
+            with self.__lock:
+                self.__shards.append(shard)
+        return shard
+
+    def snapshot(self) -> StatsSnapshot:
+        """Sum up the statistics of all threads."""
+        result = StatsSnapshot()
+        for shard in tuple(self.__shards):
+            result.merge(shard)
+        return result
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.snapshot()!r})"
+
+
+class StatsRecorder:
+    """Keep the :py:class:`FunctionStats` of the functions decorated by a
+    :py:class:`~kaioretry.Retry` object, through its hooks."""
+
+    def __init__(self) -> None:
+        self.__functions: dict[Function, FunctionStats] = {}
+        self.__lock = threading.Lock()
+
+    def function(self, func: Function) -> FunctionStats:
+        """Return the statistics of a function.
+
+        :param func: the decorated function.
+        """
+        try:
+            return self.__functions[func]
+        except KeyError:
+            with self.__lock:
+                return self.__functions.setdefault(func, FunctionStats())
+
+    def snapshot(self) -> StatsSnapshot:
+        """Sum up the statistics of all functions."""
+        result = StatsSnapshot()
+        for stats in tuple(self.__functions.values()):
+            result.merge(stats.snapshot())
+        return result
+
+    def before_attempt(self, state: RetryState) -> None:
+        """The :py:attr:`~kaioretry.Retry.before_attempt` hook."""
+        shard = self.function(state.func).shard()
+        shard.attempts += 1
+        if state.end is None:
+            shard.calls += 1
+            shard.in_flight += 1
+        else:
+            shard.sleeping -= 1
+            shard.sleep_time += state.start - state.end
+        # Whether the call is counted as sleeping, rather than attempting.
+        state.data[self] = False
+
+    def after_success(self, state: RetryState, _: Any) -> None:
+        """The :py:attr:`~kaioretry.Retry.after_success` hook."""
+        shard = self.function(state.func).shard()
+        shard.in_flight -= 1
+        shard.latency.observe(state.duration)
+
+    def on_caught_exception(self, state: RetryState, _: BaseException) -> None:
+        """The :py:attr:`~kaioretry.Retry.on_caught_exception` hook."""
+        shard = self.function(state.func).shard()
+        shard.sleeping += 1
+        shard.latency.observe(state.duration)
+        state.data[self] = True
+
+    def on_give_up(self, state: RetryState, _: BaseException) -> None:
+        """The :py:attr:`~kaioretry.Retry.on_give_up` hook."""
+        sleeping = state.data.pop(self, None)
+        if sleeping is None:
+            # Refused before the call was counted.
+            return
+        shard = self.function(state.func).shard()
+        shard.in_flight -= 1
+        if sleeping:
+            shard.sleeping -= 1
+        elif state.refused:
+            # The attempt was counted, but did not run.
+            shard.attempts -= 1
+        else:
+            shard.latency.observe(state.duration)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Statistics are per-process: do not carry them along.
+        return self.__class__, ()
+
+
+__all__ = [
+    "AttemptHistogram",
+    "StatsSnapshot",
+    "FunctionStats",
+    "StatsRecorder",
+]
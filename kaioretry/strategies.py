@@ -0,0 +1,310 @@
+"""Backoff strategies compute the whole sequence of delays of a loop, instead
+of deriving each delay from the previous one only. They implement the
+:py:class:`~kaioretry.types.DelayStrategy` protocol and can be given as
+``update_delay`` parameter to :py:class:`~kaioretry.Context`, or as
+``backoff`` parameter to :py:func:`~kaioretry.retry` and
+:py:func:`~kaioretry.aioretry`.
+
+.. code-block:: python
+   :caption: Exponential backoff with full jitter
+
+   from kaioretry import retry, FullJitter
+
+   @retry(tries=10, delay=1, backoff=FullJitter(cap=60))
+   def query_some_busy_server(url):
+       ...
+
+
+As with any ``update_delay`` function, the first delay of each loop is the
+:py:class:`~kaioretry.Context` delay: strategies compute the following
+ones. Unless told otherwise, strategies use that first delay as their base
+value. Computing a delay always has a constant cost, whatever the number of
+previous tries.
+
+.. code-block:: python
+   :caption: 3 immediate tries, then exponential backoff with equal jitter
+
+   from kaioretry import Context, Piecewise, EqualJitter
+
+   context = Context(
+       tries=10,
+       delay=0,
+       update_delay=Piecewise((3, 0), EqualJitter(base=1, cap=30))
+   )
+
+"""
+
+import sys
+import abc
+import functools
+
+from typing import Any
+from collections.abc import Generator
+
+from .types import Number, NonNegative, UpdateDelayFunc
+from .backoff import RandomSource, DEFAULT_RANDOM_SOURCE
+
+
+Delays = Generator[NonNegative, NonNegative, None]
+
+
+class Strategy(abc.ABC):
+    """Base class of backoff strategies.
+
+    :param base: the first delay computed by the strategy, which the
+        following ones derive from. If None (the default), the strategy
+        picks up where the first delay of the loop left off.
+
+    :param cap: the maximum value of the computed delays. If None (the
+        default), delays are virtually unlimited. Note that the
+        :py:class:`~kaioretry.Context` ``max_delay`` still applies.
+
+    :raises ValueError: if base or cap are negative.
+    """
+
+    def __init__(
+        self,
+        /,
+        base: NonNegative | None = None,
+        cap: NonNegative | None = None,
+    ) -> None:
+        if base is not None and base < 0:
+            raise ValueError(f"base cannot be less than 0. ({base} given)")
+        if cap is not None and cap < 0:
+            raise ValueError(f"cap cannot be less than 0. ({cap} given)")
+        self.__base = base
+        self.__cap = sys.float_info.max if cap is None else cap
+
+    @property
+    def base(self) -> NonNegative | None:
+        """The base value of delays, if any."""
+        return self.__base
+
+    @property
+    def cap(self) -> NonNegative:
+        """The maximum value of delays."""
+        return self.__cap
+
+    @abc.abstractmethod
+    def delays(self) -> Delays:
+        """Generate the delays of a loop. The generator must first be primed
+        with :py:func:`next`, then, each time, it is sent the current delay,
+        it must yield the next one.
+
+        :returns: a :py:class:`~collections.abc.Generator`.
+        """
+
+    def loop(
+        self, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> UpdateDelayFunc:
+        """Implement the :py:class:`~kaioretry.types.DelayStrategy`
+        protocol."""
+        # pylint: disable=unused-argument
+        delays = self.delays()
+        next(delays)
+        return delays.send
+
+
+class Exponential(Strategy):
+    """Multiply the delay by a constant factor after each try.
+
+    :param base: see :py:class:`Strategy`.
+
+    :param cap: see :py:class:`Strategy`.
+
+    :param factor: the multiplier. Default is 2.
+    """
+
+    def __init__(
+        self,
+        /,
+        base: NonNegative | None = None,
+        cap: NonNegative | None = None,
+        *,
+        factor: Number = 2,
+    ) -> None:
+        super().__init__(base, cap)
+        self.__factor = factor
+
+    @property
+    def factor(self) -> Number:
+        """The multiplier."""
+        return self.__factor
+
+    def _jitter(self, ceiling: NonNegative) -> NonNegative:
+        """Turn the exponential value into the actual delay."""
+        return ceiling
+
+    def delays(self) -> Delays:
+        delay = yield 0
+        ceiling = delay * self.__factor if self.base is None else self.base
+        ceiling = min(ceiling, self.cap)
+        while True:
+            yield self._jitter(ceiling)
+            # Clamped, the ceiling stops growing once the cap is reached.
+            ceiling = min(ceiling * self.__factor, self.cap)
+
+
+class FullJitter(Exponential):
+    """Exponential backoff, where the actual delay is picked at random
+    between 0 and the exponential value.
+
+    :param base: see :py:class:`Strategy`.
+
+    :param cap: see :py:class:`Strategy`.
+
+    :param factor: see :py:class:`Exponential`.
+
+    :param source: the :py:class:`~kaioretry.RandomSource` random values are
+        picked from.
+    """
+
+    def __init__(
+        self,
+        /,
+        base: NonNegative | None = None,
+        cap: NonNegative | None = None,
+        *,
+        factor: Number = 2,
+        source: RandomSource = DEFAULT_RANDOM_SOURCE,
+    ) -> None:
+        super().__init__(base, cap, factor=factor)
+        self.__source = source
+
+    def _jitter(self, ceiling: NonNegative) -> NonNegative:
+        return ceiling * self.__source.random()
+
+
+class EqualJitter(FullJitter):
+    """Exponential backoff, where the actual delay is always at least half
+    the exponential value, plus a random value picked between 0 and the
+    other half.
+
+    Parameters are the same as :py:class:`FullJitter`'s.
+    """
+
+    def _jitter(self, ceiling: NonNegative) -> NonNegative:
+        half = ceiling / 2
+        return half + super()._jitter(half)
+
+
+class DecorrelatedJitter(Strategy):
+    """Pick each delay at random between the base value and three times the
+    previous delay.
+
+    :param base: see :py:class:`Strategy`.
+
+    :param cap: see :py:class:`Strategy`.
+
+    :param source: the :py:class:`~kaioretry.RandomSource` random values are
+        picked from.
+    """
+
+    def __init__(
+        self,
+        /,
+        base: NonNegative | None = None,
+        cap: NonNegative | None = None,
+        *,
+        source: RandomSource = DEFAULT_RANDOM_SOURCE,
+    ) -> None:
+        super().__init__(base, cap)
+        self.__source = source
+
+    def delays(self) -> Delays:
+        delay = yield 0
+        base = delay if self.base is None else self.base
+        while True:
+            delay = max(delay, base)
+            delay = min(self.cap, self.__source.uniform(base, delay * 3))
+            delay = yield delay
+
+
+class Fibonacci(Strategy):
+    """Make the delays follow the Fibonacci sequence: each delay is the sum
+    of the two previous ones. The sequence starts with the base value, twice.
+
+    :param base: see :py:class:`Strategy`.
+
+    :param cap: see :py:class:`Strategy`.
+    """
+
+    def delays(self) -> Delays:
+        delay = yield 0
+        if self.base is None:
+            previous = current = delay
+        else:
+            previous, current = 0, self.base
+        current = min(current, self.cap)
+        while True:
+            yield current
+            previous, current = current, min(previous + current, self.cap)
+
+
+Phase = tuple[int, Strategy | NonNegative]
+
+
+def _constant(value: NonNegative, _: NonNegative) -> NonNegative:
+    return value
+
+
+class Piecewise(Strategy):
+    """Chain several strategies, each one for a given number of delays.
+
+    Each phase is a (count, step) :py:class:`tuple`, in which step is either
+    a :py:class:`Strategy`, or a number of seconds. The last phase may also be
+    a step alone, in which case it lasts forever. If all phases are exhausted,
+    the last delay is kept.
+
+    The first delay of a loop, which is the :py:class:`~kaioretry.Context`
+    delay, counts as part of the first phase.
+
+    :param phases: the phases, in order.
+
+    :raises ValueError: if no phases are given, if a count is not positive,
+        or if an unlimited phase is not the last one.
+    """
+
+    def __init__(self, /, *phases: Phase | Strategy | NonNegative) -> None:
+        super().__init__()
+        if not phases:
+            raise ValueError("at least a phase is required")
+        self.__phases: list[tuple[int | None, Strategy | NonNegative]] = []
+        for index, phase in enumerate(phases, 1):
+            if isinstance(phase, tuple):
+                count, step = phase
+                if count < 1:
+                    raise ValueError(f"phase count must be positive: {count}")
+                self.__phases.append((count, step))
+            elif index == len(phases):
+                self.__phases.append((None, phase))
+            else:
+                raise ValueError("only the last phase may be unlimited")
+
+    def delays(self) -> Delays:
+        delay = yield 0
+        # The first delay has already been consumed.
+        consumed = 1
+        for count, step in self.__phases:
+            if isinstance(step, Strategy):
+                update = step.loop((), {})
+            else:
+                update = functools.partial(_constant, step)
+            remaining = -1 if count is None else count - consumed
+            consumed = 0
+            while remaining:
+                delay = yield update(delay)
+                remaining -= 1
+        while True:
+            delay = yield delay
+
+
+__all__ = [
+    "Strategy",
+    "Exponential",
+    "FullJitter",
+    "EqualJitter",
+    "DecorrelatedJitter",
+    "Fibonacci",
+    "Piecewise",
+]
@@ -0,0 +1,112 @@
+"""A :py:mod:`pytest` plugin, that fast-forwards the delays of
+:py:class:`~kaioretry.Context` loops, so that tests exercising retries do not
+actually wait. It is automatically registered when kaioretry is installed.
+
+The ``kaioretry_clock`` fixture makes every loop use a
+:py:class:`RecordingClock`, which records the delays instead of waiting, both
+for regular and :py:mod:`asyncio` code.
+
+.. code-block:: python
+   :caption: Checking the delays
+
+   from kaioretry import retry
+
+   @retry(ValueError, tries=3, delay=10, backoff=2)
+   def flaky():
+       raise ValueError("not today")
+
+   def test_flaky(kaioretry_clock):
+       with pytest.raises(ValueError):
+           flaky()
+       assert kaioretry_clock.delays == [10, 20]
+
+
+To fast-forward the delays of a whole test suite, use the
+``--kaioretry-fast-forward`` command line option.
+
+In both cases, the wall time saved is reported at the end of the session.
+
+"""
+
+from collections.abc import Iterator
+
+import pytest
+
+from .types import NonNegative
+from .clock import VirtualClock, override
+
+
+class RecordingClock(VirtualClock):
+    """A :py:class:`~kaioretry.clock.VirtualClock` that also records the
+    delays of the sleeps it was asked to perform."""
+
+    def __init__(self, /, start: float = 0) -> None:
+        super().__init__(start)
+        self.__delays: list[NonNegative] = []
+
+    @property
+    def delays(self) -> list[NonNegative]:
+        """The delays of the sleeps, in order."""
+        return self.__delays
+
+    def sleep(self, delay: NonNegative) -> None:
+        self.__delays.append(delay)
+        super().sleep(delay)
+
+
+_saved_key = pytest.StashKey[list[NonNegative]]()
+
+
+def _fast_forward(config: pytest.Config) -> Iterator[RecordingClock]:
+    clock = RecordingClock()
+    with override(clock):
+        yield clock
+    config.stash.setdefault(_saved_key, []).extend(clock.delays)
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """Add the --kaioretry-fast-forward option."""
+    parser.getgroup("kaioretry").addoption(
+        "--kaioretry-fast-forward",
+        action="store_true",
+        help="do not wait between kaioretry tries, in any test.",
+    )
+
+
+@pytest.fixture
+def kaioretry_clock(
+    pytestconfig: pytest.Config,
+) -> Iterator[RecordingClock]:
+    """Make all kaioretry loops use a :py:class:`RecordingClock` during the
+    test, and provide said clock."""
+    yield from _fast_forward(pytestconfig)
+
+
+@pytest.fixture(autouse=True)
+def _kaioretry_fast_forward(
+    request: pytest.FixtureRequest,
+) -> Iterator[None]:
+    if request.config.getoption("kaioretry_fast_forward") and (
+        "kaioretry_clock" not in request.fixturenames
+    ):
+        for _ in _fast_forward(request.config):
+            yield
+    else:
+        yield
+
+
+def pytest_terminal_summary(
+    # Quoted: pytest only exports TerminalReporter since pytest 8.4.
+    terminalreporter: "pytest.TerminalReporter",
+    config: pytest.Config,
+) -> None:
+    """Report the wall time saved by fast-forwarding."""
+    delays = config.stash.get(_saved_key, [])
+    if delays:
+        terminalreporter.write_line(
+            f"kaioretry: {len(delays)} sleeps fast-forwarded, "
+            f"{sum(delays):.2f} seconds of wall time saved"
+        )
+
+
+__all__ = ["RecordingClock", "kaioretry_clock"]
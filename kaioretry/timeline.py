@@ -0,0 +1,197 @@
+"""Export the attempts and sleeps of retried calls as a timeline, in the
+Chrome Trace Event format, to be opened in ``chrome://tracing`` or
+`Perfetto <https://ui.perfetto.dev>`_.
+
+A :py:class:`TimelineRecorder` turns each call of a function decorated by an
+instrumented :py:class:`~kaioretry.Retry` object into a track, named after
+the function, the thread and the :py:mod:`asyncio` task performing the call.
+Attempts and sleeps are slices of that track.
+
+.. code-block:: python
+   :caption: Exporting a load test timeline
+
+   from kaioretry import Retry, Context
+   from kaioretry.timeline import TimelineRecorder
+
+   timeline = TimelineRecorder()
+   retry = timeline.instrument(Retry(ConnectionError, Context(5, 0.1)))
+
+   ... # run the load test
+
+   with open("retries.json", "w", encoding="utf-8") as output:
+       timeline.dump(output)
+
+
+Times are measured by the :py:class:`~kaioretry.Context` clocks, in
+microseconds. Once ``max_events`` events are recorded, new ones are dropped
+and counted.
+"""
+
+import os
+import json
+import asyncio
+import itertools
+import threading
+
+from typing import Any, IO
+
+from .hooks import RetryState
+from .decorator import Retry
+
+
+def _task_name() -> str | None:
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        return None
+    return None if task is None else task.get_name()
+
+
+class TimelineRecorder:
+    """Record the attempts and sleeps of retried calls as Chrome trace
+    events.
+
+    :param max_events: the maximum number of events to keep.
+
+    :raises ValueError: if max_events is not positive.
+    """
+
+    def __init__(self, /, max_events: int = 1000000) -> None:
+        if max_events < 1:
+            raise ValueError(
+                f"max_events must be positive ({max_events} given)"
+            )
+        self.__max_events = max_events
+        self.__events: list[dict[str, Any]] = []
+        self.__dropped = 0
+        self.__lock = threading.Lock()
+        self.__tracks = itertools.count(1)
+        self.__pid = os.getpid()
+
+    @property
+    def dropped(self) -> int:
+        """The number of events that were dropped, because ``max_events``
+        was reached."""
+        return self.__dropped
+
+    def __add(self, event: dict[str, Any]) -> None:
+        with self.__lock:
+            if len(self.__events) < self.__max_events:
+                self.__events.append(event)
+            else:
+                self.__dropped += 1
+
+    def __slice(
+        self,
+        track: int,
+        name: str,
+        start: float,
+        end: float,
+        args: dict[str, Any],
+    ) -> None:
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
+        self.__add(
+            {
+                "name": name,
+                "cat": "kaioretry",
+                "ph": "X",
+                "pid": self.__pid,
+                "tid": track,
+                "ts": start * 1e6,
+                "dur": (end - start) * 1e6,
+                "args": args,
+            }
+        )
+
+    def before_attempt(self, state: RetryState) -> None:
+        """The :py:attr:`~kaioretry.Retry.before_attempt` hook."""
+        if state.end is not None:
+            track = state.data[self]
+            self.__slice(track, "sleep", state.end, state.start, {})
+            return
+        track = state.data[self] = next(self.__tracks)
+        thread = threading.current_thread().name
+        task = _task_name()
+        name = f"{state.func.__qualname__} #{track} ({thread}"
+        name += ")" if task is None else f", {task})"
+        self.__add(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": self.__pid,
+                "tid": track,
+                "args": {"name": name},
+            }
+        )
+
+    def __attempt(
+        self, state: RetryState, outcome: str, error: BaseException | None
+    ) -> None:
+        args: dict[str, Any] = {"attempt": state.attempt, "outcome": outcome}
+        if error is not None:
+            args["exception"] = error.__class__.__qualname__
+        self.__slice(
+            state.data[self],
+            f"attempt {state.attempt}",
+            state.start,
+            state.start + state.duration,
+            args,
+        )
+
+    def after_success(self, state: RetryState, _: Any) -> None:
+        """The :py:attr:`~kaioretry.Retry.after_success` hook."""
+        self.__attempt(state, "success", None)
+
+    def on_caught_exception(
+        self, state: RetryState, error: BaseException
+    ) -> None:
+        """The :py:attr:`~kaioretry.Retry.on_caught_exception` hook."""
+        self.__attempt(state, "retry", error)
+
+    def on_give_up(self, state: RetryState, error: BaseException) -> None:
+        """The :py:attr:`~kaioretry.Retry.on_give_up` hook."""
+        if not (state.exhausted or state.refused or state.sleeping):
+            self.__attempt(state, "error", error)
+
+    def instrument(self, retry: Retry) -> Retry:
+        """Register the recording hooks of a :py:class:`~kaioretry.Retry`
+        object.
+
+        :param retry: the object to instrument.
+
+        :returns: the same object.
+        """
+        return retry.add_hooks(self)
+
+    def events(self) -> list[dict[str, Any]]:
+        """Return a copy of the recorded Chrome trace events."""
+        with self.__lock:
+            return list(self.__events)
+
+    def clear(self) -> None:
+        """Forget all events."""
+        with self.__lock:
+            self.__events.clear()
+            self.__dropped = 0
+
+    def dump(self, output: IO[str]) -> None:
+        """Write the recorded events in the Chrome Trace Event JSON object
+        format.
+
+        :param output: a text file object.
+        """
+        json.dump(
+            {"traceEvents": self.events(), "displayTimeUnit": "ms"},
+            output,
+            separators=(",", ":"),
+        )
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Events are per-process: do not carry them along.
+        return self.__class__, (self.__max_events,)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(max_events={self.__max_events})"
+
+
+__all__ = ["TimelineRecorder"]
@@ -0,0 +1,386 @@
+"""Record the failures encountered by retried functions in production, then
+replay them offline against other retry policies, to pick the one that
+would have handled your actual incidents best.
+
+A :py:class:`TraceRecorder` wraps a retry decorator, and writes down, for
+each call, the start time, duration and outcome of every attempt. Traces are
+written to a file, one call per line.
+
+.. code-block:: python
+   :caption: Recording
+
+   from kaioretry import retry
+   from kaioretry.trace import TraceRecorder
+
+   recorder = TraceRecorder("fetch.trace")
+
+   @recorder.record(retry(ConnectionError, tries=3, delay=1))
+   def fetch(url):
+       ...
+
+
+The :py:func:`replay` function then runs the recorded calls through
+candidate :py:class:`~kaioretry.Retry` objects, in virtual time: an attempt
+made at a given time behaves like the recorded attempt that was the last to
+start before it. Each candidate gets a :py:class:`~kaioretry.simulate.Report`.
+Recorded exceptions that are not :py:class:`Exception` subclasses, such as
+:py:class:`asyncio.CancelledError`, are replayed as :py:class:`Exception`
+subclasses of the same name.
+
+.. code-block:: python
+   :caption: Replaying
+
+   from kaioretry import Context, Retry, FullJitter
+   from kaioretry.trace import load, replay
+
+   reports = replay(
+       load("fetch.trace"),
+       {
+           "current": Retry(ConnectionError, Context(3, 1)),
+           "patient": Retry(
+               ConnectionError,
+               Context(10, 1, update_delay=FullJitter(cap=30)),
+           ),
+       },
+   )
+   for name, report in reports.items():
+       print(name, report, sep="\\n")
+
+"""
+
+import json
+import time
+import bisect
+import logging
+import inspect
+import functools
+import importlib
+import threading
+import contextvars
+
+from typing import Any, IO
+from collections.abc import Callable, Awaitable, Iterable, Mapping, Sequence
+
+from .types import Function
+from .clock import VirtualClock
+from .context import Context
+from .decorator import Retry
+from .simulate import Report
+
+Attempt = tuple[float, float, str | None]
+"""An attempt, as a (start time, duration, error) :py:class:`tuple`, in which
+error is the fully qualified name of the exception class, or None if the
+attempt succeeded."""
+
+
+CallTrace = Sequence[Attempt]
+"""The attempts of a call, in order."""
+
+
+_current: contextvars.ContextVar[list[Attempt] | None] = (
+    contextvars.ContextVar("kaioretry_trace", default=None)
+)
+
+
+def _qualname(error: BaseException) -> str:
+    cls = error.__class__
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+class TraceRecorder:
+    """Record the attempts of retried functions to a file.
+
+    :param path: the path of the file, to which traces are appended.
+
+    :param clock: the function providing the attempt start times. Default:
+        :py:func:`time.time`, so that traces of several processes or hosts
+        can be merged.
+    """
+
+    def __init__(
+        self, path: str, /, clock: Callable[[], float] = time.time
+    ) -> None:
+        self.__path = path
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__file: IO[str] | None = None
+
+    def __write(self, attempts: list[Attempt]) -> None:
+        line = json.dumps(attempts, separators=(",", ":"))
+        with self.__lock:
+            if self.__file is None:
+                # pylint: disable=consider-using-with
+                self.__file = open(self.__path, "a", encoding="utf-8")
+            self.__file.write(line + "\n")
+            self.__file.flush()
+
+    def close(self) -> None:
+        """Close the trace file."""
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+    def __enter__(self) -> "TraceRecorder":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    def __attempt(
+        self, attempts: list[Attempt], start: float, error: str | None
+    ) -> None:
+        attempts.append((start, self.__clock() - start, error))
+
+    async def __await_attempt(
+        self, attempts: list[Attempt], start: float, result: Awaitable[Any]
+    ) -> Any:
+        try:
+            result = await result
+        except BaseException as error:
+            self.__attempt(attempts, start, _qualname(error))
+            raise
+        self.__attempt(attempts, start, None)
+        return result
+
+    def __attempts(self, func: Function) -> Function:
+        """Wrap the function retried by the decorator: record attempts."""
+
+        @functools.wraps(func)
+        def attempt(*args: Any, **kwargs: Any) -> Any:
+            attempts = _current.get()
+            if attempts is None:
+                return func(*args, **kwargs)
+            start = self.__clock()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as error:
+                self.__attempt(attempts, start, _qualname(error))
+                raise
+            if inspect.isawaitable(result):
+                return self.__await_attempt(attempts, start, result)
+            self.__attempt(attempts, start, None)
+            return result
+
+        if not Retry.is_func_async(func):
+            return attempt
+
+        # Keep coroutine functions recognisable as such by decorators.
+        @functools.wraps(func)
+        async def aattempt(*args: Any, **kwargs: Any) -> Any:
+            return await attempt(*args, **kwargs)
+
+        return aattempt
+
+    async def __await_call(
+        self, attempts: list[Attempt], result: Awaitable[Any]
+    ) -> Any:
+        token = _current.set(attempts)
+        try:
+            return await result
+        finally:
+            _current.reset(token)
+            self.__write(attempts)
+
+    def record(
+        self, decorator: Callable[[Function], Function]
+    ) -> Callable[[Function], Function]:
+        """Wrap a retry decorator, so that the calls of the functions it
+        decorates are recorded.
+
+        :param decorator: a retry decorator, such as a
+            :py:class:`~kaioretry.Retry` object, or the result of
+            :py:func:`~kaioretry.retry` or :py:func:`~kaioretry.aioretry`.
+
+        :returns: a decorator.
+        """
+
+        def decorate(func: Function) -> Function:
+            decorated = decorator(self.__attempts(func))
+
+            @functools.wraps(func)
+            def call(*args: Any, **kwargs: Any) -> Any:
+                attempts: list[Attempt] = []
+                token = _current.set(attempts)
+                try:
+                    result = decorated(*args, **kwargs)
+                except BaseException:
+                    self.__write(attempts)
+                    raise
+                finally:
+                    _current.reset(token)
+                if inspect.isawaitable(result):
+                    return self.__await_call(attempts, result)
+                self.__write(attempts)
+                return result
+
+            return call
+
+        return decorate
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.__path!r})"
+
+
+def load(path: str) -> list[CallTrace]:
+    """Load the calls recorded by a :py:class:`TraceRecorder`.
+
+    :param path: the path of the trace file.
+
+    :returns: the calls, in the order they completed.
+    """
+    with open(path, encoding="utf-8") as trace:
+        return [
+            [
+                (float(start), float(duration), error)
+                for start, duration, error in call
+            ]
+            for call in map(json.loads, trace)
+            if call
+        ]
+
+
+@functools.cache
+def _exception_class(qualname: str) -> type[Exception]:
+    """Find back an exception class by its fully qualified name, or make up
+    a new one of the same name if it cannot be imported, or if it is not an
+    :py:class:`Exception` subclass."""
+    module, _, name = qualname.rpartition(".")
+    while module:
+        try:
+            obj: Any = importlib.import_module(module)
+            for attr in name.split("."):
+                obj = getattr(obj, attr)
+        except (ImportError, AttributeError):
+            module, _, prefix = module.rpartition(".")
+            name = f"{prefix}.{name}"
+            continue
+        if isinstance(obj, type) and issubclass(obj, Exception):
+            return obj
+        break
+    # Replaying other exceptions, e.g. asyncio.CancelledError, would
+    # interrupt the replay.
+    return type(qualname.rpartition(".")[2], (Exception,), {})
+
+
+def _make_error(qualname: str) -> Exception:
+    cls = _exception_class(qualname)
+    try:
+        return cls(f"replayed {qualname}")
+    except TypeError:
+        # Some exceptions require specific arguments.
+        return cls.__new__(cls)
+
+
+class _Service:
+    """A service behaving as recorded."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, calls: Iterable[CallTrace]) -> None:
+        attempts = sorted(attempt for call in calls for attempt in call)
+        self.__starts = [start for start, _, _ in attempts]
+        self.__attempts = attempts
+
+    @property
+    def fails_forever(self) -> bool:
+        """Whether all the attempts made after the last recorded one fail."""
+        return self.__attempts[-1][2] is not None
+
+    def __call__(self, clock: VirtualClock) -> None:
+        index = bisect.bisect_right(self.__starts, clock.time()) - 1
+        _, duration, error = self.__attempts[max(index, 0)]
+        clock.sleep(duration)
+        if error is not None:
+            raise _make_error(error)
+
+
+# Out of the logging hierarchy: replays are silent.
+_quiet_logger = logging.Logger(__name__, logging.CRITICAL + 1)
+
+
+def _policy_copy(candidate: Retry, clock: VirtualClock) -> Retry:
+    """Return a copy of the retry policy of a candidate, without its hooks,
+    metrics or loggers, sleeping on a given clock."""
+    policy = candidate.context.policy
+    context = Context(
+        policy.tries,
+        policy.delay,
+        update_delay=policy.update_delay,
+        max_delay=policy.max_delay,
+        min_delay=policy.min_delay,
+        logger=_quiet_logger,
+        clock=clock,
+    )
+    return Retry(candidate.exceptions, context, logger=_quiet_logger)
+
+
+def _replay(
+    service: _Service, calls: Sequence[CallTrace], candidate: Retry
+) -> Report:
+    attempts = 0
+    successes = 0
+    latencies = []
+
+    def attempt(clock: VirtualClock) -> None:
+        nonlocal attempts
+        attempts += 1
+        service(clock)
+
+    for call in calls:
+        clock = VirtualClock(call[0][0])
+        try:
+            _policy_copy(candidate, clock).retry(attempt)(clock)
+        except Exception:  # pylint: disable=broad-except
+            pass
+        else:
+            successes += 1
+        latencies.append(clock.time() - call[0][0])
+    latencies.sort()
+    return Report(latencies, attempts, successes)
+
+
+def replay(
+    calls: Sequence[CallTrace], candidates: Mapping[str, Retry]
+) -> dict[str, Report]:
+    """Replay recorded calls against candidate retry policies, in virtual
+    time.
+
+    Candidates are replayed through copies of their policies, which
+    neither log nor call their hooks: their metrics, statistics and circuit
+    breakers are left untouched.
+
+    :param calls: the recorded calls, e.g. as returned by :py:func:`load`.
+
+    :param candidates: the :py:class:`~kaioretry.Retry` objects to evaluate,
+        by name.
+
+    :returns: a :py:class:`~kaioretry.simulate.Report` per candidate name.
+
+    :raises ValueError: if there are no calls to replay, or if calls would
+        never end, because a candidate has unlimited tries and the last
+        recorded attempt failed.
+    """
+    calls = [call for call in calls if call]
+    if not calls:
+        raise ValueError("no calls to replay")
+    service = _Service(calls)
+    if service.fails_forever:
+        for name, candidate in candidates.items():
+            if candidate.context.tries < 0:
+                raise ValueError(
+                    f"unlimited tries of {name} after the last attempt failed"
+                )
+    return {
+        name: _replay(service, calls, candidate)
+        for name, candidate in candidates.items()
+    }
+
+
+__all__ = [
+    "Attempt",
+    "CallTrace",
+    "TraceRecorder",
+    "load",
+    "replay",
+]
@@ -0,0 +1,383 @@
+"""Report retried calls as tracing spans: one span per call, with an event
+per attempt.
+
+Spans are created through a :py:class:`Tracer`, a subset of the
+OpenTelemetry tracer interface: an ``opentelemetry.trace.Tracer`` object can
+be used as is, but kaioretry does not depend on OpenTelemetry. The
+:py:class:`InMemoryTracer` keeps spans in memory, for tests.
+
+.. code-block:: python
+   :caption: Tracing with OpenTelemetry
+
+   from opentelemetry import trace
+   from kaioretry import Retry, Context
+   from kaioretry.tracing import RetryTracing
+
+   retry = Retry(ConnectionError, Context(tries=3, delay=1))
+   RetryTracing(trace.get_tracer("kaioretry"), sample_rate=0.1).instrument(
+       retry
+   )
+
+   @retry
+   def fetch(url):
+       ...
+
+
+Each call span is named after the decorated function, and carries the
+following attributes:
+
+* ``kaioretry.function``: the qualified name of the function;
+* ``kaioretry.attempts``: the number of attempts;
+* ``kaioretry.outcome``: ``success``, ``exhausted`` if the call ran out of
+  tries, or ``error`` if it raised an exception that is not retried;
+* ``kaioretry.exception.type``: the class of the exception the call raised,
+  if any.
+
+Calls that fail, including the ones interrupted between two attempts, end
+their span with an error status.
+
+Each attempt adds a ``kaioretry.attempt`` event to the span, with the
+``kaioretry.attempt`` number, the ``kaioretry.duration`` of the attempt,
+the ``kaioretry.delay`` slept before it, and the
+``kaioretry.exception.type`` of the exception it raised, if any.
+
+The span of a call is the current span during each of its attempts, so
+that the spans started by the decorated function are its children. Tracers
+may make spans current through ``attach`` and ``detach`` methods, as
+:py:class:`InMemoryTracer` does. Otherwise, spans are made current in the
+OpenTelemetry context, when OpenTelemetry is installed.
+
+Only a ``sample_rate`` proportion of calls is traced. Calls that are not
+sampled only cost a random draw.
+"""
+
+import importlib
+import contextvars
+
+from typing import Any, Protocol
+from collections.abc import Callable, Mapping, Sequence
+
+from .hooks import RetryState
+from .backoff import RandomSource, DEFAULT_RANDOM_SOURCE
+from .decorator import Retry
+
+AttributeValue = str | bool | int | float
+"""The type of span and event attribute values."""
+
+Attributes = Mapping[str, AttributeValue]
+"""Span and event attributes."""
+
+
+class Span(Protocol):
+    """The span interface used by :py:class:`RetryTracing`."""
+
+    def set_attribute(self, key: str, value: AttributeValue) -> Any:
+        """Set an attribute of the span."""
+
+    def add_event(self, name: str, attributes: Attributes) -> Any:
+        """Add an event to the span."""
+
+    def set_status(self, status: Any, description: str | None = None) -> Any:
+        """Set the status of the span."""
+
+    def end(self) -> Any:
+        """End the span."""
+
+
+class Tracer(Protocol):
+    """The tracer interface used by :py:class:`RetryTracing`."""
+
+    # pylint: disable=too-few-public-methods
+
+    def start_span(self, name: str, *, attributes: Attributes) -> Span:
+        """Start a span."""
+
+
+class RecordedSpan:
+    """A span kept in memory by an :py:class:`InMemoryTracer`.
+
+    :param name: the name of the span.
+
+    :param attributes: the initial attributes of the span.
+
+    :param parent: the span that was current when this one started.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        attributes: Attributes,
+        parent: "RecordedSpan | None" = None,
+    ) -> None:
+        self.__name = name
+        self.__attributes = dict(attributes)
+        self.__parent = parent
+        self.__events: list[tuple[str, dict[str, AttributeValue]]] = []
+        self.__status: tuple[str, str | None] | None = None
+        self.__ended = False
+
+    @property
+    def name(self) -> str:
+        """The name of the span."""
+        return self.__name
+
+    @property
+    def attributes(self) -> dict[str, AttributeValue]:
+        """The attributes of the span."""
+        return self.__attributes
+
+    @property
+    def parent(self) -> "RecordedSpan | None":
+        """The span that was current when this one started."""
+        return self.__parent
+
+    @property
+    def events(self) -> list[tuple[str, dict[str, AttributeValue]]]:
+        """The events of the span, as (name, attributes)
+        :py:class:`tuple` objects."""
+        return self.__events
+
+    @property
+    def status(self) -> tuple[str, str | None] | None:
+        """The status of the span, as a (status name, description)
+        :py:class:`tuple`, or None if not set."""
+        return self.__status
+
+    @property
+    def ended(self) -> bool:
+        """Whether the span ended."""
+        return self.__ended
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        """Set an attribute of the span."""
+        self.__attributes[key] = value
+
+    def add_event(self, name: str, attributes: Attributes) -> None:
+        """Add an event to the span."""
+        self.__events.append((name, dict(attributes)))
+
+    def set_status(self, status: Any, description: str | None = None) -> None:
+        """Set the status of the span."""
+        self.__status = str(getattr(status, "name", status)), description
+
+    def end(self) -> None:
+        """End the span."""
+        self.__ended = True
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.__name!r})"
+
+
+class InMemoryTracer:
+    """A :py:class:`Tracer` keeping spans in memory."""
+
+    def __init__(self) -> None:
+        self.__spans: list[RecordedSpan] = []
+        self.__current: contextvars.ContextVar[RecordedSpan | None] = (
+            contextvars.ContextVar("current_span", default=None)
+        )
+
+    def start_span(self, name: str, *, attributes: Attributes) -> RecordedSpan:
+        """Start a span, child of the current one."""
+        span = RecordedSpan(name, attributes, self.__current.get())
+        self.__spans.append(span)
+        return span
+
+    @property
+    def current_span(self) -> RecordedSpan | None:
+        """The current span, if any."""
+        return self.__current.get()
+
+    def attach(
+        self, span: RecordedSpan
+    ) -> contextvars.Token[RecordedSpan | None]:
+        """Make a span current.
+
+        :returns: the token to give to :py:meth:`detach`.
+        """
+        return self.__current.set(span)
+
+    def detach(self, token: contextvars.Token[RecordedSpan | None]) -> None:
+        """Restore the span that was current before :py:meth:`attach`."""
+        self.__current.reset(token)
+
+    @property
+    def spans(self) -> Sequence[RecordedSpan]:
+        """The started spans, in order."""
+        return self.__spans
+
+    def clear(self) -> None:
+        """Forget all spans."""
+        self.__spans.clear()
+
+
+def _exception_type(error: BaseException) -> str:
+    cls = error.__class__
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def _opentelemetry() -> tuple[Any, Any] | None:
+    """Return the OpenTelemetry trace and context modules, if installed."""
+    try:
+        return (
+            importlib.import_module("opentelemetry.trace"),
+            importlib.import_module("opentelemetry.context"),
+        )
+    except ImportError:
+        return None
+
+
+class RetryTracing:
+    """Trace the calls of the functions decorated by
+    :py:class:`~kaioretry.Retry` objects, through their
+    :py:mod:`~kaioretry.hooks`.
+
+    :param tracer: the tracer starting the spans.
+
+    :param sample_rate: the proportion of calls to trace, within [0, 1].
+
+    :param source: the source of random values used to sample calls.
+
+    :raises ValueError: if the sample rate is not within [0, 1].
+    """
+
+    def __init__(
+        self,
+        tracer: Tracer,
+        /,
+        sample_rate: float = 1,
+        source: RandomSource = DEFAULT_RANDOM_SOURCE,
+    ) -> None:
+        if not 0 <= sample_rate <= 1:
+            raise ValueError(
+                f"sample_rate must be within [0, 1]: {sample_rate}"
+            )
+        self.__tracer = tracer
+        self.__sample_rate = sample_rate
+        self.__source = source
+        self.__attach: Callable[[Any], Any] | None = None
+        self.__detach: Callable[[Any], Any] | None = None
+        self.__error_status: Any = "ERROR"
+        opentelemetry = _opentelemetry()
+        if opentelemetry is not None:
+            trace, context = opentelemetry
+            self.__error_status = trace.StatusCode.ERROR
+            self.__attach = lambda span: context.attach(
+                trace.set_span_in_context(span)
+            )
+            self.__detach = context.detach
+        if hasattr(tracer, "attach"):
+            self.__attach = getattr(tracer, "attach")
+            self.__detach = getattr(tracer, "detach")
+
+    @property
+    def tracer(self) -> Tracer:
+        """The tracer starting the spans."""
+        return self.__tracer
+
+    @property
+    def sample_rate(self) -> float:
+        """The proportion of calls to trace."""
+        return self.__sample_rate
+
+    def instrument(self, retry: Retry) -> Retry:
+        """Register the tracing hooks of a :py:class:`~kaioretry.Retry`
+        object.
+
+        :param retry: the object to instrument.
+
+        :returns: the same object.
+        """
+        return retry.add_hooks(self)
+
+    def before_attempt(self, state: RetryState) -> None:
+        """The :py:attr:`~kaioretry.Retry.before_attempt` hook."""
+        if state.end is not None:
+            # The previous attempt ended: slept since then.
+            if self not in state.data:
+                return
+            state.data[self, "delay"] = state.start - state.end
+        elif self.__sample_rate < 1 and (
+            self.__source.random() >= self.__sample_rate
+        ):
+            return
+        else:
+            name = state.func.__qualname__
+            state.data[self] = self.__tracer.start_span(
+                name, attributes={"kaioretry.function": name}
+            )
+        if self.__attach is not None:
+            state.data[self, "token"] = self.__attach(state.data[self])
+
+    def __deactivate(self, state: RetryState) -> None:
+        token = state.data.pop((self, "token"), None)
+        if self.__detach is not None and token is not None:
+            self.__detach(token)
+
+    def __attempt(
+        self, state: RetryState, error: BaseException | None
+    ) -> None:
+        self.__deactivate(state)
+        span: Span = state.data[self]
+        attributes: dict[str, AttributeValue] = {
+            "kaioretry.attempt": state.attempt,
+            "kaioretry.duration": state.duration,
+            "kaioretry.delay": state.data.get((self, "delay"), 0),
+        }
+        if error is not None:
+            attributes["kaioretry.exception.type"] = _exception_type(error)
+        span.add_event("kaioretry.attempt", attributes)
+
+    def __end(
+        self, state: RetryState, outcome: str, error: BaseException | None
+    ) -> None:
+        self.__deactivate(state)
+        span: Span = state.data.pop(self)
+        state.data.pop((self, "delay"), None)
+        span.set_attribute("kaioretry.attempts", state.attempt)
+        span.set_attribute("kaioretry.outcome", outcome)
+        if error is not None:
+            exception_type = _exception_type(error)
+            span.set_attribute("kaioretry.exception.type", exception_type)
+            span.set_status(self.__error_status, f"{exception_type}: {error}")
+        span.end()
+
+    def after_success(self, state: RetryState, _: Any) -> None:
+        """The :py:attr:`~kaioretry.Retry.after_success` hook."""
+        if self in state.data:
+            self.__attempt(state, None)
+            self.__end(state, "success", None)
+
+    def on_caught_exception(
+        self, state: RetryState, error: BaseException
+    ) -> None:
+        """The :py:attr:`~kaioretry.Retry.on_caught_exception` hook."""
+        if self in state.data:
+            self.__attempt(state, error)
+
+    def on_give_up(self, state: RetryState, error: BaseException) -> None:
+        """The :py:attr:`~kaioretry.Retry.on_give_up` hook."""
+        if self in state.data:
+            if state.exhausted:
+                self.__end(state, "exhausted", error)
+            else:
+                if not state.refused and not state.sleeping:
+                    self.__attempt(state, error)
+                self.__end(state, "error", error)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self.__tracer!r}, "
+            f"sample_rate={self.__sample_rate})"
+        )
+
+
+__all__ = [
+    "AttributeValue",
+    "Attributes",
+    "Span",
+    "Tracer",
+    "RecordedSpan",
+    "InMemoryTracer",
+    "RetryTracing",
+]
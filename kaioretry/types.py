@@ -1,9 +1,9 @@
 """Kaioretry helper types"""
 
-from typing import TypeAlias, TypeVar, ParamSpec, Any, overload
+from typing import TypeAlias, TypeVar, ParamSpec, Any, Literal, overload
 from collections.abc import Callable, Coroutine, Awaitable
 
-from typing_extensions import Protocol
+from typing_extensions import Protocol, runtime_checkable
 
 # Protocols do not have public methods. This module will not define any
 # otherwise valid class.
@@ -28,6 +28,11 @@ JitterTuple: TypeAlias = tuple[Number, Number]
 Jitter: TypeAlias = Number | JitterTuple
 
 
+# "text" log messages are meant for humans, "compact" ones are constant event
+# names, the details being left to the record attributes.
+LogFormat: TypeAlias = Literal["text", "compact"]
+
+
 FuncParam = ParamSpec("FuncParam")
 
 FuncRetVal = TypeVar("FuncRetVal")
@@ -37,6 +42,30 @@ Function: TypeAlias = Callable[..., Any]
 UpdateDelayFunc: TypeAlias = Callable[[NonNegative], NonNegative]
 
 
+@runtime_checkable
+class DelayStrategy(Protocol):
+    """The :py:class:`typing.Protocol` of the delay computations that need
+    to keep a state, or to know about the decorated function call, during a
+    whole :py:class:`~kaioretry.Context` loop.
+
+    .. automethod:: loop
+    """
+
+    def loop(
+        self, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> UpdateDelayFunc:
+        """Called at the beginning of each loop, ...
+
+        :param args: ... with the positional arguments ...
+
+        :param kwargs: ... and the keyword arguments of the decorated
+            function call, if any...
+
+        :returns: ... to obtain the function that will compute the delays of
+            this loop only.
+        """
+
+
 AioretryCoro: TypeAlias = Callable[
     FuncParam, Coroutine[None, None, FuncRetVal]
 ]
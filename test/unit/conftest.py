@@ -11,7 +11,8 @@ import collections.abc
 import pytest
 import pytest_cases
 
-from kaioretry import Retry
+from kaioretry import Retry, Context
+from kaioretry.breaker import CircuitBreaker, CircuitOpenError
 
 # This is a copy of Lib/unit/mock.py from github, since my local
 # python 3.11.1 does not have iso-functionning MagicMock and
@@ -61,6 +62,62 @@ def auto_spec(func):
     return mock
 
 
+def flaky(*errors, clock=None, duration=1):
+    """Return a function raising given exceptions in order, then returning
+    its argument, or True if called without any. None stands for a
+    successful call.
+
+    :param clock: if given, each call first sleeps on it for duration.
+    """
+    remaining = list(errors)
+
+    def flaky(*args):
+        # pylint: disable=redefined-outer-name
+        if clock is not None:
+            clock.sleep(duration)
+        if remaining and (error := remaining.pop(0)) is not None:
+            raise error
+        return args[0] if args else True
+
+    return flaky
+
+
+def instrumented(instrumentation, clock, tries=3, delay=2, retried=ValueError):
+    """Return a new Retry object, sleeping on given clock, instrumented by
+    given object"""
+    retry = Retry(retried, Context(tries, delay, clock=clock))
+    assert instrumentation.instrument(retry) is retry
+    return retry
+
+
+def refusing(retry, refusal):
+    """Make a Retry object refuse the second attempt of calls failing once,
+    either through a "breaker", by a raising "before_retry" hook, or by
+    interrupting the "sleep", and return the exception class the calls then
+    fail with"""
+    if refusal == "breaker":
+        CircuitBreaker(threshold=1).instrument(retry)
+        return CircuitOpenError
+    if refusal == "sleep":
+
+        def interrupt(_):
+            raise asyncio.CancelledError()
+
+        retry.context.before_sleep.append(interrupt)
+        return asyncio.CancelledError
+
+    def refuse(_, __):
+        raise KeyError("refused")
+
+    retry.before_retry.append(refuse)
+    return KeyError
+
+
+for_each_refusal = pytest.mark.parametrize(
+    "refusal", ("breaker", "before_retry", "sleep")
+)
+
+
 @pytest.fixture
 def ssleep(mocker):
     """Mock time.sleep"""
@@ -0,0 +1,153 @@
+"""kaioretry.backoff.Backoff class unit tests"""
+
+import pickle
+import random
+import threading
+import pytest
+from kaioretry.backoff import Backoff, RandomSource, KeyedJitter
+from .mock import MagicMock
+
+
+def test_backoff_fixed_jitter():
+    """Delay should be multiplied, then jitter added to it"""
+    backoff = random.randint(1, 10)
+    jitter = random.randint(0, 10)
+    delay = random.randint(1, 100)
+    assert Backoff(backoff, jitter)(delay) == delay * backoff + jitter
+
+
+def test_backoff_jitter_range():
+    """Added jitter should be picked in the given range"""
+    delay = random.randint(1, 100)
+    for _ in range(100):
+        assert 2 * delay + 1 <= Backoff(2, (1, 3))(delay) <= 2 * delay + 3
+
+
+def test_backoff_bad_jitter():
+    """Jitter of unknown type should be rejected"""
+    with pytest.raises(TypeError):
+        Backoff(1, "abc")
+
+
+@pytest.mark.parametrize("jitter", (1, (1, 2)))
+def test_backoff_pickle(jitter):
+    """Backoff objects must survive pickling"""
+    backoff = Backoff(2, jitter)
+    unpickled = pickle.loads(pickle.dumps(backoff))
+    assert repr(unpickled) == repr(backoff)
+    assert 1 <= unpickled(0) <= 2
+
+
+def test_random_source_threads():
+    """Each thread must have its own random generator, and seeded sources
+    must hand out the same values to same-name threads"""
+    values = {}
+
+    def target(source):
+        values.setdefault(threading.current_thread().name, []).append(
+            [source.random() for _ in range(10)]
+        )
+
+    for source in (RandomSource(42, 3), RandomSource(42, 7)):
+        threads = [
+            threading.Thread(target=target, args=(source,), name=str(i))
+            for i in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(values) == 4
+    for first, second in values.values():
+        assert first == second
+    assert len({tuple(first) for first, _ in values.values()}) == 4
+
+
+def test_random_source_reset():
+    """Resetting a seeded source must hand out the same values again,
+    resetting all sources must forget values of unseeded ones too"""
+    seeded, unseeded = RandomSource("seed"), RandomSource()
+    first = [seeded.random() for _ in range(100)]
+    seeded.reset()
+    assert [seeded.random() for _ in range(100)] == first
+    unseeded.random()
+    RandomSource._reset_all()  # pylint: disable=protected-access
+    assert seeded.random() == first[0]
+
+
+def test_random_source_uniform():
+    """Uniform values must be in range"""
+    source = RandomSource()
+    for _ in range(100):
+        assert 3 <= source.uniform(3, 5) < 5
+
+
+def test_random_source_pickle():
+    """Seeded sources must survive pickling"""
+    source = RandomSource(1, 2)
+    unpickled = pickle.loads(pickle.dumps(source))
+    assert repr(unpickled) == repr(source)
+    assert unpickled.random() == source.random()
+
+
+def test_random_source_bad_batch_size():
+    """Batch size must be positive"""
+    with pytest.raises(ValueError):
+        RandomSource(batch_size=0)
+
+
+def test_backoff_source():
+    """Backoff must draw from the given source"""
+    source = MagicMock(spec=RandomSource)
+    source.uniform.return_value = random.random()
+    assert (
+        Backoff(2, (1, 3), source=source)(1) == 2 + source.uniform.return_value
+    )
+    source.uniform.assert_called_once_with(1, 3)
+
+
+@pytest.mark.parametrize("key", ("host", "pid", lambda *a, **kw: (a, kw)))
+def test_keyed_jitter_offsets(key):
+    """Keyed jitter values must be in range, and same-key values must be
+    identical"""
+    jitter = KeyedJitter(1, 3, key=key)
+    first = jitter.offsets((1,), {"a": 2})
+    second = jitter.offsets((1,), {"a": 2})
+    values = [next(first) for _ in range(100)]
+    assert values == [next(second) for _ in range(100)]
+    assert all(1 <= value < 3 for value in values)
+    assert len(set(values)) == len(values)
+
+
+def test_keyed_jitter_spread():
+    """Different keys must be spread over the jitter range"""
+    jitter = KeyedJitter(0, 1, key=lambda value: value)
+    firsts = sorted(next(jitter.offsets((i,), {})) for i in range(1000))
+    # Roughly a 1000th of the range between two consecutive values.
+    assert max(b - a for a, b in zip(firsts, firsts[1:])) < 0.02
+    assert firsts[0] < 0.02 and firsts[-1] > 0.98
+
+
+def test_keyed_jitter_bad_key():
+    """Unknown key names must be rejected"""
+    with pytest.raises(ValueError):
+        KeyedJitter(0, 1, key="abc")
+
+
+def test_backoff_keyed_jitter():
+    """Backoff loops must walk through keyed jitter values"""
+    jitter = KeyedJitter(0, 1, key=lambda *args: args)
+    backoff = Backoff(2, jitter)
+    offsets = jitter.offsets((42,), {})
+    update = backoff.loop((42,), {})
+    for delay in range(10):
+        assert update(delay) == delay * 2 + next(offsets)
+    assert jitter.per_call
+    with pytest.raises(ValueError):
+        backoff(1)
+    jitter = KeyedJitter(0, 1, key="host")
+    assert not jitter.per_call
+    assert Backoff(2, jitter)(1) == 2 + next(jitter.offsets((), {}))
+    unkeyed = Backoff(2, 1)
+    assert unkeyed.loop((42,), {}) is unkeyed
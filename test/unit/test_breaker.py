@@ -0,0 +1,105 @@
+"""kaioretry.breaker unit tests"""
+
+import pickle
+
+import pytest
+
+from kaioretry import VirtualClock
+from kaioretry.breaker import CircuitBreaker, CircuitOpenError
+from kaioretry.state import LocalState
+from .conftest import flaky, instrumented
+
+
+def test_breaker():
+    """Circuits must open after threshold failures, and be probed once after
+    the cooldown"""
+    clock = VirtualClock()
+    breaker = CircuitBreaker(None, "db", threshold=3, cooldown=10)
+    down = [ConnectionError] * 3
+    service = instrumented(breaker, clock, 2, 1, ConnectionError)(
+        flaky(ConnectionError, None, *down, clock=clock)
+    )
+    assert service()
+    with pytest.raises(ConnectionError):
+        service()
+    assert not breaker.is_open
+    with pytest.raises(CircuitOpenError) as info:
+        service()
+    assert breaker.is_open
+    # Opened by the first attempt, refused the second one a second later.
+    assert (info.value.name, info.value.remaining) == ("db", 9)
+    assert str(info.value) == "circuit db is open for 9s"
+    clock.sleep(8)
+    with pytest.raises(CircuitOpenError):
+        service()
+    clock.sleep(1)
+    assert service()
+    assert not breaker.is_open
+    assert service()
+
+
+def test_probe_failure():
+    """Circuits must open again when their probe fails"""
+    clock = VirtualClock()
+    breaker = CircuitBreaker(LocalState(), threshold=1, cooldown=5)
+    service = instrumented(breaker, clock, 3, 1, ConnectionError)(
+        flaky(ConnectionError, ConnectionError, clock=clock)
+    )
+    with pytest.raises(CircuitOpenError):
+        service()
+    clock.sleep(5)
+    with pytest.raises(CircuitOpenError) as info:
+        service()
+    assert info.value.remaining == 4
+    assert breaker.is_open
+
+
+def test_single_probe():
+    """Only one call may probe a circuit, among those sharing it"""
+    clock = VirtualClock()
+    state = LocalState()
+    first = CircuitBreaker(state, "api", threshold=1, cooldown=5)
+    second = CircuitBreaker(state, "api", threshold=1, cooldown=5)
+    retry_first = instrumented(first, clock, 1, 1, ConnectionError)
+    retry_second = instrumented(second, clock, 1, 1, ConnectionError)
+    with pytest.raises(ConnectionError):
+        retry_first(flaky(ConnectionError, clock=clock))()
+    assert second.is_open
+    clock.sleep(5)
+    calls = []
+
+    def probe():
+        calls.append(clock.time())
+        with pytest.raises(CircuitOpenError):
+            retry_second(flaky(clock=clock))()
+        return True
+
+    assert retry_first(probe)()
+    assert len(calls) == 1
+    assert not second.is_open
+
+
+def test_not_retried():
+    """Exceptions that are not retried must not count"""
+    clock = VirtualClock()
+    breaker = CircuitBreaker(threshold=1)
+
+    def fail():
+        raise KeyError()
+
+    with pytest.raises(KeyError):
+        instrumented(breaker, clock, 1, 1, ConnectionError)(fail)()
+    assert not breaker.is_open
+
+
+def test_parameters():
+    """Breakers must check their parameters, and be picklable"""
+    with pytest.raises(ValueError):
+        CircuitBreaker(threshold=0)
+    with pytest.raises(ValueError):
+        CircuitBreaker(cooldown=0)
+    breaker = CircuitBreaker(LocalState(), "db", threshold=2, cooldown=3)
+    assert repr(breaker) == (
+        "CircuitBreaker(LocalState(), 'db', threshold=2, cooldown=3)"
+    )
+    assert repr(pickle.loads(pickle.dumps(breaker))) == repr(breaker)
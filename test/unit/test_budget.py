@@ -0,0 +1,130 @@
+"""kaioretry.budget unit tests"""
+
+import pickle
+import logging
+
+import pytest
+
+from kaioretry import Retry, Context, VirtualClock
+from kaioretry.breaker import CircuitBreaker, CircuitOpenError
+from kaioretry.budget import RetryBudget
+from kaioretry.hooks import StopRetrying
+from kaioretry.state import LocalState
+from .conftest import flaky, instrumented
+
+
+def test_budget():
+    """Retries must spend tokens, and successes earn some"""
+    budget = RetryBudget(LocalState(), "db", ratio=0.5, capacity=2)
+    retry = instrumented(budget, VirtualClock(), tries=5, delay=0)
+    assert budget.tokens == 2
+    assert retry(flaky(ValueError()))()
+    assert budget.tokens == 1.5
+    errors = [ValueError(1), ValueError(2), ValueError(3)]
+    with pytest.raises(ValueError) as info:
+        retry(flaky(*errors))()
+    # A single token left half a token: the second retry is refused.
+    assert info.value is errors[1]
+    assert budget.tokens == 0.5
+    assert retry(flaky())()
+    assert budget.tokens == 1
+    for _ in range(5):
+        retry(flaky())()
+    assert budget.tokens == 2
+
+
+def test_refusal(caplog):
+    """Refused retries must end calls as if they ran out of tries"""
+    budget = RetryBudget(ratio=0, capacity=1)
+    retry = Retry(
+        ValueError,
+        Context(5, clock=VirtualClock()),
+        stats=True,
+        release_tracebacks=True,
+    )
+    budget.instrument(retry)
+    errors = [ValueError(1), ValueError(2), ValueError(3)]
+    with caplog.at_level(logging.WARNING, "kaioretry.decorator"):
+        with pytest.raises(ValueError) as info:
+            retry(flaky(*errors))()
+    assert info.value is errors[1] and errors[1].__traceback__ is not None
+    assert retry.stats().attempts == 2
+    assert caplog.records[-1].kaioretry_event == "kaioretry.failed"
+    assert caplog.records[-1].kaioretry_attempt == 2
+
+
+def test_refund():
+    """Tokens of retries refused by other hooks must be given back"""
+    clock = VirtualClock()
+    budget = RetryBudget(ratio=0, capacity=2)
+    retry = CircuitBreaker(threshold=1).instrument(
+        Retry(ValueError, Context(5, 1, clock=clock))
+    )
+    budget.instrument(retry)
+    with pytest.raises(CircuitOpenError):
+        retry(flaky(ValueError()))()
+    assert budget.tokens == 2
+    retry = budget.instrument(Retry(ValueError, Context(5, clock=clock)))
+
+    def refuse(state, _):
+        if state.attempt == 2:
+            raise StopRetrying()
+
+    retry.before_retry.append(refuse)
+    with pytest.raises(ValueError):
+        retry(flaky(*[ValueError()] * 5))()
+    assert budget.tokens == 1
+    retry.before_retry.insert(0, retry.before_retry.pop())
+    with pytest.raises(ValueError):
+        retry(flaky(*[ValueError()] * 5))()
+    assert budget.tokens == 0
+
+
+def test_refund_interrupted():
+    """Tokens of retries interrupted while sleeping must be given back"""
+    budget = RetryBudget(ratio=0, capacity=2)
+    retry = budget.instrument(
+        Retry(ValueError, Context(5, clock=VirtualClock()))
+    )
+
+    def interrupt(_):
+        raise KeyboardInterrupt()
+
+    retry.context.before_sleep.append(interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        retry(flaky(ValueError()))()
+    assert budget.tokens == 2
+
+
+def test_contention(mocker):
+    """Tokens must be spent atomically"""
+    state = LocalState()
+    budget = RetryBudget(state, capacity=2)
+    cas = mocker.patch.object(
+        state, "compare_and_set", side_effect=(False, True)
+    )
+    retry = instrumented(budget, VirtualClock(), tries=5, delay=0)
+    assert retry(flaky(ValueError()))()
+    assert cas.call_count == 2
+
+
+def test_no_ratio():
+    """Budgets without ratio must never earn tokens"""
+    budget = RetryBudget(ratio=0, capacity=1)
+    retry = instrumented(budget, VirtualClock(), tries=5, delay=0)
+    assert retry(flaky(ValueError()))()
+    assert retry(flaky())()
+    assert budget.tokens == 0
+
+
+def test_parameters():
+    """Budgets must check their parameters, and be picklable"""
+    with pytest.raises(ValueError):
+        RetryBudget(ratio=-1)
+    with pytest.raises(ValueError):
+        RetryBudget(capacity=0.5)
+    budget = RetryBudget(LocalState(), "db", ratio=0.2, capacity=5)
+    assert repr(budget) == (
+        "RetryBudget(LocalState(), 'db', ratio=0.2, capacity=5)"
+    )
+    assert repr(pickle.loads(pickle.dumps(budget))) == repr(budget)
@@ -0,0 +1,83 @@
+"""kaioretry.clock unit tests"""
+
+import time
+import asyncio
+import random
+import pickle
+from kaioretry.clock import (
+    RealClock,
+    LoopClock,
+    VirtualClock,
+    override,
+    overridden,
+)
+from kaioretry.context import Context
+from kaioretry.strategies import Exponential
+
+
+async def test_real_clock(ssleep, asleep):
+    """RealClock must delegate to time.sleep and asyncio.sleep"""
+    clock = RealClock()
+    delay = random.randint(1, 100)
+    clock.sleep(delay)
+    ssleep.assert_called_once_with(delay)
+    await clock.asleep(delay)
+    asleep.assert_called_once_with(delay)
+    assert clock.time() <= time.monotonic()
+
+
+async def test_loop_clock():
+    """LoopClock must follow the event loop time"""
+    clock = LoopClock()
+    before = asyncio.get_running_loop().time()
+    assert before <= clock.time() <= asyncio.get_running_loop().time()
+
+
+def test_loop_clock_no_loop():
+    """Outside event loops, LoopClock must follow the monotonic time"""
+    before = time.monotonic()
+    assert before <= LoopClock().time() <= time.monotonic()
+
+
+async def test_virtual_clock():
+    """VirtualClock time must only advance by sleeping"""
+    start = random.randint(1, 100)
+    clock = VirtualClock(start)
+    assert clock.time() == start
+    clock.sleep(3)
+    assert clock.time() == start + 3
+    sleeping = clock.asleep(4)
+    assert clock.time() == start + 3
+    await sleeping
+    assert clock.time() == start + 7
+    assert pickle.loads(pickle.dumps(clock)).time() == clock.time()
+
+
+async def test_virtual_clock_context():
+    """A thousand exponential tries must be performed in no time"""
+    clock = VirtualClock()
+    context = Context(
+        tries=1000, delay=1, update_delay=Exponential(cap=60), clock=clock
+    )
+    start = time.monotonic()
+    assert len(list(context)) == 1000
+    assert len([_ async for _ in context]) == 1000
+    assert time.monotonic() - start < 5
+    assert clock.time() == 2 * (1 + 2 + 4 + 8 + 16 + 32 + 60 * 993)
+
+
+async def test_override(ssleep, asleep):
+    """Overriding clocks must replace context clocks, until the end of the
+    with block"""
+    clock, context = VirtualClock(), Context(tries=3, delay=1)
+    assert overridden(clock) is clock
+    with override(VirtualClock()) as first:
+        with override(VirtualClock()) as second:
+            assert overridden(clock) is second
+            assert len(list(context)) == 3
+        assert overridden(clock) is first
+        assert len([_ async for _ in context]) == 3
+    assert overridden(clock) is clock
+    assert (first.time(), second.time(), clock.time()) == (2, 2, 0)
+    ssleep.assert_not_called()
+    asleep.assert_not_called()
@@ -1,10 +1,13 @@
 """kaioretry.context.Context class unit tests"""
 
+import pickle
 import random
 import logging
 import pytest
 import pytest_cases
+from kaioretry.backoff import Backoff
 from kaioretry.context import Context
+from kaioretry.types import DelayStrategy
 
 
 async def assert_context_length(context, length):
@@ -28,6 +31,27 @@ def sync_async(request, ssleep, asleep):
         yield assert_context_length, ssleep
 
 
+async def _iterate(context, args, kwargs):
+    """*Synchronously* unroll a Context loop for given call arguments"""
+    return list(context.iterate(args, kwargs))
+
+
+async def _aiterate(context, args, kwargs):
+    """*Asynchronously* unroll a Context loop for given call arguments"""
+    return [x async for x in context.aiterate(args, kwargs)]
+
+
+@pytest_cases.fixture(
+    unpack_into="sync_async_iterate, iterate_sleep", params=("sync", "async")
+)
+def iterate_sync_async(request, ssleep, asleep):
+    """Yield the matching iterating and sleep functions"""
+    if request.param == "async":
+        yield _aiterate, asleep
+    else:
+        yield _iterate, ssleep
+
+
 @pytest.mark.parametrize(
     "params",
     (
@@ -66,6 +90,58 @@ async def test_context_logging(mocker, assert_length, sleep):
     assert logger.method_calls
 
 
+@pytest.mark.parametrize(
+    "log_format, message",
+    (("text", "2 tries remaining"), ("compact", "kaioretry.try")),
+)
+async def test_context_log_records(
+    caplog, assert_length, sleep, log_format, message
+):
+    """Loop details must be available as log record attributes"""
+    # pylint: disable=unused-argument, too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    logger = logging.getLogger("test_context_log_records")
+    context = Context(tries=3, delay=2, logger=logger, log_format=log_format)
+    with caplog.at_level(logging.INFO, logger.name):
+        await assert_length(context, 3)
+    first, sleeping = caplog.records[:2]
+    assert first.getMessage().endswith(message)
+    assert first.kaioretry_event == "kaioretry.try"
+    assert first.kaioretry_attempt == 2
+    assert first.kaioretry_remaining == 2
+    assert sleeping.kaioretry_event == "kaioretry.sleep"
+    assert sleeping.kaioretry_delay == 2
+    assert sleeping.kaioretry_loop == first.kaioretry_loop
+    assert first.kaioretry_function is None
+    assert first.funcName == sleeping.funcName == "__log"
+    assert len(caplog.records) == 4
+
+
+async def test_context_log_records_unlimited(caplog, assert_length, sleep):
+    """Unlimited loops have no remaining tries to log"""
+    # pylint: disable=unused-argument
+    logger = logging.getLogger("test_context_log_records")
+    context = Context(tries=-1, logger=logger)
+    with caplog.at_level(logging.INFO, logger.name):
+        async for _ in context.aiterate():
+            break
+        for index, _ in enumerate(context):
+            if index == 2:
+                break
+    assert [record.kaioretry_remaining for record in caplog.records] == [
+        None
+    ] * 4
+
+
+def test_context_no_log_records(mocker, ssleep):
+    """Disabled log levels must not be logged at all"""
+    # pylint: disable=unused-argument
+    logger = mocker.MagicMock(spec=logging.Logger)
+    logger.isEnabledFor.return_value = False
+    assert len(list(Context(tries=3, logger=logger))) == 3
+    logger.log.assert_not_called()
+
+
 @pytest.mark.parametrize(
     "update_delay", (lambda x: x, lambda _: random.randint(3, 10))
 )
@@ -102,3 +178,155 @@ async def test_context_max_delay(
     sleep.assert_any_call(delay)
     sleep.assert_any_call(expected)
     update_delay_mock.assert_any_call(delay)
+
+
+async def test_context_pickle(assert_length, sleep):
+    """Context objects using picklable update_delay must be picklable"""
+    context = Context(tries=3, delay=1, update_delay=Backoff(2), max_delay=3)
+    unpickled = pickle.loads(pickle.dumps(context))
+    assert str(unpickled) == str(context)
+    await assert_length(unpickled, 3)
+    assert [call.args for call in sleep.call_args_list] == [(1,), (2,)]
+
+
+async def test_context_delay_strategy(
+    mocker, sync_async_iterate, iterate_sleep
+):
+    """Context must obtain a new update_delay function from a DelayStrategy
+    for each loop, given the call arguments"""
+    strategy = mocker.MagicMock(spec=DelayStrategy)
+    strategy.loop.return_value.side_effect = lambda delay: delay + 1
+    context = Context(tries=3, delay=1, update_delay=strategy)
+    args, kwargs = (random.randint(1, 10),), {"key": random.randint(1, 10)}
+
+    await sync_async_iterate(context, args, kwargs)
+
+    strategy.loop.assert_called_once_with(args, kwargs)
+    assert [call.args for call in iterate_sleep.call_args_list] == [(1,), (2,)]
+
+
+async def _unroll(context, updates):
+    """*Synchronously* unroll a Context loop, updating it at given tries"""
+    tries = 0
+    for _ in context:
+        tries += 1
+        if tries in updates:
+            context.update(**updates[tries])
+    return tries
+
+
+async def _aunroll(context, updates):
+    """*Asynchronously* unroll a Context loop, updating it at given tries"""
+    tries = 0
+    async for _ in context:
+        tries += 1
+        if tries in updates:
+            context.update(**updates[tries])
+    return tries
+
+
+@pytest_cases.fixture(
+    unpack_into="unroll, unroll_sleep", params=("sync", "async")
+)
+def unroll_sync_async(request, ssleep, asleep):
+    """Yield the matching unrolling and sleep functions"""
+    if request.param == "async":
+        yield _aunroll, asleep
+    else:
+        yield _unroll, ssleep
+
+
+def test_context_update(caplog):
+    """Updates must replace the policy of new loops, atomically"""
+    context = Context(tries=3, delay=1)
+    policy = context.policy
+    with caplog.at_level(logging.INFO, "kaioretry.context"):
+        assert context.update(tries=2, max_delay=5) is context.policy
+    assert context.policy.tries == context.tries == 2
+    assert str(context) == "Context(tries=2, delay=(0<=1<=5))"
+    assert caplog.records[-1].kaioretry_event == "kaioretry.update"
+    assert caplog.records[-1].getMessage().startswith(f"{context} updated")
+    assert len(list(context)) == 2
+    context.update(policy)
+    assert context.policy.tries == 3
+    with pytest.raises(ValueError):
+        context.update(min_delay=-1)
+    with pytest.raises(TypeError):
+        context.update(retries=2)
+    assert context.policy.replace() is not context.policy
+    assert repr(context.policy) == (
+        "ContextPolicy(3, 1, update_delay=<function _same_delay at "
+        f"{id(policy.update_delay):#x}>, max_delay=None, min_delay=0)"
+    )
+
+
+def test_context_update_compact_log(caplog):
+    """Compact update log records must be reduced to their event"""
+    context = Context(log_format="compact")
+    with caplog.at_level(logging.INFO, "kaioretry.context"):
+        context.update(tries=1)
+    assert caplog.records[-1].getMessage() == "kaioretry.update"
+
+
+@pytest.mark.parametrize(
+    "follow_updates, initial, updates, tries, sleeps",
+    (
+        (False, 5, {2: {"tries": 3, "max_delay": 1.5}}, 5, [1, 2, 4, 8]),
+        (False, 4, {1: {"tries": 2}}, 4, [1, 2, 4]),
+        (True, 5, {2: {"tries": 3, "max_delay": 1.5}}, 3, [1, 1.5]),
+        (True, 5, {2: {"tries": 2}}, 2, [1]),
+        (True, 2, {2: {"tries": -1}, 4: {"tries": 5}}, 5, [1, 2, 4, 8]),
+        (True, -1, {3: {"tries": 2}}, 3, [1, 2]),
+    ),
+)
+async def test_context_follow_updates(
+    unroll, unroll_sleep, follow_updates, initial, updates, tries, sleeps
+):
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    """Running loops must adopt updates if the context follows them, keeping
+    their count of tries and their delay"""
+    context = Context(
+        tries=initial,
+        delay=1,
+        update_delay=Backoff(2),
+        follow_updates=follow_updates,
+    )
+    assert await unroll(context, updates) == tries
+    assert [call.args[0] for call in unroll_sleep.call_args_list] == sleeps
+
+
+async def test_context_before_retry(ssleep, asleep):
+    """Loops must call before_retry before sleeping, and end instead when it
+    returns False"""
+    context = Context(tries=5)
+    calls = []
+
+    def before_retry():
+        calls.append(None)
+        return len(calls) % 3 != 0
+
+    assert len(list(context.iterate(before_retry=before_retry))) == 3
+    assert len(calls) == 3 and ssleep.call_count == 2
+    iterations = [_ async for _ in context.aiterate(before_retry=before_retry)]
+    assert len(iterations) == 3
+    assert len(calls) == 6 and asleep.call_count == 2
+    assert len(list(Context(tries=1).iterate(before_retry=before_retry))) == 1
+    assert len(calls) == 6
+
+
+async def test_context_follow_delay_strategy(mocker, unroll, unroll_sleep):
+    """Running loops must obtain a new function from a new DelayStrategy, and
+    keep theirs otherwise"""
+    strategies = [mocker.MagicMock(spec=DelayStrategy) for _ in "ab"]
+    for increment, strategy in enumerate(strategies, 1):
+        strategy.loop.return_value.side_effect = lambda d, i=increment: d + i
+    context = Context(
+        tries=5, delay=1, update_delay=strategies[0], follow_updates=True
+    )
+    await unroll(
+        context,
+        {2: {"update_delay": strategies[1]}, 3: {"tries": 4}},
+    )
+    strategies[0].loop.assert_called_once_with((), {})
+    strategies[1].loop.assert_called_once_with((), {})
+    assert [call.args[0] for call in unroll_sleep.call_args_list] == [1, 2, 4]
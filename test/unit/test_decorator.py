@@ -1,5 +1,10 @@
 """Retry class unit tests"""
 
+import pickle
+import asyncio
+import weakref
+import logging
+import inspect
 from random import randint, choice
 from inspect import getfullargspec
 import pytest
@@ -64,3 +69,255 @@ async def test_retry___call__(exception, mocker, is_async):
 async def test_retry_is_func_async(function, is_async):
     """Test that Retry.is_func_async result matches expectations"""
     assert Retry.is_func_async(function) == is_async
+
+
+def _picklable(value):
+    """A module-level, thus picklable, function"""
+    return value
+
+
+@Retry(ValueError, context=Context(tries=2))
+def _decorated(value):
+    """A module-level decorated function"""
+    return value
+
+
+class _Decorated:
+    """A class with decorated methods"""
+
+    # pylint: disable=too-few-public-methods
+
+    @Retry(ValueError).retry
+    def method(self, value):
+        """A decorated method"""
+        return self, value
+
+
+@pytest.mark.parametrize("method", ("retry", "aioretry"))
+async def test_retry_pickle_by_policy(method):
+    """Decorated functions that cannot be found by name must be pickled along
+    their Retry object, and decorated again on unpickling"""
+    retry = Retry(ValueError, context=Context(tries=3, delay=1))
+    wrapped = getattr(retry, method)(_picklable)
+
+    unpickled = pickle.loads(pickle.dumps(wrapped))
+
+    assert unpickled is not wrapped
+    assert unpickled.__wrapped__ is _picklable
+    result = unpickled(42)
+    if method == "aioretry":
+        assert inspect.isawaitable(result)
+        result = await result
+    assert result == 42
+
+
+def test_aioretry_is_coroutine_function():
+    """Functions decorated by aioretry must be recognized as coroutine
+    functions, even when used as methods"""
+    retry = Retry(ValueError)
+    for func in (_picklable, lambda value: value):
+        wrapped = retry.aioretry(func)
+        assert inspect.iscoroutinefunction(wrapped)
+        assert asyncio.iscoroutinefunction(wrapped)
+        assert Retry.is_func_async(wrapped)
+        assert not inspect.iscoroutinefunction(retry.retry(func))
+
+    class Obj:
+        """A class with a decorated coroutine method"""
+
+        # pylint: disable=too-few-public-methods
+
+        method = retry.aioretry(_picklable)
+
+    assert inspect.iscoroutinefunction(Obj().method)
+
+
+def test_retry_pickle_by_reference():
+    """Decorated functions that can be found by name must be pickled by
+    reference"""
+    assert pickle.loads(pickle.dumps(_decorated)) is _decorated
+    assert pickle.loads(pickle.dumps(_Decorated.method)) is _Decorated.method
+
+
+def test_retry_method():
+    """Decorated functions must be bound when used as methods"""
+    obj = _Decorated()
+    assert obj.method(42) == (obj, 42)
+    assert pickle.loads(pickle.dumps(obj.method))(42)[1] == 42
+
+
+def test_retry_pickle_retry_object():
+    """Retry objects built with the default parameters must be picklable"""
+    retry = Retry(ValueError, context=Context(tries=3))
+    assert str(pickle.loads(pickle.dumps(retry))) == str(retry)
+
+
+@pytest.mark.parametrize(
+    "log_format, message",
+    (
+        (
+            "text",
+            "caught while running test_log_records.<locals>.func: failing",
+        ),
+        ("compact", "kaioretry.caught"),
+    ),
+)
+def test_log_records(caplog, log_format, message):
+    """Call details must be available as log record attributes"""
+    logger = logging.getLogger("test_log_records")
+    errors = [ValueError("failing")]
+
+    def func():
+        if errors:
+            raise errors.pop()
+
+    retry = Retry(ValueError, logger=logger, log_format=log_format)
+    with caplog.at_level(logging.DEBUG, logger.name):
+        retry(func)()
+    caught, succeeded = caplog.records
+    assert caught.getMessage().endswith(message)
+    assert caught.kaioretry_event == "kaioretry.caught"
+    assert caught.kaioretry_function == "test_log_records.<locals>.func"
+    assert caught.kaioretry_attempt == 1
+    assert caught.kaioretry_exception == "ValueError"
+    assert caught.funcName == "__log"
+    assert caught.pathname == inspect.getfile(Retry)
+    assert succeeded.kaioretry_event == "kaioretry.succeeded"
+    assert succeeded.kaioretry_attempt == 2
+    assert not hasattr(succeeded, "kaioretry_exception")
+
+
+@pytest.mark.parametrize("hooked", (False, True))
+@pytest.mark.parametrize("is_async", (False, True))
+async def test_release_tracebacks(hooked, is_async):
+    """The frames of the exceptions caught before the last try must be
+    released, and their tracebacks summed up in notes"""
+    markers, errors = [], []
+
+    def func():
+        marker = set()
+        markers.append(weakref.ref(marker))
+        assert all(ref() is None for ref in markers[:-1])
+        try:
+            raise KeyError("cause")
+        except KeyError as cause:
+            errors.append(ValueError(f"failing {len(markers)}"))
+            raise errors[-1] from cause
+
+    async def afunc():
+        return func()
+
+    retry = Retry(ValueError, Context(tries=3), release_tracebacks=True)
+    if hooked:
+        retry.on_give_up.append(lambda state, error: None)
+    with pytest.raises(ValueError, match="failing 3") as info:
+        if is_async:
+            await retry(afunc)()
+        else:
+            retry(func)()
+    assert len(markers) == 3 and markers[-1]() is not None
+    for error in errors[:-1]:
+        assert error.__traceback__ is None
+        assert error.__cause__.__traceback__ is None
+        assert "in func" in error.__notes__[0]
+        assert error.__notes__[0].startswith("Traceback (released):")
+    assert info.value.__traceback__ is not None
+    assert not hasattr(info.value, "__notes__")
+
+
+@pytest.mark.parametrize("hooked", (False, True))
+@pytest.mark.parametrize("follow_updates, tries", ((False, 4), (True, 2)))
+def test_release_tracebacks_update(hooked, follow_updates, tries):
+    """The exception of the last try must keep its traceback, whatever the
+    updates of the context"""
+    context = Context(tries=4, follow_updates=follow_updates)
+    errors = []
+
+    def func():
+        errors.append(ValueError(f"failing {len(errors) + 1}"))
+        if len(errors) == 2:
+            context.update(tries=2)
+        raise errors[-1]
+
+    retry = Retry(ValueError, context, release_tracebacks=True)
+    if hooked:
+        retry.on_give_up.append(lambda state, error: None)
+    with pytest.raises(ValueError) as info:
+        retry(func)()
+    assert len(errors) == tries and info.value is errors[-1]
+    assert info.value.__traceback__ is not None
+    assert all(error.__traceback__ is None for error in errors[:-1])
+
+
+def test_release_group_tracebacks():
+    """The tracebacks of exception groups members must be released too"""
+    error = ValueError("failing")
+    group = ExceptionGroup("failing", [error, error])
+    calls = []
+
+    def func():
+        calls.append(None)
+        if len(calls) == 1:
+            try:
+                raise error
+            except ValueError:
+                raise group from KeyError("not raised")
+
+    Retry(ExceptionGroup, release_tracebacks=True)(func)()
+    assert group.__traceback__ is None and error.__traceback__ is None
+    assert group.__cause__.__traceback__ is None
+    assert not hasattr(group.__cause__, "__notes__")
+    assert len(getattr(error, "__notes__")) == 1
+    assert len(getattr(group, "__notes__")) == 1
+
+
+@pytest.mark.parametrize("hooked", (False, True))
+@pytest.mark.parametrize("is_async", (False, True))
+async def test_history(hooked, is_async):
+    """The exceptions of the first and last attempts must be raised in a
+    group, with the traceback of the last one only"""
+    errors = []
+
+    def func():
+        errors.append(ValueError(f"failing {len(errors) + 1}"))
+        raise errors[-1]
+
+    async def afunc():
+        return func()
+
+    retry = Retry(ValueError, Context(tries=7), history=2)
+    if hooked:
+        retry.on_give_up.append(lambda state, error: None)
+    with pytest.raises(ExceptionGroup) as info:
+        if is_async:
+            await retry(afunc)()
+        else:
+            retry(func)()
+    group = info.value
+    assert group.message.endswith("func failed 7 times (3 omitted)")
+    assert group.exceptions == tuple(errors[i] for i in (0, 1, 5, 6))
+    assert [getattr(error, "__notes__")[-1] for error in group.exceptions] == [
+        f"attempt #{i}" for i in (1, 2, 6, 7)
+    ]
+    assert all(error.__traceback__ is None for error in errors[:-1])
+    assert errors[-1].__traceback__ is not None
+
+
+def test_history_same_error():
+    """Exceptions raised again must keep their traceback"""
+    error = ValueError("failing")
+
+    def func():
+        raise error
+
+    with pytest.raises(ExceptionGroup) as info:
+        Retry(ValueError, Context(tries=2), history=1)(func)()
+    assert info.value.message.endswith(".func failed 2 times")
+    assert info.value.exceptions == (error, error)
+    assert error.__traceback__ is not None
+
+
+def test_history_bad_param():
+    """Negative histories must be refused"""
+    with pytest.raises(ValueError):
+        Retry(ValueError, history=-1)
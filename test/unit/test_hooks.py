@@ -0,0 +1,226 @@
+"""kaioretry.hooks unit tests"""
+
+import asyncio
+
+import pytest
+
+from kaioretry import Retry, Context, VirtualClock
+from kaioretry.hooks import RetryState, StopRetrying
+from .conftest import flaky
+
+
+def _recorder(retry, context):
+    """Register hooks recording events on given Retry and Context"""
+    events = []
+    retry.before_attempt.append(
+        lambda state: events.append(("before", state.attempt, state.start))
+    )
+    retry.after_success.append(
+        lambda state, result: events.append(
+            ("success", state.attempt, state.duration, result)
+        )
+    )
+    retry.on_caught_exception.append(
+        lambda state, error: events.append(
+            ("caught", state.attempt, state.duration, type(error))
+        )
+    )
+    retry.before_retry.append(
+        lambda state, error: events.append(
+            ("retry", state.attempt, type(error))
+        )
+    )
+    retry.on_give_up.append(
+        lambda state, error: events.append(
+            (
+                "give up",
+                state.attempt,
+                state.exhausted,
+                state.refused,
+                type(error),
+            )
+        )
+    )
+    context.before_sleep.append(lambda delay: events.append(("sleep", delay)))
+    return events
+
+
+async def _call(decorator, func, *args):
+    """Call a function decorated by given decorator"""
+    result = func(*args)
+    if decorator == "aioretry":
+        result = await result
+    return result
+
+
+for_each_decorator = pytest.mark.parametrize(
+    "decorator", ("retry", "aioretry")
+)
+
+
+@for_each_decorator
+async def test_hooks_success(decorator):
+    """Hooks must be called at each step of a successful call"""
+    clock = VirtualClock()
+    context = Context(3, 10, clock=clock)
+    retry = Retry(ValueError, context)
+    events = _recorder(retry, context)
+    func = getattr(retry, decorator)(flaky(ValueError, clock=clock))
+    assert await _call(decorator, func, 12) == 12
+    assert events == [
+        ("before", 1, 0),
+        ("caught", 1, 1, ValueError),
+        ("retry", 1, ValueError),
+        ("sleep", 10),
+        ("before", 2, 11),
+        ("success", 2, 1, 12),
+    ]
+
+
+@for_each_decorator
+async def test_hooks_exhausted(decorator):
+    """Give-up hooks must be told when tries are exhausted"""
+    clock = VirtualClock()
+    context = Context(2, clock=clock)
+    retry = Retry(ValueError, context)
+    events = _recorder(retry, context)
+    func = getattr(retry, decorator)(flaky(*[ValueError] * 2, clock=clock))
+    with pytest.raises(ValueError):
+        await _call(decorator, func)
+    assert events[-2:] == [
+        ("caught", 2, 1, ValueError),
+        ("give up", 2, True, False, ValueError),
+    ]
+
+
+@for_each_decorator
+async def test_hooks_not_retried(decorator):
+    """Give-up hooks must be called for exceptions that are not retried"""
+    clock = VirtualClock()
+    context = Context(2, clock=clock)
+    retry = Retry(ValueError, context)
+    events = _recorder(retry, context)
+    func = getattr(retry, decorator)(flaky(KeyError, clock=clock))
+    with pytest.raises(KeyError):
+        await _call(decorator, func)
+    assert events == [
+        ("before", 1, 0),
+        ("give up", 1, False, False, KeyError),
+    ]
+
+
+@for_each_decorator
+async def test_hooks_prevent_attempt(decorator):
+    """Exceptions raised by before_attempt hooks must fail the call"""
+    clock = VirtualClock()
+    context = Context(3, clock=clock)
+    retry = Retry(Exception, context)
+    events = _recorder(retry, context)
+
+    def refuse(state):
+        if state.attempt == 2:
+            raise KeyError(state.attempt)
+
+    retry.before_attempt.insert(0, refuse)
+    func = getattr(retry, decorator)(flaky(*[ValueError] * 2, clock=clock))
+    with pytest.raises(KeyError):
+        await _call(decorator, func)
+    assert events == [
+        ("before", 1, 0),
+        ("caught", 1, 1, ValueError),
+        ("retry", 1, ValueError),
+        ("sleep", 0),
+        ("give up", 2, False, True, KeyError),
+    ]
+
+
+@for_each_decorator
+@pytest.mark.parametrize(
+    "refusal, raised, exhausted",
+    ((StopRetrying, ValueError, True), (KeyError, KeyError, False)),
+)
+async def test_hooks_refuse_retry(decorator, refusal, raised, exhausted):
+    """StopRetrying raised by before_retry hooks must end the call as if it
+    ran out of tries, and other exceptions fail it"""
+    clock = VirtualClock()
+    context = Context(5, clock=clock)
+    retry = Retry(ValueError, context, release_tracebacks=True, history=1)
+    events = _recorder(retry, context)
+    errors = [ValueError(1), ValueError(2)]
+
+    def refuse(state, _):
+        if state.attempt == 2:
+            raise refusal()
+
+    retry.before_retry.insert(0, refuse)
+    func = getattr(retry, decorator)(flaky(*errors, clock=clock))
+    with pytest.raises(ExceptionGroup if exhausted else raised) as info:
+        await _call(decorator, func)
+    assert events[-3:] == [
+        ("before", 2, 1),
+        ("caught", 2, 1, ValueError),
+        ("give up", 2, exhausted, True, raised),
+    ]
+    if exhausted:
+        assert info.value.exceptions == tuple(errors)
+        assert errors[0].__traceback__ is None
+        assert errors[1].__traceback__ is not None
+
+
+@for_each_decorator
+async def test_hooks_interrupted(decorator):
+    """Give-up hooks must be called when the sleep is interrupted"""
+    clock = VirtualClock()
+    context = Context(3, clock=clock)
+    retry = Retry(ValueError, context)
+    events = _recorder(retry, context)
+    retry.on_give_up.append(lambda state, _: events.append(state.sleeping))
+
+    def interrupt(_):
+        raise KeyboardInterrupt()
+
+    context.before_sleep.append(interrupt)
+    func = getattr(retry, decorator)(flaky(ValueError, clock=clock))
+    with pytest.raises(KeyboardInterrupt):
+        await _call(decorator, func)
+    assert events[-3:] == [
+        ("sleep", 0),
+        ("give up", 1, False, False, KeyboardInterrupt),
+        True,
+    ]
+
+
+async def test_hooks_cancelled():
+    """Give-up hooks must be called when a sleeping call is cancelled"""
+    retry = Retry(ValueError, Context(3, 60))
+    given_up = []
+    retry.on_give_up.append(
+        lambda state, error: given_up.append((state.sleeping, type(error)))
+    )
+    func = retry.aioretry(flaky(ValueError))
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(func(), 0.01)
+    assert given_up == [(True, asyncio.CancelledError)]
+
+
+@for_each_decorator
+async def test_no_hooks(decorator, mocker, ssleep, asleep):
+    """Without hooks, the regular loops must be used"""
+    # pylint: disable=unused-argument
+    retry = Retry(ValueError, Context(2))
+    hooked = mocker.patch.object(Retry, "_Retry__hooked_run")
+    ahooked = mocker.patch.object(Retry, "_Retry__hooked_arun")
+    func = getattr(retry, decorator)(flaky(ValueError))
+    await _call(decorator, func)
+    hooked.assert_not_called()
+    ahooked.assert_not_called()
+
+
+def test_retry_state():
+    """States must describe the current attempt"""
+    state = RetryState(flaky, (), {})
+    state.attempt, state.start = 2, 5
+    assert state.duration == 0
+    state.end = 7
+    assert state.duration == 2
+    assert repr(state) == "RetryState(flaky, attempt=2)"
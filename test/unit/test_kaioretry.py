@@ -51,7 +51,14 @@ def test_retry(exception, mocker, attribute):
     assert callable(context_cls.call_args[1]["update_delay"])
 
     retry_cls.assert_called_once_with(
-        exceptions=exception, context=context_cls.return_value, logger=logger
+        exceptions=exception,
+        context=context_cls.return_value,
+        logger=logger,
+        metrics=None,
+        log_format="text",
+        stats=False,
+        release_tracebacks=False,
+        history=0,
     )
     assert result == getattr(retry_cls.return_value, attribute)
 
@@ -62,6 +69,7 @@ def test_retry(exception, mocker, attribute):
     (
         (1, does_not_raise()),
         ((1, 2), does_not_raise()),
+        (kaioretry.KeyedJitter(1, 2), does_not_raise()),
         ("abc", pytest.raises(TypeError)),
     ),
 )
@@ -72,6 +80,36 @@ def test_retry_jitter_values(exception, attribute, jitter, expectation):
         func(exception, jitter=jitter)
 
 
+@for_each_module_attribute
+def test_retry_strategy(mocker, attribute):
+    """Backoff strategies must be used as Context update_delay"""
+    context_cls = mocker.patch("kaioretry.Context")
+    strategy = kaioretry.FullJitter()
+    getattr(kaioretry, attribute)(backoff=strategy)
+    assert context_cls.call_args[1]["update_delay"] is strategy
+    with pytest.raises(ValueError):
+        getattr(kaioretry, attribute)(backoff=strategy, jitter=1)
+
+
+def test_retry_keyed_jitter(ssleep):
+    """Calls with same keys must sleep the same delays"""
+    # See README.md: pylint does not handle _make_decorator.
+    # pylint: disable=too-many-function-args
+    jitter = kaioretry.KeyedJitter(0, 1, key=lambda value: value)
+
+    @kaioretry.retry(ValueError, 3, delay=1, jitter=jitter)
+    def fail(value):
+        raise ValueError(value)
+
+    for value in (1, 1, 2):
+        with pytest.raises(ValueError):
+            fail(value)
+    delays = [call.args[0] for call in ssleep.call_args_list]
+    assert delays[:2] == delays[2:4] != delays[4:]
+    offsets = jitter.offsets((1,), {})
+    assert delays[1] == 1 + next(offsets)
+
+
 @for_each_module_attribute
 def test_metadata(attribute):
     """Test that retry and aioretry have the correct metadata. They are
@@ -0,0 +1,266 @@
+"""kaioretry.logs unit tests"""
+
+import logging
+import threading
+
+import pytest
+
+from kaioretry import Retry, Context, VirtualClock
+from kaioretry.logs import StormFilter, LogPipeline
+
+
+@pytest.fixture(name="storm")
+def _storm():
+    """Yield a logger with a StormFilter, and the filter clock"""
+    logger = logging.getLogger("test_logs")
+    clock = VirtualClock()
+    storm_filter = StormFilter(first=2, interval=10, max_keys=4, clock=clock)
+    storm_filter.install(logger)
+    yield logger, storm_filter, clock
+    logger.removeFilter(storm_filter)
+
+
+def _failing_call(logger, tries, function="func"):
+    """Make a failing call, retried by a Retry object logging to logger"""
+
+    def func():
+        raise ValueError("failing")
+
+    func.__qualname__ = function
+    context = Context(tries, logger=logger)
+    with pytest.raises(ValueError):
+        Retry(ValueError, context, logger=logger)(func)()
+
+
+def _messages(caplog):
+    """Return the messages logged, and forget them"""
+    messages = [record.getMessage() for record in caplog.records]
+    caplog.clear()
+    return messages
+
+
+def test_storm_filter(storm, caplog):
+    """Only the first records of each kind must be logged, then summed up"""
+    logger, _, clock = storm
+    with caplog.at_level(logging.DEBUG, logger.name):
+        _failing_call(logger, 5)
+        # caught, try, sleep and failed records.
+        assert len(_messages(caplog)) == 2 + 2 + 2 + 1
+        _failing_call(logger, 5)
+        assert len(_messages(caplog)) == 1
+        clock.sleep(10)
+        _failing_call(logger, 1)
+        messages = _messages(caplog)
+    assert messages[:3] == [
+        "8 ValueError retries of func suppressed in the last 10s",
+        "6 kaioretry.try records of func suppressed in the last 10s",
+        "6 kaioretry.sleep records of func suppressed in the last 10s",
+    ]
+    assert len(messages) == 5
+
+
+def test_storm_filter_windows(storm, caplog):
+    """Intervals must be over for each kind of records on its own"""
+    logger, _, clock = storm
+    context = Context(3, logger=logger)
+    with caplog.at_level(logging.DEBUG, logger.name):
+        clock.sleep(5)
+        _failing_call(logger, 1)
+        for _ in range(2):
+            for _ in context:
+                pass
+        clock.sleep(5)
+        logger.warning("unrelated")
+        clock.sleep(5)
+        caplog.clear()
+        _failing_call(logger, 1)
+        assert len(_messages(caplog)) == 2
+        for _ in context:
+            pass
+        messages = _messages(caplog)
+    assert messages[0] == (
+        "2 kaioretry.try records suppressed in the last 10s"
+    )
+    assert messages[2] == (
+        "2 kaioretry.sleep records suppressed in the last 10s"
+    )
+    assert len(messages) == 6
+
+
+def test_storm_filter_functions(caplog):
+    """Loop records of different functions must be told apart"""
+    logger = logging.getLogger("test_logs_functions")
+    storm_filter = StormFilter(first=2, clock=VirtualClock())
+    storm_filter.install(logger)
+    with caplog.at_level(logging.DEBUG, logger.name):
+        _failing_call(logger, 5, "first")
+        caplog.clear()
+        _failing_call(logger, 2, "second")
+    logger.removeFilter(storm_filter)
+    events = [record.kaioretry_event for record in caplog.records]
+    assert events.count("kaioretry.try") == 1
+    assert events.count("kaioretry.sleep") == 1
+    assert {record.kaioretry_function for record in caplog.records} == {
+        "second"
+    }
+
+
+def test_storm_filter_expired(storm, caplog):
+    """Summaries must be logged once the interval is over, even if the
+    storm stopped"""
+    logger, _, clock = storm
+    with caplog.at_level(logging.DEBUG, logger.name):
+        for _ in range(3):
+            _failing_call(logger, 1)
+        caplog.clear()
+        clock.sleep(5)
+        logger.warning("unrelated")
+        assert _messages(caplog) == ["unrelated"]
+        clock.sleep(5)
+        logger.warning("unrelated")
+        logger.warning("unrelated")
+        messages = _messages(caplog)
+    assert messages == [
+        "1 ValueError retries of func suppressed in the last 10s",
+        "1 kaioretry.failed records of func suppressed in the last 10s",
+        "unrelated",
+        "unrelated",
+    ]
+
+
+def test_storm_filter_flush(storm, caplog):
+    """Flushing must log all pending summaries"""
+    logger, storm_filter, clock = storm
+    with caplog.at_level(logging.DEBUG, logger.name):
+        for _ in range(3):
+            _failing_call(logger, 2)
+        caplog.clear()
+        clock.sleep(3)
+        storm_filter.flush()
+        records = list(caplog.records)
+        caplog.clear()
+        storm_filter.flush()
+    assert sorted(record.getMessage() for record in records) == [
+        "1 kaioretry.failed records of func suppressed in the last 3s",
+        "1 kaioretry.sleep records of func suppressed in the last 3s",
+        "1 kaioretry.try records of func suppressed in the last 3s",
+        "4 ValueError retries of func suppressed in the last 3s",
+    ]
+    assert {record.kaioretry_suppressed for record in records} == {1, 4}
+    assert not caplog.records
+
+
+def test_storm_filter_overflow(storm, caplog):
+    """Records of new kinds must be counted together once max_keys is
+    reached"""
+    logger, storm_filter, _ = storm
+    with caplog.at_level(logging.DEBUG, logger.name):
+        for function in ("a", "b", "c", "d", "e"):
+            _failing_call(logger, 1, function)
+        caplog.clear()
+        storm_filter.flush()
+    assert [record.getMessage() for record in caplog.records] == [
+        "4 kaioretry log records suppressed in the last 0s"
+    ]
+
+
+def test_storm_filter_other_records(storm, caplog):
+    """Records that do not come from kaioretry must not be filtered"""
+    logger, _, _ = storm
+    with caplog.at_level(logging.DEBUG, logger.name):
+        for _ in range(5):
+            logger.warning("unrelated")
+    assert len(caplog.records) == 5
+
+
+@pytest.mark.parametrize(
+    "kwargs", ({"first": -1}, {"interval": -1}, {"max_keys": 0})
+)
+def test_storm_filter_invalid(kwargs):
+    """Invalid parameters must be rejected"""
+    with pytest.raises(ValueError):
+        StormFilter(**kwargs)
+
+
+def test_storm_filter_install():
+    """Filters must be added to the default loggers by default"""
+    storm_filter = StormFilter()
+    storm_filter.install()
+    try:
+        assert storm_filter in Retry.DEFAULT_LOGGER.filters
+        assert storm_filter in Context.DEFAULT_LOGGER.filters
+    finally:
+        Retry.DEFAULT_LOGGER.removeFilter(storm_filter)
+        Context.DEFAULT_LOGGER.removeFilter(storm_filter)
+    assert repr(storm_filter) == "StormFilter(first=10, interval=10)"
+
+
+class _SlowHandler(logging.Handler):
+    """A handler waiting for an event before handling records"""
+
+    def __init__(self):
+        super().__init__()
+        self.released = threading.Event()
+        self.records = []
+
+    def emit(self, record):
+        self.released.wait()
+        self.records.append(record)
+
+
+def test_log_pipeline():
+    """Records must be handled in a thread, and dropped if the queue is
+    full"""
+    handler = _SlowHandler()
+    logger = logging.getLogger("test_log_pipeline")
+    logger.setLevel(logging.INFO)
+    with LogPipeline(handler, maxsize=2) as pipeline:
+        pipeline.install(logger)
+        pipeline.install(logger)
+        assert logger.handlers == [pipeline.handler]
+        assert not logger.propagate
+        for index in range(10):
+            logger.info("record %d", index)
+        # One record may be in the hands of the slow handler.
+        assert pipeline.dropped in (7, 8)
+        handler.released.set()
+    assert not logger.handlers
+    assert logger.propagate
+    assert len(handler.records) + pipeline.dropped == 10
+    assert handler.records[0].getMessage() == "record 0"
+
+
+def test_log_pipeline_default_logger():
+    """Pipelines must be installed on the kaioretry logger by default"""
+    handler = logging.NullHandler()
+    pipeline = LogPipeline(handler)
+    assert repr(pipeline) == f"LogPipeline(({handler!r},))"
+    pipeline.start()
+    pipeline.install()
+    try:
+        assert pipeline.handler in logging.getLogger("kaioretry").handlers
+    finally:
+        pipeline.stop()
+    assert pipeline.handler not in logging.getLogger("kaioretry").handlers
+
+
+def test_log_pipeline_not_started():
+    """Pipelines that were not started must be stoppable, then startable"""
+    handler = _SlowHandler()
+    handler.released.set()
+    logger = logging.getLogger("test_log_pipeline_not_started")
+    pipeline = LogPipeline(handler)
+    pipeline.install(logger)
+    pipeline.stop()
+    assert not logger.handlers
+    with pipeline:
+        pipeline.install(logger)
+        logger.warning("record")
+    pipeline.stop()
+    assert [record.getMessage() for record in handler.records] == ["record"]
+
+
+def test_log_pipeline_invalid():
+    """Queues must be able to hold records"""
+    with pytest.raises(ValueError):
+        LogPipeline(maxsize=0)
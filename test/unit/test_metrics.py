@@ -0,0 +1,213 @@
+"""kaioretry.metrics unit tests"""
+
+import gc
+import pickle
+import weakref
+import threading
+import pytest
+
+from kaioretry import Retry, Context, VirtualClock, MetricsCollector, retry
+from kaioretry.metrics import Histogram, FunctionMetrics
+from .conftest import flaky, refusing, for_each_refusal
+
+
+def test_histogram():
+    """Values must be counted in the first bucket they fit in"""
+    histogram = Histogram((1, 2))
+    for value in (0.5, 1, 1.5, 3):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.sum == 6
+    other = Histogram((1, 2))
+    other.observe(5)
+    histogram.merge(other)
+    assert histogram.count == 5
+    assert histogram.counts == [2, 1, 2]
+
+
+def test_function_metrics():
+    """Function metrics must be merged"""
+    metrics, other = FunctionMetrics(), FunctionMetrics()
+    for obj in (metrics, other):
+        obj.called()
+        obj.attempted(0.1)
+        obj.caught_error(ValueError())
+        obj.slept(1)
+        obj.exhausted(2)
+    other.succeeded(1)
+    metrics.merge(other)
+    assert (metrics.calls, metrics.attempts) == (2, 2)
+    assert (metrics.successes, metrics.exhaustions) == (1, 2)
+    assert metrics.caught == {"ValueError": 2}
+    assert metrics.sleep.count == 2
+    assert metrics.attempts_per_call.sum == 5
+
+
+@pytest.mark.parametrize("decorator", ("retry", "aioretry", "async"))
+async def test_retry_metrics(decorator):
+    """Retry objects must count calls, attempts and sleeps"""
+    collector = MetricsCollector()
+    clock = VirtualClock()
+    retry_obj = Retry(
+        ValueError,
+        Context(3, 10, clock=clock),
+        metrics=collector,
+    )
+    func = flaky(*[ValueError] * 4, clock=clock)
+    if decorator == "async":
+        decorator, sync_func = "aioretry", func
+
+        async def async_func():
+            return sync_func()
+
+        func = async_func
+
+    decorated = getattr(retry_obj, decorator)(func)
+
+    async def call():
+        result = decorated()
+        if decorator == "aioretry":
+            result = await result
+        return result
+
+    with pytest.raises(ValueError):
+        await call()
+    assert await call()
+    metrics = collector.function(func)
+    assert (metrics.calls, metrics.attempts) == (2, 5)
+    assert (metrics.successes, metrics.exhaustions) == (1, 1)
+    assert metrics.caught == {"ValueError": 4}
+    assert metrics.attempts_per_call.counts[1:3] == [1, 1]
+    assert metrics.sleep.sum == 30
+    assert metrics.attempt_duration.sum == 5
+
+
+@pytest.mark.parametrize("decorator", ("retry", "aioretry"))
+async def test_retry_metrics_other_error(decorator):
+    """Non retried exceptions must only count as attempts"""
+    collector = MetricsCollector()
+    clock = VirtualClock()
+    decorated = getattr(Retry(ValueError, metrics=collector), decorator)(
+        flaky(KeyError, clock=clock)
+    )
+    with pytest.raises(KeyError):
+        result = decorated()
+        if decorator == "aioretry":
+            await result
+    metrics = next(iter(collector.collect().values()))
+    assert (metrics.calls, metrics.attempts, metrics.exhaustions) == (1, 1, 0)
+
+
+@for_each_refusal
+def test_retry_metrics_refused(refusal):
+    """Refused attempts must not be counted"""
+    collector = MetricsCollector()
+    clock = VirtualClock()
+    retry_obj = Retry(
+        ValueError, Context(3, 1, clock=clock), metrics=collector
+    )
+    with pytest.raises(refusing(retry_obj, refusal)):
+        retry_obj(flaky(ValueError, clock=clock))()
+    metrics = next(iter(collector.collect().values()))
+    assert (metrics.calls, metrics.attempts, metrics.exhaustions) == (1, 1, 0)
+    assert metrics.attempt_duration.count == 1
+
+
+def test_threads():
+    """Metrics of all threads must be summed up"""
+    collector = MetricsCollector()
+    # See README.md: pylint does not handle _make_decorator.
+    # pylint: disable=too-many-function-args
+    func = retry(ValueError, 2, metrics=collector)(flaky())
+
+    def run():
+        for _ in range(100):
+            func()
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    metrics = next(iter(collector.collect().values()))
+    assert metrics.calls == metrics.successes == 400
+    collector.reset()
+    assert not collector.collect()
+
+
+def test_ended_threads():
+    """The metrics of ended threads must be kept, without their shards"""
+    collector = MetricsCollector()
+    func = Retry(ValueError, metrics=collector)(flaky())
+    func()
+    for _ in range(3):
+        thread = threading.Thread(target=func)
+        thread.start()
+        thread.join()
+    gc.collect()
+    # pylint: disable=protected-access
+    assert len(collector._MetricsCollector__shards) == 1
+    assert next(iter(collector.collect().values())).calls == 4
+    collector.reset()
+    assert not collector.collect()
+
+
+def test_ended_collector():
+    """Threads ending after their collector must be ignored"""
+    collectors = [MetricsCollector()]
+    ref = weakref.ref(collectors[0])
+    started, release = threading.Event(), threading.Event()
+
+    def run():
+        collectors[0].function(flaky).called()
+        started.set()
+        release.wait()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    started.wait()
+    collectors.clear()
+    gc.collect()
+    assert ref() is None
+    release.set()
+    thread.join()
+
+
+def test_expose():
+    """Metrics must be exposed in the Prometheus text format"""
+    collector = MetricsCollector((1, 2), (0.5,))
+    clock = VirtualClock()
+    func = Retry(ValueError, Context(2, 1, clock=clock), metrics=collector)(
+        flaky(ValueError, clock=clock)
+    )
+    func()
+    text = collector.expose()
+    label = f'function="{flaky.__module__}.flaky.<locals>.flaky"'
+    for line in (
+        "# TYPE kaioretry_calls_total counter",
+        f"kaioretry_calls_total{{{label}}} 1",
+        f"kaioretry_attempts_total{{{label}}} 2",
+        f"kaioretry_successes_total{{{label}}} 1",
+        f"kaioretry_exhaustions_total{{{label}}} 0",
+        f'kaioretry_caught_exceptions_total{{{label},exception="ValueError"}}'
+        " 1",
+        "# TYPE kaioretry_attempts_per_call histogram",
+        f'kaioretry_attempts_per_call_bucket{{{label},le="1"}} 0',
+        f'kaioretry_attempts_per_call_bucket{{{label},le="2"}} 1',
+        f'kaioretry_attempts_per_call_bucket{{{label},le="+Inf"}} 1',
+        f"kaioretry_attempts_per_call_sum{{{label}}} 2",
+        f'kaioretry_sleep_seconds_bucket{{{label},le="0.5"}} 0',
+        f"kaioretry_sleep_seconds_sum{{{label}}} 1.0",
+        f"kaioretry_attempt_duration_seconds_count{{{label}}} 2",
+    ):
+        assert line in text.splitlines()
+    assert text.endswith("\n")
+
+
+def test_pickle():
+    """Collectors must be picklable, without their metrics"""
+    collector = MetricsCollector((1,), (2,))
+    collector.function(flaky).called()
+    copy = pickle.loads(pickle.dumps(collector))
+    assert repr(copy) == repr(collector) == "MetricsCollector((1,), (2,))"
+    assert not copy.collect()
@@ -0,0 +1,227 @@
+"""kaioretry.overhead unit tests"""
+
+import asyncio
+import logging
+import itertools
+import tracemalloc
+
+import pytest
+
+from kaioretry import Retry, Context
+from kaioretry.overhead import OverheadProfiler, FunctionOverhead
+from .conftest import flaky
+
+
+@pytest.fixture(name="thread_time")
+def fixture_thread_time(mocker):
+    """Mock time.thread_time, which returns 0, 1, 2..."""
+    return mocker.patch("time.thread_time", side_effect=itertools.count())
+
+
+def test_profile(thread_time):
+    """Calls and attempts CPU times must be told apart"""
+    profiler = OverheadProfiler(baseline=0)
+    decorate = profiler.profile(Retry(ValueError, Context(tries=3)))
+    func = decorate(flaky(ValueError()))
+    # call: 0 -> 9, attempts: 1 -> 2 and 7 -> 8, logging the caught
+    # exception: 3 -> 4, sleeping: 5 -> 6
+    assert func(7) == 7
+    assert thread_time.call_count == 10
+    (function,) = profiler.report()
+    assert function.name == f"{flaky.__module__}.flaky.<locals>.flaky"
+    assert (function.calls, function.total, function.func) == (1, 9, 2)
+    assert (function.hooks, function.logging, function.sleep) == (0, 1, 1)
+    assert function.overhead == 7
+    assert function.ratio == 7 / 9
+    assert repr(function) == (
+        f"FunctionOverhead({function.name!r}, calls=1, overhead=7)"
+    )
+    with pytest.raises(KeyError):
+        decorate(flaky(KeyError()))(1)
+    assert [function.calls for function in profiler.report()] == [2]
+
+
+def test_report(thread_time):
+    """Functions must be reported from the highest overhead to the lowest"""
+    # pylint: disable=unused-argument
+    profiler = OverheadProfiler(baseline=0)
+    retry_obj = Retry(ValueError, Context(tries=5))
+    retry_obj.before_attempt.append(lambda _: None)
+    decorate = profiler.profile(retry_obj)
+
+    def light():
+        pass
+
+    heavy = decorate(flaky(*[ValueError()] * 3))
+    decorate(light)()
+    heavy(1)
+    report = profiler.report()
+    assert len(report) == 2
+    assert [function.name.rsplit(".", 1)[1] for function in report] == [
+        "flaky",
+        "light",
+    ]
+    lines = str(report).splitlines()
+    assert lines[0].split() == [
+        "function",
+        "calls",
+        "overhead/call",
+        "func/call",
+        "hooks/call",
+        "logging/call",
+        "sleep/call",
+        "overhead",
+    ]
+    assert lines[1].split()[1:] == [
+        "1",
+        "29000000.00us",
+        "4000000.00us",
+        "4000000.00us",
+        "3000000.00us",
+        "5000000.00us",
+        "87.9%",
+    ]
+    profiler.reset()
+    assert not list(profiler.report())
+
+
+def test_profile_parts(thread_time, caplog):
+    """Hooks, logging and sleep bookkeeping must be measured apart, without
+    the parts nested in them"""
+    # pylint: disable=unused-argument
+    profiler = OverheadProfiler(baseline=0)
+    context = Context(tries=2)
+    context.before_sleep.append(lambda _: None)
+    retry_obj = Retry(ValueError, context)
+    retry_obj.before_retry.append(lambda *_: None)
+    func = profiler.profile(retry_obj)(flaky(ValueError()))
+    with caplog.at_level(logging.DEBUG, "kaioretry"):
+        # call: 0 -> 19, attempts: 1 -> 2 and 15 -> 16, logging: 3 -> 4
+        # (caught), 7 -> 8 (try), 10 -> 11 (sleep) and 17 -> 18 (success),
+        # hooks: 5 -> 6 (before_retry) and 12 -> 13 (before_sleep),
+        # sleeping: 9 -> 14, minus its nested parts
+        assert func(3) == 3
+    (function,) = profiler.report()
+    assert (function.total, function.func) == (19, 2)
+    assert (function.hooks, function.logging, function.sleep) == (2, 4, 3)
+
+
+def test_profile_nested():
+    """Retried calls nested in attempts must not be measured as overhead"""
+    profiler = OverheadProfiler()
+    inner = Retry(ValueError, Context(tries=2))(flaky(ValueError()))
+    outer = profiler.profile(Retry(ValueError, Context(tries=1)))(
+        lambda: inner(1)
+    )
+    assert outer() == 1
+    (function,) = profiler.report()
+    assert (function.hooks, function.logging, function.sleep) == (0, 0, 0)
+
+
+def test_baseline(thread_time):
+    """The CPU time of the profiler must be subtracted from the overhead"""
+    # pylint: disable=unused-argument
+    profiler = OverheadProfiler()
+    # Each calibration call: 0 -> 3, and its attempt: 1 -> 2.
+    assert profiler.baseline == 2
+    func = profiler.profile(Retry(ValueError, Context(tries=3)))
+    func(flaky(ValueError()))(1)
+    (function,) = profiler.report()
+    assert function.baseline == 2
+    assert function.overhead == 5
+    function = FunctionOverhead("light", baseline=3)
+    function.calls, function.total, function.func = 1, 2, 1
+    assert function.overhead == 0
+
+
+async def test_profile_async():
+    """Coroutines must be measured step by step"""
+    profiler = OverheadProfiler()
+    decorate = profiler.profile(Retry(ValueError, Context(tries=3)))
+    failures = [ValueError()]
+
+    @decorate
+    async def aflaky(value):
+        await asyncio.sleep(0)
+        for _ in range(10000):
+            pass
+        if failures:
+            raise failures.pop()
+        return value
+
+    assert Retry.is_func_async(aflaky)
+    assert await aflaky(3) == 3
+    (function,) = profiler.report()
+    assert function.calls == 1
+    assert 0 < function.func <= function.total
+
+
+async def test_profile_cancelled():
+    """Cancelled calls must be measured too"""
+    profiler = OverheadProfiler()
+    future = asyncio.get_running_loop().create_future()
+
+    @profiler.profile(Retry(ValueError, Context(tries=3)))
+    async def wait():
+        return await future
+
+    task = asyncio.create_task(wait())
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert [function.calls for function in profiler.report()] == [1]
+
+
+async def test_profile_sync_as_async():
+    """Sync functions decorated with aioretry must be measured"""
+    profiler = OverheadProfiler()
+    func = profiler.profile(Retry(ValueError).aioretry)(flaky())
+    assert await func(5) == 5
+    assert [function.calls for function in profiler.report()] == [1]
+
+
+def test_profile_outside():
+    """Functions called outside profiled calls must not be measured"""
+    profiler = OverheadProfiler()
+    # pylint: disable=protected-access
+    assert profiler._OverheadProfiler__attempts(flaky())(4) == 4
+    assert not list(profiler.report())
+
+
+async def test_profile_outside_async():
+    """Coroutine functions called outside profiled calls must not be
+    measured"""
+
+    async def func():
+        return 2
+
+    profiler = OverheadProfiler()
+    # pylint: disable=protected-access
+    assert await profiler._OverheadProfiler__attempts(func)() == 2
+    assert not list(profiler.report())
+
+
+def test_memory():
+    """Memory peaks must be measured when asked to, and tracemalloc stopped
+    by the profiler that started it"""
+    if tracemalloc.is_tracing():
+        pytest.skip("tracemalloc is already tracing")
+    with OverheadProfiler(memory=True) as profiler:
+        assert tracemalloc.is_tracing()
+        assert repr(profiler) == "OverheadProfiler(memory=True)"
+
+        @profiler.profile(Retry(ValueError))
+        def allocate():
+            return len([0] * 100000)
+
+        assert allocate() == 100000
+        (function,) = profiler.report()
+        assert function.memory >= 800000
+        header = str(profiler.report()).splitlines()[0]
+        assert header.split()[-2:] == ["peak", "bytes/call"]
+        with OverheadProfiler(memory=True):
+            pass
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
+    profiler.close()
@@ -0,0 +1,131 @@
+"""kaioretry.recorder unit tests"""
+
+import io
+import os
+import csv
+import json
+import pickle
+import signal
+
+import pytest
+
+from kaioretry import VirtualClock
+from kaioretry.recorder import FlightRecorder, FIELDS
+from .conftest import flaky, instrumented
+
+
+def test_recorder_exhausted():
+    """Retry events must only be recorded when another attempt follows"""
+    clock = VirtualClock(1000)
+    recorder = FlightRecorder(100, clock.time)
+    retry = instrumented(recorder, clock, tries=2)
+    with pytest.raises(ValueError):
+        retry(flaky(ValueError(), ValueError(), clock=clock))()
+    assert [event["event"] for event in recorder.events()] == [
+        "attempt",
+        "retry",
+        "attempt",
+        "give_up",
+    ]
+
+
+def test_recorder_events():
+    """Events must be recorded in order"""
+    clock = VirtualClock(1000)
+    recorder = FlightRecorder(100, clock.time)
+    retry = instrumented(recorder, clock)
+    retry(flaky(ValueError(), clock=clock))()
+    with pytest.raises(KeyError):
+        retry(flaky(KeyError(), clock=clock))()
+    events = list(recorder.events())
+    assert len(recorder) == len(events) == 6
+    assert [event["event"] for event in events] == [
+        "attempt",
+        "retry",
+        "attempt",
+        "success",
+        "attempt",
+        "give_up",
+    ]
+    assert events[0] == {
+        "time": 1000,
+        "event": "attempt",
+        "call": 1,
+        "function": "flaky.<locals>.flaky",
+        "attempt": 1,
+        "delay": 0,
+        "exception": None,
+    }
+    assert events[1]["exception"] == "ValueError"
+    assert events[2]["delay"] == 2
+    assert events[2]["attempt"] == 2
+    assert events[-1]["call"] == 2
+    assert events[-1]["exception"] == "KeyError"
+
+
+def test_recorder_ring_buffer():
+    """Only the latest events must be kept"""
+    clock = VirtualClock(1000)
+    recorder = FlightRecorder(5, clock.time)
+    retry = instrumented(recorder, clock)
+    func = retry(flaky(clock=clock))
+    for _ in range(10):
+        func()
+    events = list(recorder.events())
+    assert len(recorder) == recorder.capacity == 5
+    assert [event["call"] for event in events] == [8, 9, 9, 10, 10]
+    assert events[-1]["event"] == "success"
+
+
+def test_recorder_dumps(tmp_path):
+    """Events must be dumpable to JSON lines and CSV"""
+    clock = VirtualClock(1000)
+    recorder = FlightRecorder(100, clock.time)
+    retry = instrumented(recorder, clock)
+    retry(flaky(ValueError(), clock=clock))()
+    output = io.StringIO()
+    recorder.dump_jsonl(output)
+    lines = output.getvalue().splitlines()
+    assert [json.loads(line) for line in lines] == list(recorder.events())
+    path = tmp_path / "events.csv"
+    recorder.dump(str(path))
+    with open(path, encoding="utf-8", newline="") as dumped:
+        rows = list(csv.DictReader(dumped))
+    assert len(rows) == 4
+    assert tuple(rows[0]) == FIELDS
+    assert rows[1]["exception"] == "ValueError"
+    path = tmp_path / "events.jsonl"
+    recorder.dump(str(path))
+    assert path.read_text(encoding="utf-8") == output.getvalue()
+
+
+def test_recorder_signal(tmp_path):
+    """Events must be dumped on signal"""
+    clock = VirtualClock(1000)
+    recorder = FlightRecorder(100, clock.time)
+    retry = instrumented(recorder, clock)
+    retry(flaky(clock=clock))()
+    previous = signal.getsignal(signal.SIGUSR1)
+    try:
+        recorder.dump_on_signal(
+            signal.SIGUSR1, str(tmp_path / "dump-{pid}.jsonl")
+        )
+        os.kill(os.getpid(), signal.SIGUSR1)
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
+    dump = tmp_path / f"dump-{os.getpid()}.jsonl"
+    assert len(dump.read_text(encoding="utf-8").splitlines()) == 2
+
+
+def test_recorder_misc():
+    """Recorders must be validated, readable and picklable"""
+    with pytest.raises(ValueError):
+        FlightRecorder(0)
+    clock = VirtualClock(1000)
+    recorder = FlightRecorder(10, clock.time)
+    retry = instrumented(recorder, clock)
+    retry(flaky(clock=clock))()
+    assert repr(recorder) == "FlightRecorder(capacity=10)"
+    unpickled = pickle.loads(pickle.dumps(FlightRecorder(10)))
+    assert unpickled.capacity == 10
+    assert not list(unpickled.events())
@@ -0,0 +1,243 @@
+"""kaioretry.registry unit tests"""
+
+import os
+import gc
+import inspect
+import time
+import pickle
+import signal
+import logging
+import threading
+
+import pytest
+
+from kaioretry.registry import PolicyRegistry
+
+
+registry = PolicyRegistry({"default": {"tries": 2}})
+
+
+def _failing(calls):
+    """Fail, counting calls"""
+    calls.append(None)
+    raise ValueError("failing")
+
+
+@registry.retry("default", ValueError)
+def _decorated(calls):
+    """Fail, counting calls"""
+    _failing(calls)
+
+
+def _calls(func):
+    """Return the number of calls to a failing function decorated by a
+    registry"""
+    calls = []
+    with pytest.raises(ValueError):
+        func(calls)
+    return len(calls)
+
+
+def _wait(condition):
+    """Wait for a condition to be true"""
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_registry():
+    """Decorated functions must follow the current version of their policy"""
+    policies = PolicyRegistry({"a": {"tries": 2}, "b": {"tries": 3}})
+    func = policies.retry("a", ValueError)(_failing)
+    assert func.__name__ == "_failing"
+    assert _calls(func) == 2
+    policies.load({"a": {"tries": 4, "jitter": [0, 1], "history": 1}})
+    with pytest.raises(ExceptionGroup):
+        func([])
+    policies.load({"a": {"tries": 1}})
+    assert _calls(func) == 1
+    assert policies.policies == {"a": {"tries": 1}}
+    assert repr(policies) == "PolicyRegistry(['a'])"
+
+
+async def test_aioretry():
+    """Coroutine functions must follow the current version of their policy"""
+    policies = PolicyRegistry({"a": {"tries": 2}})
+    calls = []
+
+    async def func():
+        _failing(calls)
+
+    decorated = policies.aioretry("a", ValueError)(func)
+    assert inspect.iscoroutinefunction(decorated)
+    with pytest.raises(ValueError):
+        await decorated()
+    policies.load({"a": {"tries": 3}})
+    with pytest.raises(ValueError):
+        await decorated()
+    assert len(calls) == 5
+
+
+def test_method():
+    """Decorated functions must be bound when used as methods"""
+
+    class Obj:
+        """A class with a decorated method"""
+
+        # pylint: disable=too-few-public-methods
+
+        @registry.retry("default")
+        def method(self, value):
+            """Return the object and the value"""
+            return self, value
+
+    obj = Obj()
+    assert obj.method(1) == (obj, 1)
+
+
+def test_load_errors():
+    """Invalid policies must not be loaded"""
+    policies = PolicyRegistry({"a": {"tries": 2}})
+    # Kept alive, so that policy "a" stays required.
+    func = policies.retry("a", ValueError)(_failing)
+    for invalid in (
+        {"a": {"tries": 0}},
+        {"a": {"retries": 2}},
+        {"a": {"history": -1}},
+        {"b": {"tries": 2}},
+    ):
+        with pytest.raises(ValueError):
+            policies.load(invalid)
+        assert policies.policies == {"a": {"tries": 2}}
+    with pytest.raises(KeyError):
+        policies.retry("b")(_failing)
+    assert _calls(func) == 2
+
+
+def test_dead_wrappers():
+    """Policies of garbage-collected functions must not be required"""
+    policies = PolicyRegistry({"a": {}})
+    policies.retry("a")(lambda: None)
+    gc.collect()
+    policies.load({})
+    assert not policies.policies
+
+
+def test_load_toml(tmp_path):
+    """Policies must be loaded from TOML tables"""
+    path = tmp_path / "policies.toml"
+    path.write_text("[a]\ntries = 3\njitter = [0, 0.5]\n\n[b]\ndelay = 1\n")
+    policies = PolicyRegistry()
+    policies.load_toml(str(path))
+    assert policies.policies == {
+        "a": {"tries": 3, "jitter": [0, 0.5]},
+        "b": {"delay": 1},
+    }
+
+
+def test_load_env():
+    """Policies must be loaded from environment variables"""
+    policies = PolicyRegistry()
+    policies.load_env(
+        environ={"KAIORETRY_POLICY_PAYMENTS": '{"tries": 3}', "HOME": "/"}
+    )
+    assert policies.policies == {"payments": {"tries": 3}}
+
+
+def test_reload_on_signal(tmp_path, caplog):
+    """Policies must be reloaded on signals, keeping them on errors"""
+    path = tmp_path / "policies.toml"
+    path.write_text("[default]\ntries = 3\n")
+    policies = PolicyRegistry({"default": {"tries": 2}})
+    func = policies.retry("default", ValueError)(_failing)
+    previous = policies.reload_on_signal(str(path))
+    try:
+        os.kill(os.getpid(), signal.SIGHUP)
+        _wait(lambda: policies.policies == {"default": {"tries": 3}})
+        assert _calls(func) == 3
+        path.write_text("[other]\n")
+        os.kill(os.getpid(), signal.SIGHUP)
+        _wait(lambda: "cannot reload policies" in caplog.text)
+        assert _calls(func) == 3
+        # The handler must not load policies while the interrupted code
+        # holds the lock of the registry.
+        path.write_text("[default]\ntries = 4\n")
+        with getattr(policies, "_PolicyRegistry__lock"):
+            os.kill(os.getpid(), signal.SIGHUP)
+            time.sleep(0.05)
+        _wait(lambda: _calls(func) == 4)
+        # Calling again must only replace the file, keeping the thread.
+        other = tmp_path / "other.toml"
+        other.write_text("[default]\ntries = 5\n")
+        threads = threading.active_count()
+        handler = policies.reload_on_signal(str(other))
+        assert policies.reload_on_signal(str(other)) == handler
+        assert threading.active_count() == threads
+        os.kill(os.getpid(), signal.SIGHUP)
+        _wait(lambda: _calls(func) == 5)
+    finally:
+        signal.signal(signal.SIGHUP, previous)
+
+
+def test_stats():
+    """Decorated functions must expose the statistics of their policy"""
+    policies = PolicyRegistry({"default": {"tries": 2, "stats": True}})
+    func = policies.retry("default", ValueError)(_failing)
+    assert _calls(func) == 2
+    assert func.stats.snapshot().attempts == 2
+    policies.load({"default": {"tries": 3, "stats": True}})
+    assert func.stats.snapshot().attempts == 0
+    policies.load({"default": {"tries": 3}})
+    assert not hasattr(func, "stats")
+
+
+def test_instruments():
+    """Instruments must register their hooks on every load"""
+    attempts = []
+
+    def instrument(retry):
+        retry.on_give_up.append(
+            lambda state, _: attempts.append(state.attempt)
+        )
+
+    policies = PolicyRegistry({"a": {"tries": 2}}, instruments=[instrument])
+    func = policies.retry("a", ValueError)(_failing)
+    _calls(func)
+    policies.load({"a": {"tries": 3}})
+    _calls(func)
+    assert attempts == [2, 3]
+
+
+def test_watch(tmp_path, caplog):
+    """Policies must be reloaded when their file is modified"""
+    path = tmp_path / "policies.toml"
+    path.write_text("[default]\ntries = 3\n")
+    policies = PolicyRegistry({"default": {"tries": 2}})
+    with caplog.at_level(logging.INFO, "kaioretry.registry"):
+        policies.watch(str(path), 0.01)
+        try:
+            with pytest.raises(ValueError):
+                policies.watch(str(path))
+            time.sleep(0.05)
+            assert policies.policies == {"default": {"tries": 2}}
+            os.utime(path, ns=(0, 0))
+            _wait(lambda: policies.policies == {"default": {"tries": 3}})
+            assert "policies reloaded" in caplog.text
+            path.unlink()
+            _wait(lambda: "cannot watch" in caplog.text)
+        finally:
+            policies.unwatch()
+    policies.unwatch()
+    policies.watch(str(path))
+    policies.unwatch()
+
+
+def test_pickle():
+    """Registries and decorated functions must be picklable"""
+    policies = pickle.loads(pickle.dumps(registry))
+    assert policies.policies == registry.policies
+    assert pickle.loads(pickle.dumps(_decorated)) is _decorated
+    assert _calls(_decorated) == 2
+    func = pickle.loads(pickle.dumps(registry.retry("default")(_failing)))
+    assert _calls(func) == 2
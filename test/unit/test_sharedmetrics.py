@@ -0,0 +1,177 @@
+"""kaioretry.sharedmetrics unit tests"""
+
+import os
+import pickle
+import logging
+import multiprocessing
+
+import pytest
+
+from kaioretry import Retry, Context, VirtualClock
+from kaioretry.sharedmetrics import SharedMetricsCollector
+from .conftest import flaky
+
+
+def _metrics(collector):
+    """Return the metrics of the only function of a collector"""
+    metrics = list(collector.collect().values())
+    assert len(metrics) == 1
+    return metrics[0]
+
+
+def _call(collector, failures=1, error=ValueError):
+    """Call a flaky function decorated by a Retry object collecting
+    metrics"""
+    clock = VirtualClock()
+    func = Retry(ValueError, Context(3, 2, clock=clock), metrics=collector)(
+        flaky(*[error] * failures, clock=clock)
+    )
+    try:
+        func()
+    except (ValueError, KeyError):
+        pass
+
+
+def _child(collector):
+    """Update metrics from another process"""
+    _call(collector)
+
+
+def test_collect(tmp_path):
+    """Metrics must be written to the file"""
+    collector = SharedMetricsCollector(str(tmp_path / "metrics"), (1, 2))
+    _call(collector)
+    _call(collector, 3)
+    _call(collector, 1, KeyError)
+    metrics = _metrics(collector)
+    assert (metrics.calls, metrics.attempts) == (3, 6)
+    assert (metrics.successes, metrics.exhaustions) == (1, 1)
+    assert metrics.caught == {"ValueError": 4}
+    assert metrics.attempts_per_call.counts == [0, 1, 1]
+    assert metrics.attempts_per_call.sum == 5
+    assert metrics.sleep.count == 3
+    assert metrics.attempt_duration.sum == 6
+    label = f'function="{flaky.__module__}.flaky.<locals>.flaky"'
+    assert f"kaioretry_calls_total{{{label}}} 3" in collector.expose()
+    collector.reset()
+    metrics = _metrics(collector)
+    assert (metrics.calls, metrics.caught) == (0, {"ValueError": 0})
+
+
+def test_processes(tmp_path):
+    """Metrics of all processes must be summed up"""
+    path = str(tmp_path / "metrics")
+    collector = SharedMetricsCollector(path)
+    _call(collector)
+    context = multiprocessing.get_context("fork")
+    for target in (_child, _call):
+        # Either pickled or inherited.
+        process = context.Process(target=target, args=(collector,))
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+    other = SharedMetricsCollector(path)
+    _call(other)
+    metrics = _metrics(other)
+    assert metrics.calls == 4
+    assert metrics.caught == {"ValueError": 4}
+
+
+def test_fork_reset(tmp_path):
+    """Collectors must claim another slot once reset after a fork"""
+    collector = SharedMetricsCollector(str(tmp_path / "metrics"), slots=2)
+    _call(collector)
+    # pylint: disable=protected-access
+    SharedMetricsCollector._reset_all()
+    _call(collector)
+    metrics = _metrics(collector)
+    assert metrics.calls == 2
+    SharedMetricsCollector._reset_all()
+    _call(collector)
+    assert _metrics(collector).calls == 2
+
+
+def test_dead_slot(tmp_path):
+    """Slots of dead processes must be handed over with their counters"""
+    path = str(tmp_path / "metrics")
+    collector = SharedMetricsCollector(path, slots=1)
+    process = multiprocessing.get_context("fork").Process(
+        target=_call, args=(collector,)
+    )
+    process.start()
+    process.join()
+    _call(collector)
+    metrics = _metrics(collector)
+    assert metrics.calls == 2
+
+
+def test_full(tmp_path, caplog):
+    """Processes and keys beyond the file capacity must not be shared"""
+    path = str(tmp_path / "metrics")
+    collector = SharedMetricsCollector(path, slots=1, keys=1)
+    _call(collector)
+    assert "all keys are taken" in caplog.text
+    # Another collector of the same process stands for another process.
+    other = SharedMetricsCollector(path, slots=1, keys=1)
+    with caplog.at_level(logging.WARNING):
+        _call(other)
+    assert "all slots are taken" in caplog.text
+    metrics = _metrics(collector)
+    assert (metrics.calls, metrics.caught) == (1, {})
+
+
+def test_alive(tmp_path, mocker):
+    """Slots of processes that cannot be signalled must not be taken"""
+    path = str(tmp_path / "metrics")
+    _call(SharedMetricsCollector(path, slots=1))
+    mocker.patch("os.kill", side_effect=PermissionError)
+    other = SharedMetricsCollector(path, slots=1)
+    _call(other)
+    metrics = _metrics(other)
+    assert metrics.calls == 1
+
+
+def test_long_names(tmp_path):
+    """Long names must be shortened without colliding, nor losing the
+    function of exception keys"""
+    collector = SharedMetricsCollector(str(tmp_path / "metrics"))
+    funcs = [flaky(), flaky()]
+    funcs[0].__qualname__ = "é" * 100
+    funcs[1].__qualname__ = "é" * 100 + "2"
+    error = type("E" * 200, (Exception,), {})()
+    for func in funcs:
+        collector.function(func).called()
+        collector.function(func).caught_error(error)
+    collector.function(funcs[0]).called()
+    metrics = collector.collect()
+    assert len(metrics) == 2
+    for name in metrics:
+        assert len(name.encode()) < SharedMetricsCollector.KEY_SIZE
+        assert "é~" in name
+    assert [function.calls for function in metrics.values()] == [2, 1]
+    ((exception, count),) = next(iter(metrics.values())).caught.items()
+    assert exception.startswith("EEE")
+    assert count == 1
+
+
+def test_parameters(tmp_path):
+    """Files must be shared with the same parameters only"""
+    path = str(tmp_path / "metrics")
+    SharedMetricsCollector(path, (1, 2))
+    with pytest.raises(ValueError):
+        SharedMetricsCollector(path, (1, 3))
+    with pytest.raises(ValueError):
+        SharedMetricsCollector(path, (1, 2), slots=2)
+    with pytest.raises(ValueError):
+        SharedMetricsCollector(path, keys=0)
+    assert os.path.getsize(path) > 0
+
+
+def test_pickle(tmp_path):
+    """Collectors must be pickled as collectors of the same file"""
+    path = str(tmp_path / "metrics")
+    collector = SharedMetricsCollector(path, (1,), (2,), 4, 8)
+    _call(collector)
+    copy = pickle.loads(pickle.dumps(collector))
+    assert repr(copy) == f"SharedMetricsCollector({path!r})"
+    assert copy.collect().keys() == collector.collect().keys()
@@ -0,0 +1,170 @@
+"""kaioretry.simulate and command line unit tests"""
+
+import math
+import logging
+import pytest
+
+from kaioretry import Exponential, KeyedJitter
+from kaioretry.simulate import FailureModel, Report, simulate
+from kaioretry.__main__ import main
+
+
+@pytest.fixture(name="vectorise", params=(True, False), ids=("numpy", "loop"))
+def _vectorise(request):
+    return request.param
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    (
+        {"failure_rate": -1},
+        {"outage_rate": 2},
+        {"latency": -1},
+        {"outage_duration": (2, 1)},
+    ),
+)
+def test_failure_model_errors(kwargs):
+    """Invalid rates and durations must be rejected"""
+    with pytest.raises(ValueError):
+        FailureModel(**kwargs)
+
+
+def test_failure_model():
+    """Durations must be turned into ranges"""
+    model = FailureModel(0.5, outage_rate=0.1, outage_duration=3)
+    assert model.failure_rate == 0.5
+    assert model.outage_rate == 0.1
+    assert model.outage_duration == (3, 3)
+    assert model.latency == (0, 0)
+    assert "FailureModel(0.5" in repr(model)
+
+
+def test_report():
+    """Reports must compute percentiles and ratios"""
+    report = Report([float(i) for i in range(1, 201)], 400, 100)
+    assert (report.calls, report.p50, report.p99, report.max) == (
+        200,
+        100,
+        198,
+        200,
+    )
+    assert (report.attempts, report.amplification) == (2, 4)
+    assert report.success_rate == 0.5
+    assert "amplification: 4.00" in str(report)
+    assert Report([1.0], 1, 0).amplification == math.inf
+
+
+def test_simulate_always_fail(vectorise):
+    """Always failing calls must exhaust their tries and delays"""
+    report = simulate(
+        FailureModel(1, latency=0.5),
+        100,
+        tries=4,
+        delay=1,
+        backoff=2,
+        max_delay=3,
+        vectorise=vectorise,
+    )
+    assert report.success_rate == 0
+    assert report.attempts == 4
+    assert report.p50 == report.max == 4 * 0.5 + 1 + 2 + 3
+
+
+def test_simulate_outage(vectorise):
+    """Calls must fail during outages only"""
+    report = simulate(
+        FailureModel(outage_rate=1, outage_duration=10, latency=1),
+        1000,
+        delay=2,
+        vectorise=vectorise,
+    )
+    # Attempts start at 0, 3, 6, 9 and 12.
+    assert report.success_rate == 1
+    assert report.attempts == report.amplification == 5
+    assert report.max == 13
+
+
+def test_simulate_random(vectorise):
+    """Random failures must be retried, the right number of times"""
+    report = simulate(
+        FailureModel(0.5, latency=(0, 1)),
+        20000,
+        tries=2,
+        delay=1,
+        jitter=(0, 1),
+        seed=42,
+        vectorise=vectorise,
+    )
+    assert report.success_rate == pytest.approx(0.75, abs=0.02)
+    assert report.attempts == pytest.approx(1.5, abs=0.02)
+    assert report.p50 < 1 < report.p99 < report.max <= 3
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    (
+        {"backoff": Exponential(cap=5)},
+        {"jitter": KeyedJitter(0, 1)},
+    ),
+)
+def test_simulate_loops(kwargs, caplog):
+    """Strategies and keyed jitter must be simulated through actual
+    loops, silently"""
+    caplog.set_level(logging.DEBUG)
+    report = simulate(FailureModel(1), 10, tries=3, delay=1, **kwargs)
+    assert report.attempts == 3
+    assert 2 <= report.max <= 5
+    assert not caplog.records
+    assert logging.getLogger("kaioretry.simulate").level == logging.NOTSET
+
+
+@pytest.mark.parametrize(
+    "model, kwargs",
+    (
+        (FailureModel(), {"tries": 0}),
+        (FailureModel(), {"calls": 0}),
+        (FailureModel(1), {"tries": -1}),
+        (FailureModel(), {"backoff": Exponential(), "jitter": 1}),
+    ),
+)
+def test_simulate_errors(model, kwargs):
+    """Invalid parameters must be rejected"""
+    with pytest.raises(ValueError):
+        simulate(model, **kwargs)
+
+
+def test_main(capsys):
+    """The simulate command must print a report"""
+    assert (
+        main(
+            [
+                "simulate",
+                "--tries=3",
+                "--failure-rate=1",
+                "--latency",
+                "1",
+                "2",
+                "--calls=10",
+                "--no-numpy",
+            ]
+        )
+        == 0
+    )
+    out = capsys.readouterr().out
+    assert "calls: 10\n" in out
+    assert "success rate: 0.00%" in out
+
+
+@pytest.mark.parametrize(
+    "argv",
+    (
+        ["simulate", "--jitter", "1", "2", "3"],
+        ["simulate", "--failure-rate=2"],
+        [],
+    ),
+)
+def test_main_errors(argv):
+    """Invalid command lines must be rejected"""
+    with pytest.raises(SystemExit) as error:
+        main(argv)
+    assert error.value.code == 2
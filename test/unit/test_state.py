@@ -0,0 +1,152 @@
+"""kaioretry.state unit tests"""
+
+import io
+import math
+import pickle
+import threading
+import multiprocessing
+
+import pytest
+
+from kaioretry.state import (
+    LocalState,
+    SharedMemoryState,
+    SocketState,
+    StateServer,
+)
+
+
+@pytest.fixture(name="backend", params=("local", "shared", "socket"))
+def fixture_backend(request, tmp_path):
+    """Provide a backend of each kind"""
+    if request.param == "local":
+        yield LocalState()
+    elif request.param == "shared":
+        yield SharedMemoryState(str(tmp_path / "state"), keys=4)
+    else:
+        with StateServer(str(tmp_path / "socket")):
+            yield SocketState(str(tmp_path / "socket"))
+
+
+def test_backend(backend):
+    """Numbers must be read and updated"""
+    assert backend.get("a") == 0
+    backend.set("a", 2.5)
+    assert backend.get("a") == 2.5
+    assert backend.add("a", 1) == 3.5
+    assert backend.add("a", 10, high=5) == 5
+    assert backend.add("a", -10, low=1) == 1
+    assert backend.add("b", -math.inf) == -math.inf
+    assert not backend.compare_and_set("a", 2, 3)
+    assert backend.compare_and_set("a", 1, 3)
+    assert backend.compare_and_set("c", 0, 7)
+    assert (backend.get("a"), backend.get("c")) == (3, 7)
+
+
+def test_threads(backend):
+    """Concurrent additions must not be lost"""
+
+    def add():
+        for _ in range(100):
+            backend.add("count", 1)
+
+    threads = [threading.Thread(target=add) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert backend.get("count") == 400
+
+
+def test_pickle(backend):
+    """Backends must be pickled as backends of the same state, except for
+    local ones"""
+    backend.set("a", 1)
+    copy = pickle.loads(pickle.dumps(backend))
+    assert repr(copy) == repr(backend)
+    assert copy.get("a") == (0 if isinstance(backend, LocalState) else 1)
+
+
+def _add(backend):
+    """Add from another process"""
+    for _ in range(100):
+        backend.add("count", 1)
+
+
+def test_processes(tmp_path):
+    """Shared memory states must be shared between processes"""
+    backend = SharedMemoryState(str(tmp_path / "state"))
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_add, args=(backend,)) for _ in "ab"]
+    for process in processes:
+        process.start()
+    _add(backend)
+    for process in processes:
+        process.join()
+    assert SharedMemoryState(str(tmp_path / "state")).get("count") == 300
+
+
+def test_shared_memory_errors(tmp_path):
+    """Shared memory states must check their parameters and capacity"""
+    path = str(tmp_path / "state")
+    with pytest.raises(ValueError):
+        SharedMemoryState(path, keys=0)
+    backend = SharedMemoryState(path, keys=1)
+    with pytest.raises(ValueError):
+        SharedMemoryState(path, keys=2)
+    backend.set("a" * 200, 1)
+    assert backend.get("a" * 200) == 1
+    assert backend.get("a" * 150) == 0
+    assert backend.get("b") == 0
+    with pytest.raises(ValueError):
+        backend.set("b", 1)
+    assert SharedMemoryState(path, keys=1).get("a" * 200) == 1
+
+
+def test_shared_memory_race(tmp_path, mocker):
+    """Names allocated by another process while waiting for the lock must
+    not be allocated twice"""
+    path = str(tmp_path / "state")
+    first, second = SharedMemoryState(path), SharedMemoryState(path)
+    first.set("a", 1)
+    # pylint: disable=protected-access
+    find = SharedMemoryState._SharedMemoryState__find
+    mocker.patch.object(
+        SharedMemoryState,
+        "_SharedMemoryState__find",
+        side_effect=[(None, 0), find(second, b"a")],
+    )
+    assert second.add("a", 1) == 2
+    assert first.get("a") == 2
+
+
+def test_socket_errors(tmp_path):
+    """Socket clients must report errors"""
+    path = str(tmp_path / "socket")
+    server = StateServer(path)
+    assert repr(server) == f"StateServer({path!r})"
+    client = SocketState(path)
+    with pytest.raises(OSError):
+        client.get("a")
+    server.start()
+    try:
+        client.set("a", 1)
+        # pylint: disable=protected-access
+        with pytest.raises(ValueError):
+            client._SocketState__request("unknown")
+        with pytest.raises(ValueError):
+            client._SocketState__request("get")
+        server.backend.set("a", 2)
+        assert client.get("a") == 2
+        pid, connection, _ = client._SocketState__local.connection
+        client._SocketState__local.connection = pid, connection, io.BytesIO()
+        with pytest.raises(ConnectionError):
+            client.get("a")
+        assert client.get("a") == 2
+    finally:
+        server.stop()
+    server.stop()
+    with pytest.raises(ConnectionError):
+        client.get("a")
+    with pytest.raises(OSError):
+        client.get("a")
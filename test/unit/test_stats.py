@@ -0,0 +1,158 @@
+"""kaioretry.stats unit tests"""
+
+import pickle
+import asyncio
+
+import pytest
+
+from kaioretry import Retry, Context, VirtualClock
+from kaioretry.stats import AttemptHistogram, FunctionStats
+from .conftest import flaky, refusing, for_each_refusal
+
+
+def _retry(clock, tries=3):
+    """Return a Retry object keeping statistics, and its context"""
+    context = Context(tries, 5, clock=clock)
+    return Retry(ValueError, context, stats=True), context
+
+
+@pytest.mark.parametrize("decorator", ("retry", "aioretry"))
+async def test_function_stats(decorator):
+    """Wrappers must expose live statistics"""
+    clock = VirtualClock()
+    retry, context = _retry(clock)
+    seen = []
+
+    def func(fail):
+        seen.append(repr(decorated.stats.snapshot()))
+        clock.sleep(0.5)
+        if fail:
+            raise ValueError("failing")
+
+    decorated = getattr(retry, decorator)(func)
+    context.before_sleep.append(
+        lambda _: seen.append(decorated.stats.snapshot().sleeping)
+    )
+    for fail in (False, True):
+        try:
+            result = decorated(fail)
+            if decorator == "aioretry":
+                await result
+        except ValueError:
+            pass
+    assert isinstance(decorated.stats, FunctionStats)
+    assert seen[:3] == [
+        "StatsSnapshot(calls=1, attempts=1, in_flight=1, sleeping=0, "
+        "sleep_time=0, p50=0, p99=0)",
+        "StatsSnapshot(calls=2, attempts=2, in_flight=1, sleeping=0, "
+        "sleep_time=0, p50=0.524288, p99=0.524288)",
+        1,
+    ]
+    snapshot = decorated.stats.snapshot()
+    assert (snapshot.calls, snapshot.attempts) == (2, 4)
+    assert (snapshot.in_flight, snapshot.sleeping) == (0, 0)
+    assert snapshot.sleep_time == 10
+    assert snapshot.latency.count == 4
+    assert repr(decorated.stats) == f"FunctionStats({snapshot!r})"
+
+
+@for_each_refusal
+def test_function_stats_refused(refusal):
+    """Refused attempts must not be counted"""
+    # pylint: disable=no-member
+    clock = VirtualClock()
+    retry, _ = _retry(clock)
+    decorated = retry(flaky(ValueError, clock=clock))
+    with pytest.raises(refusing(retry, refusal)):
+        decorated()
+    snapshot = decorated.stats.snapshot()
+    assert (snapshot.calls, snapshot.attempts) == (1, 1)
+    assert (snapshot.in_flight, snapshot.sleeping) == (0, 0)
+    assert snapshot.latency.count == 1
+
+
+async def test_function_stats_cancelled():
+    """Calls cancelled while sleeping must not be left in flight"""
+    # pylint: disable=no-member
+    retry = Retry(ValueError, Context(3, 60), stats=True)
+    decorated = retry.aioretry(flaky(ValueError))
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(decorated(), 0.01)
+    snapshot = decorated.stats.snapshot()
+    assert (snapshot.calls, snapshot.attempts) == (1, 1)
+    assert (snapshot.in_flight, snapshot.sleeping) == (0, 0)
+
+
+def test_function_stats_refused_first():
+    """Calls refused before they were counted must be ignored"""
+    # pylint: disable=no-member
+    retry, _ = _retry(VirtualClock())
+
+    def refuse(_):
+        raise KeyError("refused")
+
+    retry.before_attempt.insert(0, refuse)
+    decorated = retry(lambda: None)
+    with pytest.raises(KeyError):
+        decorated()
+    snapshot = decorated.stats.snapshot()
+    assert (snapshot.calls, snapshot.in_flight) == (0, 0)
+
+
+def test_retry_stats():
+    """Retry.stats must sum up the statistics of all decorated functions"""
+    # pylint: disable=no-member
+    clock = VirtualClock()
+    retry, _ = _retry(clock, tries=1)
+    first = retry(lambda: None)
+    second = retry(lambda: None)
+
+    @retry
+    def third():
+        raise KeyError("not retried")
+
+    for func in (first, second, second):
+        func()
+    with pytest.raises(KeyError):
+        third()
+    assert first.stats is not second.stats
+    assert retry.stats().calls == 4
+    assert retry.stats().in_flight == 0
+    assert retry.stats().latency.count == 4
+
+
+def test_retry_no_stats():
+    """Statistics must only be available when enabled"""
+    retry = Retry()
+    assert not hasattr(retry(lambda: None), "stats")
+    with pytest.raises(ValueError):
+        retry.stats()
+
+
+def test_retry_stats_pickle():
+    """Statistics must not be carried along by pickling"""
+    retry, _ = _retry(VirtualClock(), tries=1)
+    retry(lambda: None)()
+    unpickled = pickle.loads(pickle.dumps(retry))
+    assert unpickled.stats().calls == 0
+    unpickled(lambda: None)()
+    assert unpickled.stats().calls == 1
+
+
+def test_attempt_histogram():
+    """Durations must be counted in logarithmic buckets"""
+    histogram = AttemptHistogram()
+    for value in (0, 1e-7, 0.001, 0.0011, 0.1, 1, 1, 3600):
+        histogram.observe(value)
+    assert histogram.count == 8
+    assert histogram.sum == pytest.approx(3602.1011001)
+    bounds = [bound for bound, _ in histogram.buckets()]
+    assert bounds == sorted(bounds)
+    assert bounds[0] == histogram.resolution
+    for percent, value in ((25, 1e-6), (50, 0.0011), (75, 1), (100, 3600)):
+        estimate = histogram.percentile(percent)
+        assert value <= estimate <= value * 1.25
+    other = AttemptHistogram()
+    other.merge(histogram)
+    assert other.counts == histogram.counts
+    assert AttemptHistogram().percentile(50) == 0
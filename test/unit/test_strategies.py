@@ -0,0 +1,134 @@
+"""kaioretry.strategies unit tests"""
+
+import pickle
+import random
+import pytest
+from kaioretry.backoff import RandomSource
+from kaioretry.context import Context
+from kaioretry.strategies import (
+    Exponential,
+    FullJitter,
+    EqualJitter,
+    DecorrelatedJitter,
+    Fibonacci,
+    Piecewise,
+)
+
+
+def unroll(strategy, first, count):
+    """Return the first delays of a loop, the first one being given"""
+    update = strategy.loop((), {})
+    delays = [first]
+    for _ in range(count - 1):
+        delays.append(update(delays[-1]))
+    return delays
+
+
+@pytest.mark.parametrize(
+    "strategy, first, expected",
+    (
+        (Exponential(), 1, [1, 2, 4, 8, 16]),
+        (Exponential(cap=5), 1, [1, 2, 4, 5, 5]),
+        (Exponential(3, factor=3), 0, [0, 3, 9, 27, 81]),
+        (Fibonacci(), 2, [2, 2, 4, 6, 10]),
+        (Fibonacci(1, 4), 0, [0, 1, 1, 2, 3, 4, 4]),
+        (Piecewise((3, 0), Exponential(1)), 0, [0, 0, 0, 1, 2, 4]),
+        (Piecewise((1, 0), (2, 5), (1, Fibonacci(1))), 0, [0, 5, 5, 1, 1]),
+        (Piecewise(7), 0, [0, 7, 7]),
+    ),
+)
+def test_strategy_delays(strategy, first, expected):
+    """Test deterministic strategies delays"""
+    assert unroll(strategy, first, len(expected)) == expected
+
+
+@pytest.mark.parametrize(
+    "strategy", (Exponential(cap=5), FullJitter(cap=5), Fibonacci(cap=5))
+)
+def test_strategy_bounded_state(strategy):
+    """Values kept by strategies must stop growing once the cap is reached,
+    so that unlimited loops compute each delay at a constant cost"""
+    delays = strategy.delays()
+    next(delays)
+    for _ in range(10000):
+        assert delays.send(1) <= 5
+    assert all(
+        value <= 5
+        for name, value in delays.gi_frame.f_locals.items()
+        if name in ("ceiling", "previous", "current")
+    )
+
+
+def test_exponential_properties():
+    """Test Exponential properties"""
+    strategy = Exponential(1, 2, factor=3)
+    assert (strategy.base, strategy.cap, strategy.factor) == (1, 2, 3)
+
+
+def test_full_jitter():
+    """Full jitter delays must be picked below the exponential value"""
+    delays = unroll(FullJitter(1, 100), 1, 50)
+    for index, delay in enumerate(delays[1:]):
+        assert 0 <= delay <= min(2**index, 100)
+
+
+def test_equal_jitter():
+    """Equal jitter delays must be picked above half the exponential value"""
+    delays = unroll(EqualJitter(cap=100), 1, 50)
+    for index, delay in enumerate(delays[1:], 1):
+        ceiling = min(2**index, 100)
+        assert ceiling / 2 <= delay <= ceiling
+
+
+def test_decorrelated_jitter():
+    """Decorrelated jitter delays must be picked between base and three
+    times the previous delay"""
+    delays = unroll(DecorrelatedJitter(1, 100), 0, 50)
+    for previous, delay in zip(delays, delays[1:]):
+        assert 1 <= delay <= min(max(previous, 1) * 3, 100)
+
+
+def test_seeded_strategies():
+    """Strategies using seeded sources must be repeatable"""
+    strategy = FullJitter(source=RandomSource(42))
+    first = unroll(strategy, 1, 10)
+    RandomSource._reset_all()  # pylint: disable=protected-access
+    assert unroll(strategy, 1, 10) == first
+
+
+@pytest.mark.parametrize(
+    "params",
+    ({"base": -1}, {"cap": random.randint(-100, -1)}),
+)
+def test_strategy_bad_params(params):
+    """Negative base and cap must be rejected"""
+    with pytest.raises(ValueError):
+        Exponential(**params)
+
+
+@pytest.mark.parametrize("phases", ((), ((0, 1),), (1, (1, 2))))
+def test_piecewise_bad_phases(phases):
+    """Invalid phases must be rejected"""
+    with pytest.raises(ValueError):
+        Piecewise(*phases)
+
+
+async def test_strategy_context(ssleep):
+    """Strategies must be usable as Context update_delay"""
+    strategy = Piecewise((2, 0), Exponential(1, 3))
+    context = Context(tries=6, update_delay=strategy, max_delay=4)
+    for _ in range(2):
+        assert len(list(context)) == 6
+    delays = [call.args[0] for call in ssleep.call_args_list]
+    assert delays == [0, 0, 1, 2, 3] * 2
+
+
+@pytest.mark.parametrize(
+    "strategy", (FullJitter(1, 2), DecorrelatedJitter(3), Piecewise((1, 2), 3))
+)
+def test_strategy_pickle(strategy):
+    """Strategies must be picklable"""
+    unpickled = pickle.loads(pickle.dumps(strategy))
+    assert unpickled.__class__ is strategy.__class__
+    assert (unpickled.base, unpickled.cap) == (strategy.base, strategy.cap)
+    assert len(unroll(unpickled, 1, 5)) == 5
@@ -0,0 +1,78 @@
+"""kaioretry.testing unit tests"""
+
+import pytest
+
+_FUNCTIONS = """
+import pytest
+from kaioretry import retry, aioretry
+
+@retry(ValueError, tries=3, delay=1000, backoff=2)
+def flaky():
+    raise ValueError("not today")
+
+@aioretry(ValueError, tries=2, delay=500)
+async def aflaky():
+    raise ValueError("not today")
+"""
+
+_TEST_FIXTURE = """
+def test_fixture(kaioretry_clock):
+    with pytest.raises(ValueError):
+        flaky()
+    assert kaioretry_clock.delays == [1000, 2000]
+    assert kaioretry_clock.time() == 3000
+"""
+
+_TESTS = """
+def test_sync():
+    with pytest.raises(ValueError):
+        flaky()
+
+async def test_async():
+    with pytest.raises(ValueError):
+        await aflaky()
+"""
+
+
+@pytest.fixture(name="run_pytest")
+def _run_pytest(pytester, pytestconfig):
+    """Return a function running pytest, with the kaioretry plugin, on a
+    given test module"""
+
+    def _run(source, *args):
+        pytester.makepyfile(source)
+        if not pytestconfig.pluginmanager.hasplugin("kaioretry"):
+            # kaioretry is not installed: the entry point is not there.
+            args = ("-p", "kaioretry.testing", *args)
+        return pytester.runpytest("--asyncio-mode=auto", *args)
+
+    return _run
+
+
+def test_kaioretry_clock(run_pytest):
+    """The kaioretry_clock fixture must record the delays instead of
+    sleeping"""
+    result = run_pytest(_FUNCTIONS + _TEST_FIXTURE)
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(
+        ["kaioretry: 2 sleeps fast-forwarded, 3000.00 seconds *"]
+    )
+
+
+def test_fast_forward(run_pytest):
+    """The --kaioretry-fast-forward option must fast-forward delays in all
+    tests"""
+    result = run_pytest(
+        _FUNCTIONS + _TEST_FIXTURE + _TESTS, "--kaioretry-fast-forward"
+    )
+    result.assert_outcomes(passed=3)
+    result.stdout.fnmatch_lines(
+        ["kaioretry: 5 sleeps fast-forwarded, 6500.00 seconds *"]
+    )
+
+
+def test_no_fast_forward(run_pytest):
+    """Without sleeping, nothing must be reported"""
+    result = run_pytest("def test_nothing():\n    pass\n")
+    result.assert_outcomes(passed=1)
+    assert "kaioretry" not in result.stdout.str()
@@ -0,0 +1,111 @@
+"""kaioretry.timeline unit tests"""
+
+import io
+import json
+import pickle
+import asyncio
+
+import pytest
+
+from kaioretry import VirtualClock
+from kaioretry.timeline import TimelineRecorder
+from .conftest import flaky, instrumented, refusing, for_each_refusal
+
+
+def test_timeline():
+    """Attempts and sleeps must be slices of a track per call"""
+    clock = VirtualClock(1)
+    timeline = TimelineRecorder(100)
+    retry = instrumented(timeline, clock)
+    retry(flaky(ValueError(), clock=clock, duration=0.5))()
+    with pytest.raises(KeyError):
+        retry(flaky(KeyError(), clock=clock, duration=0.5))()
+    with pytest.raises(ValueError):
+        retry(flaky(*[ValueError()] * 3, clock=clock, duration=0.5))()
+    events = timeline.events()
+    metadata = [event for event in events if event["ph"] == "M"]
+    assert [event["tid"] for event in metadata] == [1, 2, 3]
+    assert metadata[0]["args"]["name"] == (
+        "flaky.<locals>.flaky #1 (MainThread)"
+    )
+    slices = [
+        (event["tid"], event["name"], event["ts"], event["dur"])
+        for event in events
+        if event["ph"] == "X"
+    ]
+    assert slices[:4] == [
+        (1, "attempt 1", 1e6, 0.5e6),
+        (1, "sleep", 1.5e6, 2e6),
+        (1, "attempt 2", 3.5e6, 0.5e6),
+        (2, "attempt 1", 4e6, 0.5e6),
+    ]
+    assert [name for tid, name, _, _ in slices if tid == 3] == [
+        "attempt 1",
+        "sleep",
+        "attempt 2",
+        "sleep",
+        "attempt 3",
+    ]
+    outcomes = [event["args"].get("outcome") for event in events]
+    assert outcomes.count("error") == 1
+    assert outcomes.count("retry") == 4
+    assert timeline.dropped == 0
+
+
+@for_each_refusal
+def test_timeline_refused(refusal):
+    """Refused attempts must not be sliced"""
+    clock = VirtualClock()
+    timeline = TimelineRecorder()
+    retry = instrumented(timeline, clock)
+    with pytest.raises(refusing(retry, refusal)):
+        retry(flaky(ValueError(), clock=clock))()
+    attempts = [
+        event["name"]
+        for event in timeline.events()
+        if event["name"].startswith("attempt")
+    ]
+    assert attempts == ["attempt 1"]
+
+
+def test_timeline_tasks():
+    """Tracks must be named after asyncio tasks"""
+    clock = VirtualClock(1)
+    timeline = TimelineRecorder(100)
+    retry = instrumented(timeline, clock)
+
+    async def main():
+        await asyncio.create_task(
+            retry.aioretry(flaky(clock=clock, duration=0.5))(), name="worker"
+        )
+
+    asyncio.run(main())
+    assert timeline.events()[0]["args"]["name"].endswith(
+        "(MainThread, worker)"
+    )
+
+
+def test_timeline_dump():
+    """Timelines must be dumped as Chrome trace JSON objects"""
+    clock = VirtualClock(1)
+    timeline = TimelineRecorder(2)
+    retry = instrumented(timeline, clock)
+    retry(flaky(ValueError(), clock=clock, duration=0.5))()
+    assert timeline.dropped == 2
+    output = io.StringIO()
+    timeline.dump(output)
+    trace = json.loads(output.getvalue())
+    assert trace["traceEvents"] == timeline.events()
+    assert trace["displayTimeUnit"] == "ms"
+    timeline.clear()
+    assert not timeline.events()
+    assert timeline.dropped == 0
+
+
+def test_timeline_misc():
+    """Timelines must be validated, readable and picklable"""
+    with pytest.raises(ValueError):
+        TimelineRecorder(0)
+    timeline = TimelineRecorder(10)
+    assert repr(timeline) == "TimelineRecorder(max_events=10)"
+    assert repr(pickle.loads(pickle.dumps(timeline))) == repr(timeline)
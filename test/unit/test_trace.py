@@ -0,0 +1,154 @@
+"""kaioretry.trace unit tests"""
+
+import json
+import asyncio
+import logging
+import pytest
+
+from kaioretry import Retry, Context, Exponential
+from kaioretry.breaker import CircuitBreaker
+from kaioretry.metrics import MetricsCollector
+from kaioretry.trace import TraceRecorder, load, replay
+from .conftest import flaky
+
+
+class _DomainError(Exception):
+    """A module-level exception"""
+
+
+def test_record(tmp_path, ssleep):
+    """Each call must be recorded as a line of attempts"""
+    path = tmp_path / "trace"
+    with TraceRecorder(str(path)) as recorder:
+        decorate = recorder.record(Retry(ValueError, Context(tries=3)))
+        func = decorate(flaky(ValueError(), ValueError()))
+        assert func(12) == 12
+        with pytest.raises(ValueError):
+            decorate(flaky(*[ValueError()] * 3))(1)
+        assert repr(recorder) == f"TraceRecorder({str(path)!r})"
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 2
+    assert [error for _, _, error in json.loads(lines[0])] == [
+        "builtins.ValueError",
+        "builtins.ValueError",
+        None,
+    ]
+    calls = load(str(path))
+    assert [len(call) for call in calls] == [3, 3]
+    assert calls[1][-1][2] == "builtins.ValueError"
+    assert ssleep.call_count == 4
+
+
+async def test_record_async(tmp_path, asleep):
+    """Coroutine functions attempts must be recorded when awaited"""
+
+    async def aflaky():
+        await asyncio.sleep(0)
+        if asleep.await_count < 3:
+            raise _DomainError()
+        return 3
+
+    path = tmp_path / "trace"
+    recorder = TraceRecorder(str(path))
+    func = recorder.record(Retry(_DomainError, Context(tries=5)))(aflaky)
+    assert await func() == 3
+    recorder.close()
+    (call,) = load(str(path))
+    assert [error for _, _, error in call] == [
+        f"{__name__}._DomainError",
+        None,
+    ]
+
+
+def test_record_outside(tmp_path):
+    """Functions called outside recorded calls must not be recorded"""
+    recorder = TraceRecorder(str(tmp_path / "trace"))
+    # pylint: disable=protected-access
+    attempt = recorder._TraceRecorder__attempts(flaky())
+    assert attempt(4) == 4
+    recorder.close()
+    assert not (tmp_path / "trace").exists()
+
+
+def _outage(start, duration, error="builtins.ConnectionError"):
+    """Return calls hitting an outage of a given duration, then succeeding
+    once per second."""
+    calls = [[(start + i, 0.5, error)] for i in range(duration)]
+    return calls + [[(start + duration + i, 0.1, None)] for i in range(5)]
+
+
+def test_replay():
+    """Candidates must be evaluated against the recorded timeline"""
+    calls = _outage(1000, 10)
+    reports = replay(
+        calls,
+        {
+            "none": Retry(ConnectionError, Context(tries=1)),
+            "patient": Retry(
+                ConnectionError,
+                Context(tries=30, delay=1, update_delay=Exponential(cap=4)),
+            ),
+            "other": Retry(ValueError, Context(tries=5, delay=1)),
+        },
+    )
+    assert reports["none"].success_rate == 5 / 15
+    assert reports["none"].attempts == 1
+    assert reports["patient"].success_rate == 1
+    assert reports["patient"].amplification > 1
+    assert reports["patient"].max <= 10 + 4 + 0.1
+    assert reports["other"].attempts == 1
+
+
+@pytest.mark.parametrize(
+    "error, caught",
+    (
+        (f"{__name__}._DomainError", _DomainError),
+        ("unknown.module.SomeError", Exception),
+        ("builtins.UnicodeDecodeError", ValueError),
+        ("builtins.len", Exception),
+        ("asyncio.exceptions.CancelledError", Exception),
+        ("builtins.KeyboardInterrupt", Exception),
+    ),
+)
+def test_replay_errors(error, caught):
+    """Recorded exceptions must be found back, or made up"""
+    reports = replay(
+        _outage(0, 1, error), {"all": Retry(caught, Context(tries=2, delay=1))}
+    )
+    assert reports["all"].success_rate == 1
+    assert reports["all"].attempts == 7 / 6
+
+
+def test_replay_isolated(caplog):
+    """Candidates must be replayed without their hooks and loggers"""
+    metrics = MetricsCollector()
+    candidate = Retry(
+        ConnectionError, Context(tries=3, delay=60), metrics=metrics
+    )
+    breaker = CircuitBreaker(threshold=1)
+    breaker.instrument(candidate)
+    candidate.on_give_up.append(flaky(AssertionError))
+    with caplog.at_level(logging.DEBUG):
+        reports = replay(_outage(0, 2), {"candidate": candidate})
+    assert reports["candidate"].attempts == 9 / 7
+    assert candidate.exceptions is ConnectionError
+    assert not metrics.collect()
+    assert not breaker.is_open
+    assert not caplog.records
+
+
+def test_replay_nothing():
+    """Replaying no calls is an error"""
+    with pytest.raises(ValueError):
+        replay([[]], {})
+
+
+def test_replay_forever():
+    """Unlimited tries must be rejected if the last recorded attempt failed"""
+    calls = [[(0, 0.1, "builtins.ValueError")]]
+    with pytest.raises(ValueError):
+        replay(calls, {"forever": Retry(ValueError)})
+    reports = replay(calls, {"limited": Retry(ValueError, Context(tries=2))})
+    assert reports["limited"].attempts == 2
+    reports = replay(calls + _outage(1, 0), {"forever": Retry(ValueError)})
+    assert reports["forever"].success_rate == 1
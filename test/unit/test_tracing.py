@@ -0,0 +1,201 @@
+"""kaioretry.tracing unit tests"""
+
+import sys
+import enum
+import types
+
+import pytest
+
+from kaioretry import VirtualClock
+from kaioretry.backoff import RandomSource
+from kaioretry.tracing import RetryTracing, InMemoryTracer
+from .conftest import flaky, instrumented, refusing, for_each_refusal
+
+
+@pytest.mark.parametrize("decorator", ("retry", "aioretry"))
+async def test_success(decorator):
+    """Successful calls must be traced, with an event per attempt"""
+    clock = VirtualClock()
+    tracer = InMemoryTracer()
+    retry = instrumented(RetryTracing(tracer), clock, delay=10)
+    func = getattr(retry, decorator)(flaky(ValueError(), clock=clock))
+    result = func()
+    if decorator == "aioretry":
+        result = await result
+    assert result is True
+    assert len(tracer.spans) == 1
+    span = tracer.spans[0]
+    assert span.name.endswith("flaky")
+    assert span.ended
+    assert span.attributes == {
+        "kaioretry.function": span.name,
+        "kaioretry.attempts": 2,
+        "kaioretry.outcome": "success",
+    }
+    assert span.status is None
+    assert span.events == [
+        (
+            "kaioretry.attempt",
+            {
+                "kaioretry.attempt": 1,
+                "kaioretry.duration": 1,
+                "kaioretry.delay": 0,
+                "kaioretry.exception.type": "builtins.ValueError",
+            },
+        ),
+        (
+            "kaioretry.attempt",
+            {
+                "kaioretry.attempt": 2,
+                "kaioretry.duration": 1,
+                "kaioretry.delay": 10,
+            },
+        ),
+    ]
+    assert repr(span) == f"RecordedSpan({span.name!r})"
+
+
+@pytest.mark.parametrize(
+    "errors, outcome, events",
+    (
+        ((ValueError(), ValueError()), "exhausted", 2),
+        ((KeyError(),), "error", 1),
+    ),
+)
+def test_failure(errors, outcome, events):
+    """Failed calls must be traced, with their exception"""
+    clock = VirtualClock()
+    tracer = InMemoryTracer()
+    retry = instrumented(RetryTracing(tracer), clock, tries=2, delay=10)
+    with pytest.raises(type(errors[0])):
+        retry(flaky(*errors, clock=clock))()
+    assert len(tracer.spans) == 1
+    span = tracer.spans[0]
+    assert span.ended
+    assert span.attributes["kaioretry.outcome"] == outcome
+    assert span.attributes["kaioretry.exception.type"] == (
+        f"builtins.{type(errors[0]).__name__}"
+    )
+    assert span.status == (
+        "ERROR",
+        f"builtins.{type(errors[0]).__name__}: {errors[0]}",
+    )
+    assert len(span.events) == events
+
+
+@for_each_refusal
+def test_refused(refusal):
+    """Refused attempts must not be traced"""
+    clock = VirtualClock()
+    tracer = InMemoryTracer()
+    retry = instrumented(RetryTracing(tracer), clock, delay=10)
+    with pytest.raises(refusing(retry, refusal)):
+        retry(flaky(ValueError, clock=clock))()
+    span = tracer.spans[0]
+    assert span.ended and span.attributes["kaioretry.outcome"] == "error"
+    assert span.status[0] == "ERROR"
+    assert [event["kaioretry.attempt"] for _, event in span.events] == [1]
+    assert tracer.current_span is None
+
+
+@pytest.mark.parametrize("decorator", ("retry", "aioretry"))
+async def test_current_span(decorator):
+    """The span of a call must be current during its attempts"""
+    clock = VirtualClock()
+    tracer = InMemoryTracer()
+    retry = instrumented(RetryTracing(tracer), clock, delay=10)
+    inner = retry(flaky(ValueError(), clock=clock))
+    current = []
+
+    def outer():
+        current.append(tracer.current_span)
+        return inner()
+
+    result = getattr(retry, decorator)(outer)()
+    if decorator == "aioretry":
+        result = await result
+    assert result is True
+    assert tracer.current_span is None
+    assert len(tracer.spans) == 2
+    outer_span, inner_span = tracer.spans[0], tracer.spans[1]
+    assert current == [outer_span]
+    assert outer_span.parent is None
+    assert inner_span.parent is outer_span
+
+
+def test_opentelemetry(mocker):
+    """Spans must be made current, and their status set, through
+    OpenTelemetry when tracers do not attach spans themselves"""
+    status_code = enum.Enum("StatusCode", "UNSET OK ERROR")
+    trace = types.SimpleNamespace(
+        StatusCode=status_code, set_span_in_context=lambda span: span
+    )
+    context = mocker.Mock()
+    mocker.patch.dict(
+        sys.modules,
+        {"opentelemetry.trace": trace, "opentelemetry.context": context},
+    )
+    recorder = InMemoryTracer()
+    tracer = types.SimpleNamespace(start_span=recorder.start_span)
+    clock = VirtualClock()
+    retry = instrumented(RetryTracing(tracer), clock, tries=2, delay=10)
+    with pytest.raises(ValueError):
+        retry(flaky(ValueError(), ValueError(), clock=clock))()
+    span = recorder.spans[0]
+    assert context.attach.call_args_list == [mocker.call(span)] * 2
+    assert context.detach.call_args_list == (
+        [mocker.call(context.attach.return_value)] * 2
+    )
+    assert span.status == ("ERROR", "builtins.ValueError: ")
+
+
+def test_no_opentelemetry(mocker):
+    """Without OpenTelemetry, spans must still be traced"""
+    mocker.patch.dict(sys.modules, {"opentelemetry.trace": None})
+    recorder = InMemoryTracer()
+    tracer = types.SimpleNamespace(start_span=recorder.start_span)
+    retry = instrumented(RetryTracing(tracer), VirtualClock(), tries=1)
+    with pytest.raises(ValueError):
+        retry(flaky(ValueError()))()
+    assert recorder.spans[0].status == ("ERROR", "builtins.ValueError: ")
+
+
+def test_sampling():
+    """Only a proportion of calls must be traced"""
+    clock = VirtualClock()
+    tracer = InMemoryTracer()
+    tracing = RetryTracing(tracer, sample_rate=0.2, source=RandomSource(1))
+    func = instrumented(tracing, clock, delay=10)(flaky(clock=clock))
+    for _ in range(1000):
+        func()
+    assert 150 < len(tracer.spans) < 250
+    assert all(span.ended for span in tracer.spans)
+    tracer.clear()
+    assert not tracer.spans
+
+
+def test_no_sampling():
+    """No call must be traced if the sample rate is 0"""
+    clock = VirtualClock()
+    tracer = InMemoryTracer()
+    retry = instrumented(RetryTracing(tracer, sample_rate=0), clock, delay=10)
+    func = retry(flaky(ValueError(), KeyError(), clock=clock))
+    with pytest.raises(KeyError):
+        func()
+    assert not tracer.spans
+
+
+@pytest.mark.parametrize("sample_rate", (-0.1, 1.1))
+def test_invalid_sample_rate(sample_rate):
+    """Sample rates must be probabilities"""
+    with pytest.raises(ValueError):
+        RetryTracing(InMemoryTracer(), sample_rate=sample_rate)
+
+
+def test_repr():
+    """RetryTracing objects must have a readable representation"""
+    tracer = InMemoryTracer()
+    tracing = RetryTracing(tracer, sample_rate=0.5)
+    assert tracing.tracer is tracer
+    assert tracing.sample_rate == 0.5
+    assert repr(tracing) == f"RetryTracing({tracer!r}, sample_rate=0.5)"